@@ -1,15 +1,17 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
-import json
-import sqlite3
-from pathlib import Path
+import time
 from datetime import datetime, date
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from typing import Dict, List, Optional, Union
-import uuid
-import hashlib
+from database.cache import stable_hash
+from database.backup import SNAPSHOT_MAX_AGE_SECONDS
+from database.charts import differential_diagnosis_chart, analytics_charts, figure_from_json
+from database.diagnosis_cache import memoized_results
+from database.metrics import app_reruns, assessment_duration, diagnosis_duration, start_exporter_from_env
+from database.session_state import SessionStateManager, session_registry
+from database.tracing import span, trace_database
+
+# Ciężkie zależności (pandas, plotly) są importowane leniwie w ekranach,
+# które ich używają - ekran powitalny ładuje się bez nich.
 
 # ===== KONFIGURACJA =====
 st.set_page_config(
@@ -20,7 +22,7 @@ st.set_page_config(
 )
 
 # ===== ENHANCED CSS =====
-st.markdown("""
+APP_CSS = """
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
     
@@ -254,7 +256,9 @@ st.markdown("""
         to { transform: scale(1); opacity: 1; }
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 # ===== PROSTE MODELE DANYCH =====
 class SimplePatient:
@@ -286,8 +290,41 @@ class SimpleDatabase:
     def search_patients(self, term):
         return [p for p in self.patients if term.lower() in f"{p.first_name} {p.last_name} {p.pesel}".lower()]
     
+    def get_patient(self, patient_id):
+        if 1 <= patient_id <= len(self.patients):
+            return self.patients[patient_id - 1]
+        return None
+    
     def get_all_patients(self):
         return self.patients
+    
+    def _filter_patients(self, term):
+        if not term:
+            return self.patients
+        return self.search_patients(term)
+    
+    def count_patients(self, search_term=None):
+        return len(self._filter_patients(search_term))
+    
+    def get_patients_page(self, page=0, page_size=50, sort_by='last_name', descending=False, search_term=None):
+        sort_keys = {
+            'last_name': lambda p: (p.last_name.lower(), p.first_name.lower(), p.id),
+            'first_name': lambda p: (p.first_name.lower(), p.last_name.lower(), p.id),
+            'birth_date': lambda p: (p.birth_date, p.id),
+            'id': lambda p: p.id
+        }
+        patients = sorted(self._filter_patients(search_term), key=sort_keys[sort_by], reverse=descending)
+        start = max(page, 0) * page_size
+        return patients[start:start + page_size]
+
+# Opcje sortowania listy pacjentów (etykieta -> kolumna)
+PATIENT_SORT_OPTIONS = {
+    'Nazwisko': 'last_name',
+    'Imię': 'first_name',
+    'Data urodzenia': 'birth_date',
+    'Kolejność dodania': 'id'
+}
+PATIENT_PAGE_SIZES = [25, 50, 100]
 
 # ===== DIAGNOSTIC ENGINE =====
 class SimpleDiagnosticEngine:
@@ -313,6 +350,8 @@ class SimpleDiagnosticEngine:
                 'giving_way': 2
             }
         }
+        # Wersja reguł wyliczana z ich treści - zmiana punktacji unieważnia zapamiętane wyniki
+        self.rules_version = stable_hash(self.scoring_rules)[:16]
     
     def calculate_scores(self, findings):
         scores = {}
@@ -333,9 +372,7 @@ class SimpleDiagnosticEngine:
         return scores
 
 # ===== MODEL 3D ANATOMII =====
-def create_simple_3d_anatomy():
-    """Tworzy prosty model 3D anatomii"""
-    return """
+ANATOMY_3D_HTML = """
     <div id="anatomy-3d" style="width: 100%; height: 500px; border: 2px solid #ddd; border-radius: 15px; position: relative; background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); display: flex; align-items: center; justify-content: center; flex-direction: column;">
         <h3 style="color: #2c3e50; margin-bottom: 2rem;">🔬 Interaktywny Model 3D Anatomii</h3>
         
@@ -417,16 +454,20 @@ def create_simple_3d_anatomy():
     </script>
     """
 
+def create_simple_3d_anatomy():
+    """Zwraca prosty model 3D anatomii (HTML wyliczony raz przy imporcie)"""
+    return ANATOMY_3D_HTML
+
 # ===== INICJALIZACJA =====
 def initialize_app():
     if 'db' not in st.session_state:
-        st.session_state.db = SimpleDatabase()
+        st.session_state.db = trace_database(SimpleDatabase())
     
     if 'diagnostic_engine' not in st.session_state:
         st.session_state.diagnostic_engine = SimpleDiagnosticEngine()
     
-    if 'current_patient' not in st.session_state:
-        st.session_state.current_patient = None
+    if 'current_patient_id' not in st.session_state:
+        st.session_state.current_patient_id = None
     
     if 'selected_region' not in st.session_state:
         st.session_state.selected_region = None
@@ -436,6 +477,29 @@ def initialize_app():
     
     if 'assessment_data' not in st.session_state:
         st.session_state.assessment_data = {}
+    
+    if 'search_results' not in st.session_state:
+        st.session_state.search_results = None
+
+def session_manager():
+    return SessionStateManager(st.session_state)
+
+def get_current_patient():
+    return session_manager().get_current_patient(st.session_state.db)
+
+def set_current_patient(patient):
+    session_manager().set_current_patient(patient)
+
+def track_assessment_start():
+    """Zapamiętuje moment rozpoczęcia oceny (do metryki czasu oceny)"""
+    if 'assessment_started_at' not in st.session_state:
+        st.session_state.assessment_started_at = time.time()
+
+def track_assessment_finish(module):
+    """Zapisuje czas od rozpoczęcia oceny do przejścia do diagnozy"""
+    started_at = st.session_state.pop('assessment_started_at', None)
+    if started_at is not None:
+        assessment_duration.labels(module=module).observe(time.time() - started_at)
 
 def calculate_age(birth_date):
     today = date.today()
@@ -445,25 +509,44 @@ def calculate_age(birth_date):
 def main():
     initialize_app()
     
-    # Header
-    render_main_header()
-    
-    # Sidebar
-    render_sidebar()
-    
-    # Main workflow
-    if st.session_state.workflow_step == 'welcome':
-        show_welcome_screen()
-    elif st.session_state.workflow_step == 'patient_management':
-        show_patient_management()
-    elif st.session_state.workflow_step == 'anatomy_3d':
-        show_3d_anatomy_selection()
-    elif st.session_state.workflow_step == 'assessment':
-        show_assessment()
-    elif st.session_state.workflow_step == 'diagnosis':
-        show_diagnosis_results()
-    elif st.session_state.workflow_step == 'original_modules':
-        show_original_modules()
+    # Metryki (eksport włączany przez FIZJO_METRICS_PORT / FIZJO_METRICS_FILE)
+    start_exporter_from_env()
+    app_reruns.labels(screen=st.session_state.workflow_step).inc()
+    if st.session_state.workflow_step != 'assessment':
+        st.session_state.pop('assessment_started_at', None)
+    
+    # Porządki w stanie sesji i pomiar jej rozmiaru (dla panelu debugowania)
+    manager = session_manager()
+    manager.compact()
+    manager.measure()
+    
+    # Śledzenie (FIZJO_TRACE_FILE): jeden trace na sesję, span na przebieg i krok workflow
+    step = st.session_state.workflow_step
+    with span('rerun', trace_id=manager.session_id, step=step):
+        # Header
+        with span('render_header'):
+            render_main_header()
+        
+        # Sidebar
+        with span('render_sidebar'):
+            render_sidebar()
+        
+        # Main workflow
+        with span(f'step.{step}'):
+            if step == 'welcome':
+                show_welcome_screen()
+            elif step == 'patient_management':
+                show_patient_management()
+            elif step == 'anatomy_3d':
+                show_3d_anatomy_selection()
+            elif step == 'assessment':
+                show_assessment()
+            elif step == 'diagnosis':
+                show_diagnosis_results()
+            elif step == 'original_modules':
+                show_original_modules()
+            elif step == 'analytics':
+                show_analytics_dashboard()
 
 def render_main_header():
     st.markdown("""
@@ -485,8 +568,8 @@ def render_sidebar():
         """, unsafe_allow_html=True)
         
         # Patient info
-        if st.session_state.current_patient:
-            patient = st.session_state.current_patient
+        patient = get_current_patient()
+        if patient:
             st.markdown(f"""
             <div class="patient-card">
                 <h4>👤 Aktualny pacjent</h4>
@@ -515,10 +598,14 @@ def render_sidebar():
             st.session_state.workflow_step = 'original_modules'
             st.rerun()
         
+        if st.button("📊 Dashboard analityczny", use_container_width=True):
+            st.session_state.workflow_step = 'analytics'
+            st.rerun()
+        
         st.markdown("---")
         
         # Quick stats
-        total_patients = len(st.session_state.db.get_all_patients())
+        total_patients = st.session_state.db.count_patients()
         st.metric("👥 Pacjenci w bazie", total_patients)
         
         if st.session_state.selected_region:
@@ -529,6 +616,24 @@ def render_sidebar():
         # Emergency
         if st.button("🆘 Czerwone flagi", use_container_width=True, type="secondary"):
             show_red_flags_modal()
+        
+        # Panel debugowania (?debug=1)
+        if st.query_params.get("debug"):
+            render_session_debug_panel()
+
+def render_session_debug_panel():
+    """Pokazuje największe sesje na serwerze"""
+    with st.expander("🛠️ Debug: pamięć sesji", expanded=False):
+        session_manager().measure(force=True, all_keys=True)
+        st.metric("Aktywne sesje", session_registry.active_count())
+        st.metric("Łącznie", f"{session_registry.total_bytes() / 1024:.1f} KB")
+        
+        current_id = st.session_state.session_id
+        for info in session_registry.largest(10):
+            marker = " (ta sesja)" if info['session_id'] == current_id else ""
+            st.markdown(f"**{info['session_id'][:8]}{marker}** - {info['bytes'] / 1024:.1f} KB")
+            top_keys = sorted(info['keys'].items(), key=lambda item: item[1], reverse=True)[:5]
+            st.caption(", ".join(f"{key}: {size / 1024:.1f} KB" for key, size in top_keys))
 
 def show_welcome_screen():
     st.markdown("## 👋 Witamy w FizjoExpert Pro!")
@@ -588,7 +693,7 @@ def show_welcome_screen():
         ### 📈 Statystyki systemu:
         """)
         
-        total_patients = len(st.session_state.db.get_all_patients())
+        total_patients = st.session_state.db.count_patients()
         
         st.metric("👥 Pacjenci", total_patients)
         st.metric("🔬 Dostępne moduły", 4)
@@ -616,14 +721,16 @@ def show_patient_management():
             if st.button("🔍 Szukaj", type="primary", use_container_width=True):
                 if search_term:
                     results = st.session_state.db.search_patients(search_term)
-                    st.session_state.search_results = results
+                    session_manager().set_search_results(results, search_term)
         
         # Wyniki wyszukiwania
-        if hasattr(st.session_state, 'search_results'):
-            if st.session_state.search_results:
+        manager = session_manager()
+        if manager.has_search_results():
+            search_results = manager.get_search_results(st.session_state.db)
+            if search_results:
                 st.markdown("#### 📋 Wyniki wyszukiwania:")
                 
-                for patient in st.session_state.search_results:
+                for patient in search_results:
                     col1, col2, col3 = st.columns([3, 2, 1])
                     
                     with col1:
@@ -641,7 +748,7 @@ def show_patient_management():
                     
                     with col3:
                         if st.button("Wybierz", key=f"select_{patient.id}", type="primary"):
-                            st.session_state.current_patient = patient
+                            set_current_patient(patient)
                             st.success(f"✅ Wybrano: {patient.first_name} {patient.last_name}")
                             st.rerun()
                     
@@ -678,7 +785,7 @@ def show_patient_management():
                 else:
                     patient = SimplePatient(first_name, last_name, pesel, birth_date)
                     patient_id = st.session_state.db.add_patient(patient)
-                    st.session_state.current_patient = patient
+                    set_current_patient(patient)
                     
                     st.success(f"✅ Dodano pacjenta: {first_name} {last_name}")
                     st.balloons()
@@ -686,55 +793,115 @@ def show_patient_management():
     
     with tab3:
         st.markdown("### 📊 Wszyscy pacjenci")
-        
-        patients = st.session_state.db.get_all_patients()
-        
-        if patients:
-            df_data = []
-            for p in patients:
-                df_data.append({
-                    'ID': p.id,
-                    'Imię': p.first_name,
-                    'Nazwisko': p.last_name,
-                    'PESEL': p.pesel,
-                    'Wiek': calculate_age(p.birth_date),
-                    'Data urodzenia': p.birth_date.strftime("%d.%m.%Y")
-                })
-            
-            df = pd.DataFrame(df_data)
-            
-            # Interaktywna tabela
-            selected = st.dataframe(
-                df.drop(columns=['ID']),
-                use_container_width=True,
-                on_select="rerun",
-                selection_mode="single-row"
-            )
-            
-            if selected and 'selection' in selected and selected['selection']['rows']:
-                selected_idx = selected['selection']['rows'][0]
-                selected_patient = patients[selected_idx]
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    if st.button("👤 Wybierz pacjenta", type="primary"):
-                        st.session_state.current_patient = selected_patient
-                        st.success(f"✅ Wybrano: {selected_patient.first_name} {selected_patient.last_name}")
-                        st.rerun()
-                
-                with col2:
-                    if st.button("🔬 Rozpocznij diagnozę"):
-                        st.session_state.current_patient = selected_patient
-                        st.session_state.workflow_step = 'anatomy_3d'
-                        st.rerun()
+        show_patient_browser()
+
+def reset_patient_page():
+    st.session_state.patients_page = 0
+
+def show_patient_browser():
+    """Stronicowana lista pacjentów - pobiera z bazy tylko bieżącą stronę"""
+    db = st.session_state.db
+    
+    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+    
+    with col1:
+        filter_term = st.text_input(
+            "Filtruj:",
+            placeholder="Imię, nazwisko lub PESEL",
+            key="patients_filter",
+            on_change=reset_patient_page
+        )
+    
+    with col2:
+        sort_label = st.selectbox("Sortuj według:", list(PATIENT_SORT_OPTIONS.keys()), key="patients_sort", on_change=reset_patient_page)
+    
+    with col3:
+        page_size = st.selectbox("Na stronie:", PATIENT_PAGE_SIZES, key="patients_page_size", on_change=reset_patient_page)
+    
+    with col4:
+        st.markdown("<br>", unsafe_allow_html=True)  # Spacer
+        descending = st.checkbox("Malejąco", key="patients_desc", on_change=reset_patient_page)
+    
+    total = db.count_patients(filter_term or None)
+    
+    if not total:
+        if filter_term:
+            st.warning("Nie znaleziono pacjentów.")
         else:
             st.info("📝 Brak pacjentów w bazie. Dodaj pierwszego pacjenta w zakładce 'Dodaj nowego'.")
+        return
+    
+    page_count = (total + page_size - 1) // page_size
+    page = min(st.session_state.get('patients_page', 0), page_count - 1)
+    
+    patients = db.get_patients_page(
+        page=page,
+        page_size=page_size,
+        sort_by=PATIENT_SORT_OPTIONS[sort_label],
+        descending=descending,
+        search_term=filter_term or None
+    )
+    
+    df_data = []
+    for p in patients:
+        df_data.append({
+            'Imię': p.first_name,
+            'Nazwisko': p.last_name,
+            'PESEL': p.pesel,
+            'Wiek': calculate_age(p.birth_date),
+            'Data urodzenia': p.birth_date.strftime("%d.%m.%Y")
+        })
+    
+    import pandas as pd
+    df = pd.DataFrame(df_data)
+    
+    # Interaktywna tabela (tylko bieżąca strona)
+    selected = st.dataframe(
+        df,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"patients_table_{page}"
+    )
+    
+    # Nawigacja między stronami
+    nav1, nav2, nav3 = st.columns([1, 2, 1])
+    
+    with nav1:
+        if st.button("◀ Poprzednia", disabled=page == 0, use_container_width=True):
+            st.session_state.patients_page = page - 1
+            st.rerun()
+    
+    with nav2:
+        st.caption(f"Strona {page + 1} z {page_count} · pacjentów: {total}")
+    
+    with nav3:
+        if st.button("Następna ▶", disabled=page >= page_count - 1, use_container_width=True):
+            st.session_state.patients_page = page + 1
+            st.rerun()
+    
+    if selected and 'selection' in selected and selected['selection']['rows']:
+        selected_idx = selected['selection']['rows'][0]
+        selected_patient = patients[selected_idx]
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.button("👤 Wybierz pacjenta", type="primary"):
+                set_current_patient(selected_patient)
+                st.success(f"✅ Wybrano: {selected_patient.first_name} {selected_patient.last_name}")
+                st.rerun()
+        
+        with col2:
+            if st.button("🔬 Rozpocznij diagnozę"):
+                set_current_patient(selected_patient)
+                st.session_state.workflow_step = 'anatomy_3d'
+                st.rerun()
 
 def show_3d_anatomy_selection():
     st.markdown("## 🔬 Model 3D - Wybór obszaru anatomicznego")
     
-    if not st.session_state.current_patient:
+    if not get_current_patient():
         st.error("❌ Najpierw wybierz pacjenta!")
         if st.button("👤 Przejdź do zarządzania pacjentami"):
             st.session_state.workflow_step = 'patient_management'
@@ -786,7 +953,8 @@ def show_3d_anatomy_selection():
             st.rerun()
 
 def show_assessment():
-    if not st.session_state.current_patient:
+    patient = get_current_patient()
+    if not patient:
         st.error("❌ Brak wybranego pacjenta!")
         return
     
@@ -797,7 +965,6 @@ def show_assessment():
     region_name = st.session_state.selected_region.replace('_', ' ').title()
     st.markdown(f"## 📋 Ocena diagnostyczna - {region_name}")
     
-    patient = st.session_state.current_patient
     st.info(f"👤 Pacjent: {patient.first_name} {patient.last_name}, wiek: {calculate_age(patient.birth_date)} lat")
     
     # Progress
@@ -805,6 +972,8 @@ def show_assessment():
     st.progress(progress)
     st.write(f"Postęp: {progress*100:.0f}%")
     
+    track_assessment_start()
+    
     # Assessment based on selected region
     if st.session_state.selected_region == 'ankle':
         run_ankle_assessment()
@@ -955,6 +1124,7 @@ def run_ankle_assessment():
     
     # Proceed to diagnosis
     if st.button("🎯 Przejdź do diagnozy", type="primary", use_container_width=True):
+        track_assessment_finish('ankle')
         st.session_state.workflow_step = 'diagnosis'
         st.rerun()
 
@@ -1041,6 +1211,7 @@ def run_knee_assessment():
     
     # Proceed to diagnosis
     if st.button("🎯 Przejdź do diagnozy", type="primary", use_container_width=True):
+        track_assessment_finish('knee')
         st.session_state.workflow_step = 'diagnosis'
         st.rerun()
 
@@ -1051,12 +1222,10 @@ def show_diagnosis_results():
         st.error("❌ Brak danych z oceny!")
         return
     
-    # Calculate scores
-    engine = st.session_state.diagnostic_engine
-    scores = engine.calculate_scores(st.session_state.assessment_data)
-    
-    # Find top diagnosis
-    top_condition = max(scores.items(), key=lambda x: x[1]['probability'])
+    # Calculate scores (zapamiętane dla identycznych wyników badania)
+    results = compute_diagnosis_results(st.session_state.diagnostic_engine, st.session_state.assessment_data)
+    scores = results['scores']
+    top_condition = results['top_condition']
     
     # Display main diagnosis
     st.markdown(f"""
@@ -1071,26 +1240,12 @@ def show_diagnosis_results():
     # Differential diagnosis chart
     st.markdown("### 📊 Analiza różnicowa")
     
-    # Create probability chart
+    # Create probability chart (z cache - ten sam wynik nie jest budowany ponownie)
     conditions = list(scores.keys())
     probabilities = [scores[c]['probability'] for c in conditions]
     
-    fig = go.Figure(data=[
-        go.Bar(
-            x=[format_diagnosis_name(c) for c in conditions],
-            y=probabilities,
-            marker_color=['#FF6B6B' if p == max(probabilities) else '#4ECDC4' for p in probabilities]
-        )
-    ])
-    
-    fig.update_layout(
-        title="Prawdopodobieństwo diagnoz",
-        xaxis_title="Diagnoza",
-        yaxis_title="Prawdopodobieństwo (%)",
-        template="plotly_white"
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    chart_json = differential_diagnosis_chart([format_diagnosis_name(c) for c in conditions], probabilities)
+    st.plotly_chart(figure_from_json(chart_json), use_container_width=True)
     
     # Detailed analysis
     col1, col2 = st.columns(2)
@@ -1109,20 +1264,16 @@ def show_diagnosis_results():
     with col2:
         st.markdown("### 🎯 Rekomendacje")
         
-        diagnosis_name = format_diagnosis_name(top_condition[0])
-        recommendations = get_treatment_recommendations(diagnosis_name, st.session_state.assessment_data)
-        
-        for rec in recommendations:
+        for rec in results['recommendations']:
             st.markdown(f"• {rec}")
     
     # Treatment protocol
     st.markdown("### 💊 Protokół leczenia")
     
-    treatment = get_detailed_treatment(top_condition[0], st.session_state.assessment_data)
-    st.markdown(treatment)
+    st.markdown(results['treatment'])
     
     # Referral recommendations
-    referrals = get_referral_recommendations(top_condition[0], st.session_state.assessment_data)
+    referrals = results['referrals']
     if referrals:
         st.markdown("### 🏥 Skierowania")
         for referral in referrals:
@@ -1175,8 +1326,57 @@ def show_original_modules():
     if st.button("🔄 Przełącz na oryginalne moduły GPT"):
         st.info("Funkcja integracji z oryginalnym kodem GPT zostanie dodana.")
 
+def show_analytics_dashboard():
+    st.markdown("## 📊 Dashboard analityczny")
+    
+    db = st.session_state.db
+    if not hasattr(db, 'get_analytics_data'):
+        st.info("📝 Dashboard wymaga bazy SQLite (DatabaseManager) - bieżąca baza demonstracyjna nie zbiera statystyk.")
+        return
+    
+    # Skany dashboardu czytają migawkę analityczną (odświeżaną w tle), nie bazę roboczą
+    analytics = db.get_analytics_data(use_snapshot=True)
+    st.caption(f"Dane z migawki analitycznej - mogą być opóźnione do {SNAPSHOT_MAX_AGE_SECONDS // 60} minut.")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("👥 Aktywni pacjenci", analytics['total_patients'])
+    col2.metric("🩺 Diagnozy (30 dni)", analytics['diagnoses_this_month'])
+    col3.metric("🎯 Średnia pewność", f"{analytics['avg_confidence']:.1f}%")
+    col4.metric("🔬 Najczęstszy moduł", analytics['most_used_module'])
+    
+    # Wykresy z cache - niezmienione dane nie są budowane ponownie
+    charts = analytics_charts(analytics)
+    if not charts:
+        st.info("Brak danych do wykresów.")
+        return
+    
+    chart_names = list(charts.keys())
+    for i in range(0, len(chart_names), 2):
+        columns = st.columns(2)
+        for col, name in zip(columns, chart_names[i:i + 2]):
+            with col:
+                st.plotly_chart(figure_from_json(charts[name]), use_container_width=True)
+
 # ===== HELPER FUNCTIONS =====
 
+def compute_diagnosis_results(engine, findings):
+    """Liczy wyniki, rekomendacje i skierowania (z pamięci podręcznej dla tych samych wyników)"""
+    def compute():
+        scores = engine.calculate_scores(findings)
+        top_condition = max(scores.items(), key=lambda x: x[1]['probability'])
+        diagnosis_name = format_diagnosis_name(top_condition[0])
+        return {
+            'scores': scores,
+            'top_condition': top_condition,
+            'recommendations': get_treatment_recommendations(diagnosis_name, findings),
+            'treatment': get_detailed_treatment(top_condition[0], findings),
+            'referrals': get_referral_recommendations(top_condition[0], findings)
+        }
+    
+    engine_name = type(engine).__name__
+    with diagnosis_duration.labels(engine=engine_name).time(), span('diagnosis.compute', engine=engine_name):
+        return memoized_results(engine_name, engine.rules_version, findings, compute)
+
 def format_diagnosis_name(condition):
     """Formatuje nazwę diagnozy"""
     name_map = {
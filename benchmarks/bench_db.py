@@ -0,0 +1,286 @@
+"""Benchmark warstwy bazy danych (DatabaseManager) w skali kliniki.
+
+Buduje syntetyczne bazy o zadanej liczbie pacjentów (domyślnie 10k, 100k
+i 1M), mierzy wstawianie wsadowe oraz czasy search_patients,
+get_patient_history, get_patient_stats i get_analytics_data, a wynik
+zapisuje w JSON. Dwa pliki JSON (np. z dwóch commitów) można porównać.
+
+Przykład:
+    python benchmarks/bench_db.py run --scales 10000 100000 --json base.json
+    python benchmarks/bench_db.py run --scales 10000 100000 --json head.json
+    python benchmarks/bench_db.py compare base.json head.json --threshold 10
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from database.db_manager import DatabaseManager  # noqa: E402
+from database.duplicates import index_patients  # noqa: E402
+from database.migrations import ENCRYPT_PATIENTS_SQL, backfill_session_findings, encrypt_patient_fields  # noqa: E402
+from database.models import Patient  # noqa: E402
+from synthetic import LAST_NAMES, generate_patients, generate_sessions  # noqa: E402
+
+PATIENT_INSERT = """
+    INSERT INTO patients (
+        first_name, last_name, pesel, birth_date, gender,
+        phone, email, emergency_contact, allergies, medications,
+        medical_history, notes, consent_treatment, consent_data, consent_marketing
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SESSION_INSERT = """
+    INSERT INTO diagnosis_sessions (
+        patient_id, module_type, session_date, therapist_name, primary_diagnosis,
+        confidence_level, treatment_plan, referral_notes, session_notes, is_completed
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+TEST_INSERT = "INSERT INTO test_results (session_id, test_name, test_result) VALUES (?, ?, ?)"
+BATCH_SIZE = 10_000
+# Wersja sposobu wypełniania bazy - bazy zbudowane inną wersją są budowane od nowa
+POPULATE_VERSION = 2
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        'n': len(ordered),
+        'min_ms': round(ordered[0], 4),
+        'median_ms': round(statistics.median(ordered), 4),
+        'p95_ms': round(ordered[p95_index], 4),
+        'mean_ms': round(statistics.fmean(ordered), 4)
+    }
+
+
+def populate(db_path: Path, patients: int, seed: int) -> Dict[str, Dict[str, float]]:
+    """Wypełnia bazę wsadowo i zwraca przepustowość wstawiania.
+
+    Jak przy zapisie przez DatabaseManager każda partia dostaje też dane
+    pochodne: szyfrowanie i pesel_hash (gdy włączone), klucze duplikatów
+    (patient_blocks) i session_findings - te same funkcje, których używają
+    uzupełnienia migracji, w tej samej transakcji co wstawienie.
+    """
+    db = DatabaseManager(str(db_path))
+    rng = random.Random(seed)
+    counts = {'patients': 0, 'sessions': 0, 'test_results': 0}
+    timings = {'patients': 0.0, 'sessions': 0.0}
+
+    with sqlite3.connect(db.db_path) as conn:
+        generator = generate_patients(patients, rng)
+        while True:
+            batch = [row for _, row in zip(range(BATCH_SIZE), generator)]
+            if not batch:
+                break
+
+            started = time.perf_counter()
+            cursor = conn.cursor()
+            first_id = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM patients").fetchone()[0]
+            cursor.executemany(PATIENT_INSERT, batch)
+            rows = cursor.execute(ENCRYPT_PATIENTS_SQL, (first_id - 1, len(batch))).fetchall()
+            encrypt_patient_fields(cursor, rows, db.cipher)
+            index_patients(cursor, [row[:5] for row in rows], replace=False, cipher=db.cipher)
+            conn.commit()
+            timings['patients'] += time.perf_counter() - started
+            counts['patients'] += len(batch)
+
+            last_id = first_id + len(batch) - 1
+            started = time.perf_counter()
+            sessions = []
+            for patient_id in range(first_id, last_id + 1):
+                for row, tests in generate_sessions(patient_id, rng):
+                    session_id = cursor.execute(SESSION_INSERT, row).lastrowid
+                    cursor.executemany(TEST_INSERT, [(session_id, name, result) for name, result in tests])
+                    sessions.append((session_id, row[8]))
+                    counts['test_results'] += len(tests)
+            if sessions:
+                backfill_session_findings(cursor, sessions)
+            counts['sessions'] += len(sessions)
+            conn.commit()
+            timings['sessions'] += time.perf_counter() - started
+
+    (db_path.with_suffix('.meta.json')).write_text(json.dumps({
+        'patients': patients, 'seed': seed, 'counts': counts, 'populate_version': POPULATE_VERSION
+    }))
+    return {
+        'bulk_insert_patients': {
+            'rows': counts['patients'], 'seconds': round(timings['patients'], 3),
+            'rows_per_s': round(counts['patients'] / timings['patients']) if timings['patients'] else None
+        },
+        'bulk_insert_sessions': {
+            'rows': counts['sessions'] + counts['test_results'], 'seconds': round(timings['sessions'], 3),
+            'rows_per_s': round((counts['sessions'] + counts['test_results']) / timings['sessions']) if timings['sessions'] else None
+        }
+    }
+
+
+def ensure_database(workdir: Path, patients: int, seed: int, rebuild: bool) -> Tuple[Path, Dict]:
+    db_path = workdir / f"bench_{patients}_{seed}.db"
+    meta_path = db_path.with_suffix('.meta.json')
+    if db_path.exists() and meta_path.exists() and not rebuild:
+        if json.loads(meta_path.read_text()).get('populate_version') == POPULATE_VERSION:
+            print(f"  używam istniejącej bazy {db_path.name}")
+            return db_path, {}
+        print(f"  baza {db_path.name} zbudowana starszą wersją benchmarku")
+    for path in (db_path, meta_path):
+        if path.exists():
+            path.unlink()
+    print(f"  buduję bazę {db_path.name}...")
+    return db_path, populate(db_path, patients, seed)
+
+
+def time_operation(func: Callable[[int], object], iterations: int) -> Dict[str, float]:
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def bench_scale(db_path: Path, patients: int, iterations: int, seed: int) -> Dict[str, Dict[str, float]]:
+    db = DatabaseManager(str(db_path))
+    rng = random.Random(seed + 1)
+    patient_ids = [rng.randint(1, patients) for _ in range(iterations)]
+    names = [rng.choice(LAST_NAMES)[:5] for _ in range(iterations)]
+    with sqlite3.connect(db.db_path) as conn:
+        pesels = [row[0] for row in conn.execute(
+            "SELECT pesel FROM patients WHERE id IN (%s)" % ",".join("?" * len(patient_ids)), patient_ids)]
+    pesel_prefixes = [pesel[:6] for pesel in pesels] or ["800101"]
+
+    results = {
+        'search_patients_name': time_operation(lambda i: db.search_patients(names[i]), iterations),
+        'search_patients_pesel': time_operation(lambda i: db.search_patients(pesel_prefixes[i % len(pesel_prefixes)]), iterations),
+        'get_patient_history': time_operation(lambda i: db.get_patient_history(patient_ids[i]), iterations),
+        'get_patient_stats': time_operation(lambda i: db.get_patient_stats(patient_ids[i]), iterations),
+        'get_analytics_data': time_operation(lambda i: db.get_analytics_data(), max(3, iterations // 10))
+    }
+
+    # Pojedyncze add_patient (z commitem i log_action) dla porównania z wstawianiem wsadowym.
+    # Daty urodzenia spoza zakresu generatora gwarantują PESEL-e, których nie ma w bazie.
+    new_rows = list(generate_patients(max(10, iterations), random.Random(seed + 2),
+                                      born_from=date(2016, 1, 1), born_to=date(2019, 12, 31)))
+
+    def add_one(i):
+        row = new_rows[i]
+        db.add_patient(Patient(
+            first_name=row[0], last_name=row[1], pesel=row[2],
+            birth_date=date.fromisoformat(row[3]), gender=row[4],
+            consent_treatment=True, consent_data=True
+        ))
+
+    try:
+        results['add_patient'] = time_operation(add_one, len(new_rows))
+    finally:
+        # Przywróć bazę do stanu wyjściowego, aby kolejne uruchomienia były porównywalne
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("DELETE FROM patient_blocks WHERE patient_id > ?", (patients,))
+            conn.execute("DELETE FROM patients WHERE id > ?", (patients,))
+            conn.commit()
+    return results
+
+
+def cmd_run(args) -> int:
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'iterations': args.iterations,
+            'seed': args.seed
+        },
+        'results': {}
+    }
+
+    for patients in args.scales:
+        print(f"Skala {patients} pacjentów:")
+        db_path, insert_stats = ensure_database(workdir, patients, args.seed, args.rebuild)
+        scale_results = bench_scale(db_path, patients, args.iterations, args.seed)
+        scale_results.update(insert_stats)
+        report['results'][str(patients)] = scale_results
+        for name, stats in scale_results.items():
+            if 'median_ms' in stats:
+                print(f"  {name:28s} mediana {stats['median_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms")
+            else:
+                print(f"  {name:28s} {stats['rows_per_s']} wierszy/s ({stats['rows']} w {stats['seconds']} s)")
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.json_path:
+        Path(args.json_path).write_text(output, encoding='utf-8')
+    else:
+        print(output)
+    return 0
+
+
+def cmd_compare(args) -> int:
+    base = json.loads(Path(args.base).read_text(encoding='utf-8'))
+    head = json.loads(Path(args.head).read_text(encoding='utf-8'))
+    print(f"{base['meta']['commit']} -> {head['meta']['commit']} (próg {args.threshold:.1f}%)")
+
+    regressions = 0
+    for scale, head_ops in head['results'].items():
+        base_ops = base['results'].get(scale, {})
+        for name, head_stats in head_ops.items():
+            base_stats = base_ops.get(name)
+            if not base_stats:
+                continue
+            if 'median_ms' in head_stats:
+                before, after = base_stats['median_ms'], head_stats['median_ms']
+                change = (after - before) / before * 100 if before else 0.0
+            else:
+                # Przepustowość - spadek to regresja
+                before, after = base_stats['rows_per_s'], head_stats['rows_per_s']
+                change = (before - after) / before * 100 if before else 0.0
+            flag = "REGRESJA" if change > args.threshold else ""
+            regressions += bool(flag)
+            print(f"  [{scale:>8}] {name:28s} {before:>12} -> {after:>12}  {change:+7.1f}%  {flag}")
+
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='Uruchom benchmark')
+    run.add_argument('--scales', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    run.add_argument('--iterations', type=int, default=50, help='Liczba powtórzeń każdej operacji')
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--workdir', default=str(REPO_ROOT / 'bench_data'), help='Katalog na wygenerowane bazy')
+    run.add_argument('--rebuild', action='store_true', help='Zbuduj bazy od nowa')
+    run.add_argument('--json', dest='json_path', help='Zapisz wynik do pliku JSON')
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser('compare', help='Porównaj dwa wyniki JSON')
+    compare.add_argument('base')
+    compare.add_argument('head')
+    compare.add_argument('--threshold', type=float, default=10.0, help='Próg regresji w %%')
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
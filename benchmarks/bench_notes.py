@@ -0,0 +1,102 @@
+"""Benchmark formatu session_notes: JSON z wcięciami vs format kompaktowy.
+
+Buduje syntetyczną bazę (notatki zapisane po staremu - json.dumps z
+indent=2), kopiuje ją, przepisuje notatki przez compact_session_notes dla
+każdego progu kompresji i po VACUUM porównuje rozmiar pliku, rozmiar
+kolumny session_notes oraz czas odczytu historii pacjenta - bez
+dostępu do notatek i z dekodowaniem notatek każdej sesji.
+
+Przykład:
+    python benchmarks/bench_notes.py --patients 50000 --thresholds 2048 256
+"""
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from database.db_manager import DatabaseManager  # noqa: E402
+from bench_db import ensure_database  # noqa: E402
+
+
+def column_stats(db_path: Path) -> Dict[str, int]:
+    with sqlite3.connect(db_path) as conn:
+        total, compressed = conn.execute(
+            "SELECT SUM(length(session_notes)), SUM(typeof(session_notes) = 'blob') FROM diagnosis_sessions"
+        ).fetchone()
+    return {'file_bytes': db_path.stat().st_size, 'notes_bytes': total or 0, 'compressed_rows': compressed or 0}
+
+
+def time_reads(db_path: Path, patient_ids: List[int]) -> Dict[str, float]:
+    """Mediana czasu get_patient_history na pacjenta (ms) bez i z dekodowaniem notatek"""
+    db = DatabaseManager(str(db_path))
+    history_only, with_notes = [], []
+    for patient_id in patient_ids:
+        started = time.perf_counter()
+        db.get_patient_history(patient_id)
+        history_only.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        for session in db.get_patient_history(patient_id):
+            session.get_session_notes_dict()
+        with_notes.append((time.perf_counter() - started) * 1000)
+    return {
+        'history_median_ms': round(statistics.median(history_only), 4),
+        'history_with_notes_median_ms': round(statistics.median(with_notes), 4),
+        'history_with_notes_total_ms': round(sum(with_notes), 1)
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=50_000)
+    parser.add_argument('--thresholds', type=int, nargs='+', default=[2048, 256],
+                        help='Progi kompresji do porównania (bajty)')
+    parser.add_argument('--reads', type=int, default=2000, help='Liczba odczytanych historii pacjentów')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=str(REPO_ROOT / 'bench_data'))
+    parser.add_argument('--json', dest='json_path', help='Zapisz wyniki do pliku JSON')
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    base_path, _ = ensure_database(workdir, args.patients, args.seed, rebuild=False)
+    rng = random.Random(args.seed + 3)
+    patient_ids = [rng.randint(1, args.patients) for _ in range(args.reads)]
+
+    results = {'indent2': {**column_stats(base_path), **time_reads(base_path, patient_ids)}}
+    for threshold in args.thresholds:
+        compact_path = workdir / f"{base_path.stem}_notes_{threshold}.db"
+        shutil.copyfile(base_path, compact_path)
+        started = time.perf_counter()
+        stats = DatabaseManager(str(compact_path)).compact_session_notes(threshold=threshold)
+        with sqlite3.connect(compact_path) as conn:
+            conn.execute("VACUUM")
+        results[f"compact_{threshold}"] = {
+            **column_stats(compact_path), **time_reads(compact_path, patient_ids),
+            'rewritten': stats['rewritten'], 'migration_s': round(time.perf_counter() - started, 2)
+        }
+        compact_path.unlink()
+
+    base = results['indent2']
+    print(f"{'format':16s} {'plik MB':>9s} {'notatki MB':>11s} {'BLOB':>7s} {'historia ms':>12s} {'+notatki ms':>12s}")
+    for name, r in results.items():
+        print(f"{name:16s} {r['file_bytes'] / 2**20:9.1f} {r['notes_bytes'] / 2**20:11.1f} {r['compressed_rows']:7d} "
+              f"{r['history_median_ms']:12.3f} {r['history_with_notes_median_ms']:12.3f}")
+        r['file_saving_pct'] = round((1 - r['file_bytes'] / base['file_bytes']) * 100, 1)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
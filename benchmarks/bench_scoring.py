@@ -0,0 +1,158 @@
+"""Mikro-benchmark silników punktacji (kolano, staw skokowy, reguły kliniczne).
+
+Generuje pulę losowych, poprawnych wyników badania z list opcji widgetów
+(run_interview / run_physical_examination uruchamiane bezgłowo), a potem
+mierzy latencję (p50/p90/p99), przepustowość i pamięć alokowaną na wywołanie:
+- KneeModule / AnkleModule: calculate_risk_scores + generate_diagnosis
+- ClinicalRule.evaluate dla reguł modułów
+- SimpleDiagnosticEngine.calculate_scores z app.py
+
+Przykład:
+    python benchmarks/bench_scoring.py --iterations 20000
+    python benchmarks/bench_scoring.py --ci --json scoring.json
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from widget_sampler import REPO_ROOT, WidgetSampler, install_sampler, load_module, sample_findings
+
+CI_ITERATIONS = 2000
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(name: str, call: Callable[[int], object], iterations: int, warmup: int, alloc_samples: int) -> Dict:
+    """Mierzy latencję, przepustowość i alokacje funkcji call(i)"""
+    for i in range(warmup):
+        call(i)
+
+    samples = []
+    started_total = time.perf_counter()
+    for i in range(iterations):
+        started = time.perf_counter_ns()
+        call(i)
+        samples.append((time.perf_counter_ns() - started) / 1000)
+    elapsed = time.perf_counter() - started_total
+
+    # Alokacje mierzone osobno - tracemalloc spowalnia wywołania
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(min(alloc_samples, iterations)):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            call(i)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(samples)
+    return {
+        'name': name,
+        'iterations': iterations,
+        'p50_us': round(percentile(ordered, 0.50), 2),
+        'p90_us': round(percentile(ordered, 0.90), 2),
+        'p99_us': round(percentile(ordered, 0.99), 2),
+        'mean_us': round(statistics.fmean(ordered), 2),
+        'throughput_per_s': round(iterations / elapsed) if elapsed else None,
+        'alloc_peak_bytes_per_call': round(statistics.fmean(peaks)) if peaks else None
+    }
+
+
+def build_pool(module_instance, sampler: WidgetSampler, size: int) -> List[Dict]:
+    """Tworzy pulę wyników badania z policzonymi risk_scores"""
+    pool = []
+    for _ in range(size):
+        findings = sample_findings(module_instance, sampler)
+        findings['risk_scores'] = module_instance.calculate_risk_scores(findings)
+        pool.append(findings)
+    return pool
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000, help='Liczba mierzonych wywołań na cel')
+    parser.add_argument('--warmup', type=int, default=500)
+    parser.add_argument('--pool', type=int, default=1000, help='Liczba różnych wylosowanych wyników badania')
+    parser.add_argument('--alloc-samples', type=int, default=500, help='Liczba wywołań mierzonych tracemalloc')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--cache', choices=('off', 'on'), default='off',
+                        help='off mierzy samo generate_diagnosis, on - z pamięcią podręczną diagnoz')
+    parser.add_argument('--ci', action='store_true', help=f'Tryb CI: {CI_ITERATIONS} iteracji, mała rozgrzewka')
+    parser.add_argument('--json', dest='json_path', help='Zapisz wyniki do pliku JSON')
+    args = parser.parse_args()
+
+    if args.ci:
+        args.iterations = min(args.iterations, CI_ITERATIONS)
+        args.warmup = min(args.warmup, 100)
+        args.alloc_samples = min(args.alloc_samples, 200)
+
+    rng = random.Random(args.seed)
+    sampler = WidgetSampler(rng)
+    base_module = load_module('base_module')
+    knee_module = load_module('knee')
+    ankle_module = load_module('ankle')
+    models = load_module('models')
+    install_sampler(sampler, base_module, knee_module, ankle_module)
+
+    sys.path.insert(0, str(REPO_ROOT))
+    from app import SimpleDiagnosticEngine  # noqa: E402
+
+    results = []
+    for module_class in (knee_module.KneeModule, ankle_module.AnkleModule):
+        module_instance = module_class()
+        pool = build_pool(module_instance, sampler, args.pool)
+        diagnose = module_class.generate_diagnosis
+        if args.cache == 'off':
+            diagnose = getattr(diagnose, '__wrapped__', diagnose)
+
+        def score_and_diagnose(i, module_instance=module_instance, pool=pool, diagnose=diagnose):
+            findings = dict(pool[i % len(pool)])
+            findings['risk_scores'] = module_instance.calculate_risk_scores(findings)
+            return diagnose(module_instance, findings)
+
+        results.append(measure(f"{module_class.__name__}.calculate_risk_scores+generate_diagnosis",
+                               score_and_diagnose, args.iterations, args.warmup, args.alloc_samples))
+
+        rules = [models.ClinicalRule(**rule) for rule in module_instance._define_clinical_rules()]
+        exams = [{**f.get('interview', {}), **f.get('physical_exam', {})} for f in pool]
+
+        def evaluate_rules(i, rules=rules, exams=exams):
+            return [rule.evaluate(exams[i % len(exams)]) for rule in rules]
+
+        results.append(measure(f"ClinicalRule.evaluate[{module_class.__name__}] x{len(rules)}",
+                               evaluate_rules, args.iterations, args.warmup, args.alloc_samples))
+
+    engine = SimpleDiagnosticEngine()
+    finding_keys = sorted({key for rules in engine.scoring_rules.values() for key in rules} | {'ottawa_positive', 'locking'})
+    engine_pool = [{key: rng.random() < 0.4 for key in finding_keys} for _ in range(args.pool)]
+    results.append(measure("SimpleDiagnosticEngine.calculate_scores",
+                           lambda i: engine.calculate_scores(engine_pool[i % len(engine_pool)]),
+                           args.iterations, args.warmup, args.alloc_samples))
+
+    for r in results:
+        print(f"{r['name']:70s} p50 {r['p50_us']:8.2f} us  p99 {r['p99_us']:8.2f} us  "
+              f"{r['throughput_per_s']:>9}/s  alloc {r['alloc_peak_bytes_per_call']} B")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps({
+            'seed': args.seed,
+            'cache': args.cache,
+            'results': results
+        }, indent=2, ensure_ascii=False), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""Test obciążeniowy: wielu terapeutów jednocześnie w jednym procesie aplikacji.
+
+Symuluje N równoległych użytkowników przechodzących wizytę:
+wyszukanie pacjenta -> wybór pacjenta -> ocena kolana/stawu skokowego ->
+diagnoza (-> zapis sesji dla SQLite). Liczba użytkowników rośnie
+schodkowo (--users), a dla każdego poziomu raportowane są p50/p95/p99
+każdego kroku i przepustowość wizyt. Punkt nasycenia to poziom, powyżej
+którego dodanie użytkowników nie zwiększa już przepustowości.
+
+Sterowniki:
+- functions (domyślny) - wątki wywołują funkcje workflow bez serwera:
+  metody bazy, formularze modułów wypełniane przez WidgetSampler,
+  compute_diagnosis_results z app.py. Backend: memory (SimpleDatabase,
+  wspólna dla wszystkich) lub sqlite (DatabaseManager na syntetycznej bazie).
+- apptest - każdy użytkownik to streamlit.testing.v1.AppTest z app.py,
+  czyli pełne przebiegi skryptu; app.py ma wbudowaną SimpleDatabase,
+  więc ten sterownik działa tylko z backendem memory.
+
+Przykład:
+    python benchmarks/load_test.py --backend memory sqlite --users 1 2 4 8 16
+    python benchmarks/load_test.py --driver apptest --users 1 2 4 --duration 20
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from widget_sampler import REPO_ROOT, WidgetSampler, install_sampler, load_module, sample_findings
+
+sys.path.insert(0, str(REPO_ROOT))
+
+from bench_db import ensure_database  # noqa: E402
+from synthetic import LAST_NAMES, THERAPISTS, generate_patients  # noqa: E402
+
+STEPS = ('search', 'select', 'assessment', 'diagnosis', 'save')
+# Przyrost przepustowości poniżej tego progu oznacza nasycenie
+SATURATION_GAIN = 0.10
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        'n': len(ordered),
+        'p50_ms': round(percentile(ordered, 0.50), 3),
+        'p95_ms': round(percentile(ordered, 0.95), 3),
+        'p99_ms': round(percentile(ordered, 0.99), 3),
+        'mean_ms': round(statistics.fmean(ordered), 3)
+    }
+
+
+# === BACKENDY ===
+
+def build_memory_backend(patients: int, seed: int):
+    from app import SimpleDatabase, SimplePatient
+    db = SimpleDatabase()
+    for row in generate_patients(patients, random.Random(seed)):
+        db.add_patient(SimplePatient(row[0], row[1], row[2], date.fromisoformat(row[3])))
+    return db
+
+
+def build_sqlite_backend(patients: int, seed: int, workdir: Path, rebuild: bool):
+    from database.db_manager import DatabaseManager
+    db_path, _ = ensure_database(workdir, patients, seed, rebuild)
+    return DatabaseManager(str(db_path))
+
+
+# === STEROWNIK: FUNKCJE WORKFLOW ===
+
+class FunctionVisit:
+    """Jedna wizyta wykonana bezpośrednio na funkcjach workflow"""
+
+    def __init__(self, db, backend: str, patients: int, modules: Dict, sampler: WidgetSampler,
+                 engine, engine_keys: List[str], rng: random.Random):
+        self.db = db
+        self.backend = backend
+        self.patients = patients
+        self.modules = modules
+        self.sampler = sampler
+        self.engine = engine
+        self.engine_keys = engine_keys
+        self.rng = rng
+        self.created_sessions = []
+
+    def run(self, record: Callable[[str, float], None]):
+        from app import compute_diagnosis_results
+
+        def timed(step, func):
+            started = time.perf_counter()
+            result = func()
+            record(step, (time.perf_counter() - started) * 1000)
+            return result
+
+        term = self.rng.choice(LAST_NAMES)[:5]
+        results = timed('search', lambda: self.db.search_patients(term))
+        patient_id = results[0].id if results else self.rng.randint(1, self.patients)
+        patient = timed('select', lambda: self.db.get_patient(patient_id))
+
+        region = self.rng.choice(('knee', 'ankle'))
+        module = self.modules[region]
+
+        def assess():
+            findings = sample_findings(module, self.sampler)
+            findings['risk_scores'] = module.calculate_risk_scores(findings)
+            return findings
+
+        findings = timed('assessment', assess)
+
+        def diagnose():
+            diagnosis = module.generate_diagnosis(findings)
+            # Silnik z app.py ocenia objawy tak/nie z formularzy app.py
+            engine_findings = {key: self.rng.random() < 0.4 for key in self.engine_keys}
+            compute_diagnosis_results(self.engine, engine_findings)
+            return diagnosis
+
+        diagnosis = timed('diagnosis', diagnose)
+
+        if self.backend == 'sqlite' and patient is not None:
+            timed('save', lambda: self._save(patient.id, region, findings, diagnosis))
+
+    def _save(self, patient_id: int, region: str, findings: Dict, diagnosis):
+        from database.models import DiagnosisSession
+        session = DiagnosisSession(patient_id=patient_id, module_type=region,
+                                   session_date=datetime.now(), therapist_name=self.rng.choice(THERAPISTS))
+        session.id = self.db.add_diagnosis_session(session)
+        session.primary_diagnosis = diagnosis.name
+        session.confidence_level = diagnosis.confidence
+        session.set_session_notes_dict(findings)
+        session.is_completed = True
+        self.db.update_diagnosis_session(session)
+        self.created_sessions.append(session.id)
+
+
+def make_function_driver(args, backend: str):
+    from app import SimpleDiagnosticEngine
+    sampler = WidgetSampler(random.Random(args.seed))
+    base_module = load_module('base_module')
+    knee_module = load_module('knee')
+    ankle_module = load_module('ankle')
+    install_sampler(sampler, base_module, knee_module, ankle_module)
+
+    if backend == 'memory':
+        db = build_memory_backend(args.patients, args.seed)
+    else:
+        db = build_sqlite_backend(args.patients, args.seed, Path(args.workdir), args.rebuild)
+    engine = SimpleDiagnosticEngine()
+    engine_keys = sorted({key for rules in engine.scoring_rules.values() for key in rules} | {'ottawa_positive', 'locking'})
+
+    def new_user(user_index: int):
+        modules = {'knee': knee_module.KneeModule(), 'ankle': ankle_module.AnkleModule()}
+        return FunctionVisit(db, backend, args.patients, modules, sampler, engine, engine_keys,
+                             random.Random(args.seed * 1000 + user_index))
+
+    def cleanup(users):
+        if backend != 'sqlite':
+            return
+        import sqlite3
+        ids = [session_id for user in users for session_id in user.created_sessions]
+        with sqlite3.connect(db.db_path) as conn:
+            conn.executemany("DELETE FROM diagnosis_sessions WHERE id = ?", [(i,) for i in ids])
+            conn.commit()
+
+    return new_user, cleanup
+
+
+# === STEROWNIK: STREAMLIT APPTEST ===
+
+class AppTestVisit:
+    """Jedna wizyta wykonana pełnymi przebiegami app.py w AppTest"""
+
+    def __init__(self, db, patients: int, rng: random.Random, timeout: float):
+        self.db = db
+        self.patients = patients
+        self.rng = rng
+        self.timeout = timeout
+
+    def run(self, record: Callable[[str, float], None]):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(str(REPO_ROOT / 'app.py'), default_timeout=self.timeout)
+        at.session_state['db'] = self.db
+        at.session_state['workflow_step'] = 'patient_management'
+
+        def timed(step, func):
+            started = time.perf_counter()
+            func()
+            record(step, (time.perf_counter() - started) * 1000)
+            if at.exception:
+                raise RuntimeError(f"{step}: {at.exception[0].message}")
+
+        timed('search', lambda: self._search(at))
+        ids = (at.session_state['search_results'] or {}).get('ids') if 'search_results' in at.session_state else None
+        patient_id = ids[0] if ids else self.rng.randint(1, self.patients)
+
+        def select():
+            at.session_state['current_patient_id'] = patient_id
+            at.session_state['selected_region'] = self.rng.choice(('knee', 'ankle'))
+            at.session_state['workflow_step'] = 'assessment'
+            at.run()
+
+        timed('select', select)
+        timed('assessment', lambda: self._randomize_widgets(at))
+        timed('diagnosis', lambda: self._click(at, "🎯 Przejdź do diagnozy"))
+
+    def _search(self, at):
+        at.run()
+        at.text_input[0].set_value(self.rng.choice(LAST_NAMES)[:5])
+        self._click(at, "🔍 Szukaj")
+
+    def _click(self, at, label: str):
+        for button in at.button:
+            if button.label == label:
+                button.click()
+                break
+        at.run()
+
+    def _randomize_widgets(self, at):
+        # Terapeuta zmienia kilka odpowiedzi - każda zmiana to w Streamlit kolejny przebieg skryptu
+        for selectbox in self.rng.sample(list(at.selectbox), min(3, len(at.selectbox))):
+            selectbox.set_value(self.rng.choice(selectbox.options))
+        for checkbox in at.checkbox:
+            if self.rng.random() < 0.3:
+                checkbox.check()
+        at.run()
+
+
+def make_apptest_driver(args, backend: str):
+    if backend != 'memory':
+        raise SystemExit("Sterownik apptest obsługuje tylko backend memory (app.py używa SimpleDatabase)")
+    db = build_memory_backend(args.patients, args.seed)
+
+    def new_user(user_index: int):
+        return AppTestVisit(db, args.patients, random.Random(args.seed * 1000 + user_index), args.timeout)
+
+    return new_user, lambda users: None
+
+
+# === PRZEBIEG ===
+
+def run_level(new_user, cleanup, users: int, duration: float, think_time: float) -> Dict:
+    """Uruchamia `users` wątków na `duration` sekund i zbiera czasy kroków"""
+    samples = defaultdict(list)
+    visits_ms = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    visitors = [new_user(i) for i in range(users)]
+    start_barrier = threading.Barrier(users)
+
+    def user_loop(visitor):
+        local = defaultdict(list)
+        local_visits = []
+        start_barrier.wait()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                visitor.run(lambda step, ms: local[step].append(ms))
+            except Exception as error:
+                with lock:
+                    errors.append(f"{type(error).__name__}: {error}")
+                continue
+            local_visits.append((time.perf_counter() - started) * 1000)
+            if think_time:
+                time.sleep(think_time)
+        with lock:
+            for step, values in local.items():
+                samples[step].extend(values)
+            visits_ms.extend(local_visits)
+
+    threads = [threading.Thread(target=user_loop, args=(visitor,)) for visitor in visitors]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    cleanup(visitors)
+
+    return {
+        'users': users,
+        'visits': len(visits_ms),
+        'errors': len(errors),
+        'first_errors': errors[:3],
+        'throughput_visits_per_s': round(len(visits_ms) / elapsed, 2),
+        'visit': summarize(visits_ms) if visits_ms else None,
+        'steps': {step: summarize(samples[step]) for step in STEPS if samples.get(step)}
+    }
+
+
+def saturation_point(levels: List[Dict], slo_ms: float) -> Dict:
+    """Ostatni poziom, na którym przepustowość jeszcze rosła i p95 wizyty mieściło się w SLO"""
+    best = levels[0]
+    for previous, current in zip(levels, levels[1:]):
+        gain = (current['throughput_visits_per_s'] - previous['throughput_visits_per_s']) / (previous['throughput_visits_per_s'] or 1)
+        if gain < SATURATION_GAIN or not current['visit'] or current['visit']['p95_ms'] > slo_ms:
+            break
+        best = current
+    return {
+        'users': best['users'],
+        'throughput_visits_per_s': best['throughput_visits_per_s'],
+        'visit_p95_ms': best['visit']['p95_ms'] if best['visit'] else None
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--driver', choices=('functions', 'apptest'), default='functions')
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), nargs='+', default=['memory', 'sqlite'])
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help='Poziomy współbieżności')
+    parser.add_argument('--duration', type=float, default=10.0, help='Czas trwania każdego poziomu (s)')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Przerwa użytkownika między wizytami (s)')
+    parser.add_argument('--patients', type=int, default=10_000, help='Liczba pacjentów w bazie')
+    parser.add_argument('--slo-ms', type=float, default=2000.0, help='Dopuszczalne p95 całej wizyty')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Limit czasu przebiegu AppTest (s)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workdir', default=str(REPO_ROOT / 'bench_data'), help='Katalog na bazy SQLite')
+    parser.add_argument('--rebuild', action='store_true', help='Zbuduj bazę SQLite od nowa')
+    parser.add_argument('--json', dest='json_path', help='Zapisz wyniki do pliku JSON')
+    args = parser.parse_args()
+    Path(args.workdir).mkdir(parents=True, exist_ok=True)
+
+    report = {'meta': {'driver': args.driver, 'duration_s': args.duration, 'patients': args.patients,
+                       'think_time_s': args.think_time, 'seed': args.seed}, 'backends': {}}
+    for backend in args.backend:
+        print(f"Backend {backend} ({args.driver}):")
+        make_driver = make_apptest_driver if args.driver == 'apptest' else make_function_driver
+        new_user, cleanup = make_driver(args, backend)
+
+        levels = []
+        for users in args.users:
+            level = run_level(new_user, cleanup, users, args.duration, args.think_time)
+            levels.append(level)
+            steps = "  ".join(f"{step} {stats['p50_ms']:.1f}/{stats['p95_ms']:.1f}/{stats['p99_ms']:.1f}"
+                              for step, stats in level['steps'].items())
+            print(f"  {users:4d} użytk.  {level['throughput_visits_per_s']:8.2f} wizyt/s  "
+                  f"błędy {level['errors']}  [p50/p95/p99 ms] {steps}")
+            for error in level['first_errors']:
+                print(f"        {error}")
+
+        saturation = saturation_point(levels, args.slo_ms)
+        print(f"  Nasycenie: {saturation['users']} użytkowników, {saturation['throughput_visits_per_s']} wizyt/s")
+        report['backends'][backend] = {'levels': levels, 'saturation': saturation}
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Benchmark czasu startu aplikacji na podstawie `python -X importtime`.
+
+Uruchamia `import app` w świeżym interpreterze kilka razy, sumuje czasy
+importów najwyższego poziomu i porównuje medianę z budżetem lub z
+poprzednim wynikiem zapisanym w JSON. Dla każdego modułu (na dowolnym
+poziomie zagnieżdżenia) raportuje medianę czasu kumulatywnego i własnego
+oraz moduł, który go zaimportował.
+
+Przykład:
+    python benchmarks/startup_importtime.py --runs 5 --budget-ms 1500
+    python benchmarks/startup_importtime.py --json startup.json --baseline old.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_importtime(module: str) -> List[Tuple[int, int, int, str]]:
+    """Uruchamia import modułu z -X importtime i zwraca (self_us, cumulative_us, głębokość, nazwa)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import {module} nie powiódł się:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        # Nazwa poprzedzona spacją i dwiema spacjami na każdy poziom zagnieżdżenia
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((int(parts[0]), int(parts[1]), depth, name.strip()))
+    return entries
+
+
+def summarize(entries: List[Tuple[int, int, int, str]]) -> Dict[str, Dict[str, Any]]:
+    """Czasy każdego modułu: własny, kumulatywny (z importami zagnieżdżonymi), głębokość i importujący.
+
+    importtime wypisuje moduł po jego importach zagnieżdżonych, więc
+    importującym jest najbliższy kolejny wpis o mniejszej głębokości.
+    """
+    modules: Dict[str, Dict[str, Any]] = {}
+    waiting: List[str] = []
+    for self_us, cumulative, depth, name in entries:
+        # Wpisy głębsze niż bieżący czekały na swojego importującego - właśnie go znaleźliśmy
+        while waiting and modules[waiting[-1]]['depth'] > depth:
+            modules[waiting.pop()]['parent'] = name
+        modules[name] = {'self_us': self_us, 'cumulative_us': cumulative, 'depth': depth, 'parent': None}
+        waiting.append(name)
+    return modules
+
+
+def top_level_total(modules: Dict[str, Dict[str, Any]]) -> int:
+    """Łączny czas importu - suma czasów kumulatywnych modułów najwyższego poziomu"""
+    return sum(info['cumulative_us'] for info in modules.values() if info['depth'] == 0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="Moduł do zaimportowania (domyślnie app)")
+    parser.add_argument("--runs", type=int, default=5, help="Liczba uruchomień")
+    parser.add_argument("--top", type=int, default=20, help="Ile najcięższych modułów pokazać")
+    parser.add_argument("--budget-ms", type=float, help="Budżet mediany czasu importu w ms")
+    parser.add_argument("--json", dest="json_path", help="Zapisz wynik do pliku JSON")
+    parser.add_argument("--baseline", help="Plik JSON z poprzednim wynikiem do porównania")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Dopuszczalny wzrost względem baseline (%%)")
+    args = parser.parse_args()
+
+    totals = []
+    per_module: Dict[str, Dict[str, Any]] = {}
+    for _ in range(args.runs):
+        modules = summarize(run_importtime(args.module))
+        totals.append(top_level_total(modules) / 1000)
+        for name, info in modules.items():
+            samples = per_module.setdefault(name, {'self_us': [], 'cumulative_us': [], 'parent': info['parent']})
+            samples['self_us'].append(info['self_us'])
+            samples['cumulative_us'].append(info['cumulative_us'])
+
+    median_total = statistics.median(totals)
+    heaviest = sorted(
+        ((name, statistics.median(samples['cumulative_us']) / 1000, statistics.median(samples['self_us']) / 1000,
+          samples['parent']) for name, samples in per_module.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:args.top]
+
+    print(f"import {args.module}: mediana {median_total:.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, n={args.runs})")
+    print(f"  {'kumulatywnie':>12}  {'własny':>9}  moduł (importowany przez)")
+    for name, cumulative_ms, self_ms, parent in heaviest:
+        print(f"  {cumulative_ms:9.1f} ms  {self_ms:6.1f} ms  {name}" + (f"  ({parent})" if parent else ""))
+
+    result = {
+        "module": args.module,
+        "runs": args.runs,
+        "median_total_ms": round(median_total, 2),
+        "totals_ms": [round(t, 2) for t in totals],
+        "heaviest": [
+            {"module": name, "median_ms": round(cumulative_ms, 2), "self_median_ms": round(self_ms, 2), "parent": parent}
+            for name, cumulative_ms, self_ms, parent in heaviest
+        ],
+    }
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    exit_code = 0
+    if args.budget_ms is not None and median_total > args.budget_ms:
+        print(f"BŁĄD: przekroczono budżet {args.budget_ms:.1f} ms")
+        exit_code = 1
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        previous = baseline["median_total_ms"]
+        change = (median_total - previous) / previous * 100 if previous else 0.0
+        print(f"Zmiana względem baseline: {change:+.1f}% ({previous:.1f} ms -> {median_total:.1f} ms)")
+        if change > args.tolerance:
+            print(f"BŁĄD: regresja powyżej {args.tolerance:.1f}%")
+            exit_code = 1
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Generator syntetycznych danych kliniki dla benchmarków.
+
+Tworzy pacjentów z poprawnymi numerami PESEL (suma kontrolna, kodowanie
+stulecia w miesiącu, płeć w 10. cyfrze), sesje kolana/stawu skokowego z
+session_notes w formacie JSON oraz wyniki testów.
+"""
+import json
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+PESEL_WEIGHTS = (1, 3, 7, 9, 1, 3, 7, 9, 1, 3)
+# Przesunięcie miesiąca w PESEL dla stulecia urodzenia
+CENTURY_MONTH_OFFSET = {1800: 80, 1900: 0, 2000: 20, 2100: 40, 2200: 60}
+
+FIRST_NAMES_M = ["Jan", "Piotr", "Krzysztof", "Andrzej", "Tomasz", "Paweł", "Michał", "Marcin", "Jakub", "Łukasz"]
+FIRST_NAMES_K = ["Anna", "Maria", "Katarzyna", "Małgorzata", "Agnieszka", "Barbara", "Ewa", "Magdalena", "Joanna", "Zofia"]
+LAST_NAMES = ["Nowak", "Kowalski", "Wiśniewski", "Wójcik", "Kowalczyk", "Kamiński", "Lewandowski", "Zieliński",
+              "Szymański", "Woźniak", "Dąbrowski", "Kozłowski", "Jankowski", "Mazur", "Kwiatkowski", "Krawczyk"]
+THERAPISTS = ["mgr Anna Fizjo", "mgr Piotr Ruch", "dr Ewa Staw", "mgr Tomasz Kolano", "mgr Zofia Kostka", "dr Jan Więzadło"]
+
+KNEE_MECHANISMS = ["Kontakt z rotacją (pivot)", "Bez kontaktu z rotacją", "Hiperextensja", "Stres kątowy (valgus/varus)",
+                   "Bezpośredni uraz przodu kolana", "Przeciążenie/overuse", "Nieznany"]
+ANKLE_MECHANISMS = ["Inwersja (skręcenie do wewnątrz)", "Ewersja (skręcenie na zewnątrz)", "Dorsiflexja + rotacja zewnętrzna",
+                    "Nadmierna plantarflexion", "Bezpośredni uraz/uderzenie", "Nieznany"]
+KNEE_TESTS = ["Test Lachmana (ACL)", "Test szuflady przedniej (ACL)", "Test szuflady tylnej (PCL)",
+              "Test McMurraya (łąkotki)", "Test Thessaly", "Test kompresji rzepki"]
+ANKLE_TESTS = ["Test szuflady przedniej (ATFL)", "Test talar tilt (CFL)", "Test Thompson'a"]
+TEST_RESULTS = ["Negatywny", "Pozytywny", "Nieokreślony"]
+KNEE_DIAGNOSES = ["Uszkodzenie więzadła krzyżowego przedniego (ACL)", "Podejrzenie uszkodzenia ACL",
+                  "Uszkodzenie łąkotki", "Zespół bólu rzepkowo-udowego", "Nieokreślone uszkodzenie kolana"]
+ANKLE_DIAGNOSES = ["Skręcenie więzadeł bocznych stawu skokowego - stopień I",
+                   "Skręcenie więzadeł bocznych stawu skokowego - stopień II",
+                   "Podejrzenie zerwania ścięgna Achillesa", "Podejrzenie złamania (wskazania do RTG)"]
+
+
+def pesel_checksum(digits: str) -> int:
+    """Liczy cyfrę kontrolną dla pierwszych 10 cyfr PESEL"""
+    total = sum(int(d) * w for d, w in zip(digits, PESEL_WEIGHTS))
+    return (10 - total % 10) % 10
+
+
+def make_pesel(birth_date: date, gender: str, serial: int) -> str:
+    """Buduje poprawny PESEL dla daty urodzenia, płci ('M'/'K') i numeru kolejnego (0-4999)"""
+    century = birth_date.year // 100 * 100
+    month = birth_date.month + CENTURY_MONTH_OFFSET[century]
+    gender_digit = (serial % 5) * 2 + (1 if gender == 'M' else 0)
+    body = f"{birth_date.year % 100:02d}{month:02d}{birth_date.day:02d}{serial // 5 % 1000:03d}{gender_digit}"
+    return body + str(pesel_checksum(body))
+
+
+def generate_patients(count: int, rng: random.Random, used_pesels: Optional[Set[str]] = None,
+                      born_from: date = date(1930, 1, 1), born_to: date = date(2015, 12, 31)) -> Iterator[Tuple]:
+    """Generuje krotki pacjentów w kolejności kolumn INSERT tabeli patients"""
+    used_pesels = used_pesels if used_pesels is not None else set()
+    start = born_from
+    span_days = (born_to - born_from).days
+
+    for _ in range(count):
+        gender = rng.choice(('M', 'K'))
+        while True:
+            birth_date = start + timedelta(days=rng.randrange(span_days))
+            pesel = make_pesel(birth_date, gender, rng.randrange(5000))
+            if pesel not in used_pesels:
+                used_pesels.add(pesel)
+                break
+
+        first_name = rng.choice(FIRST_NAMES_M if gender == 'M' else FIRST_NAMES_K)
+        last_name = rng.choice(LAST_NAMES)
+        if gender == 'K' and last_name.endswith('ski'):
+            last_name = last_name[:-1] + 'a'
+
+        yield (
+            first_name, last_name, pesel, birth_date.isoformat(), gender,
+            f"+48 {rng.randrange(500, 900)} {rng.randrange(100, 1000)} {rng.randrange(100, 1000)}",
+            f"{first_name.lower()}.{rng.randrange(10 ** 6)}@example.com",
+            None, rng.choice([None, "Brak", "Penicylina"]), rng.choice([None, "Brak", "Ibuprofen"]),
+            None, None, True, True, rng.random() < 0.3
+        )
+
+
+def generate_session_notes(module_type: str, rng: random.Random) -> Dict:
+    """Generuje session_notes w formacie zapisywanym przez moduły diagnostyczne"""
+    tests = KNEE_TESTS if module_type == 'knee' else ANKLE_TESTS
+    test_results = {name: rng.choice(TEST_RESULTS) for name in rng.sample(tests, rng.randint(0, len(tests)))}
+
+    if module_type == 'knee':
+        interview = {
+            'mechanism': rng.choice(KNEE_MECHANISMS),
+            'pop_sound': rng.choice(["Tak, wyraźny trzask", "Możliwe", "Nie", "Nie pamiętam"]),
+            'immediate_swelling': rng.choice(["Natychmiast (w ciągu minut)", "W ciągu godzin", "Stopniowo", "Brak obrzęku"]),
+            'pain_intensity': rng.randint(0, 10),
+            'giving_way': rng.random() < 0.3,
+            'locking': rng.random() < 0.2,
+            'pain_locations': rng.sample(["Przód kolana (anterior)", "Strona przyśrodkowa", "Strona boczna", "Pod rzepką"], rng.randint(0, 3))
+        }
+        risk_scores = {
+            'acl_injury_risk': rng.randint(0, 25),
+            'meniscus_injury_risk': rng.randint(0, 20),
+            'patellofemoral_risk': rng.randint(0, 15)
+        }
+        exam = {'swelling': rng.choice(["Brak", "Mały", "Umiarkowany", "Znaczny", "Napięty"]), 'test_results': test_results}
+    else:
+        interview = {
+            'mechanism': rng.choice(ANKLE_MECHANISMS),
+            'time_since_injury': rng.choice(["Ostry (0-72h)", "Podostrych (3-14 dni)", "Przewlekły (>2 tygodnie)"]),
+            'pain_intensity': rng.randint(0, 10),
+            'pain_locations': rng.sample(["Kostka boczna (lateral)", "Kostka przyśrodkowa (medial)", "Tył stawu/Achilles (posterior)"], rng.randint(0, 2)),
+            'chronic_instability': rng.random() < 0.2
+        }
+        risk_scores = {
+            'lateral_sprain_risk': rng.randint(0, 20),
+            'achilles_rupture_risk': rng.randint(0, 15),
+            'ottawa_fracture_risk': rng.randint(0, 5)
+        }
+        exam = {
+            'swelling': rng.choice(["Brak", "Mały", "Umiarkowany", "Znaczny"]),
+            'unable_to_bear_weight': rng.random() < 0.15,
+            'tender_lateral_malleolus': rng.random() < 0.3,
+            'test_results': test_results
+        }
+
+    return {'interview': interview, 'physical_exam': exam, 'risk_scores': risk_scores}
+
+
+def generate_sessions(patient_id: int, rng: random.Random, max_sessions: int = 4) -> Iterator[Tuple[Tuple, List[Tuple[str, str]]]]:
+    """Generuje sesje pacjenta wraz z wynikami testów.
+
+    Zwraca krotki (wiersz diagnosis_sessions, lista (test_name, test_result)).
+    Notatki zapisywane są tak jak w DiagnosisSession.set_session_notes_dict.
+    """
+    for _ in range(rng.randint(0, max_sessions)):
+        module_type = rng.choice(('knee', 'ankle'))
+        notes = generate_session_notes(module_type, rng)
+        session_date = datetime(2020, 1, 1) + timedelta(minutes=rng.randrange(6 * 365 * 24 * 60))
+        diagnosis = rng.choice(KNEE_DIAGNOSES if module_type == 'knee' else ANKLE_DIAGNOSES)
+        row = (
+            patient_id, module_type, session_date.isoformat(sep=' '), rng.choice(THERAPISTS),
+            diagnosis, round(rng.uniform(40, 95), 1), "Plan leczenia: fizjoterapia, kontrola",
+            None, json.dumps(notes, ensure_ascii=False, indent=2), rng.random() < 0.9
+        )
+        tests = list(notes['physical_exam']['test_results'].items())
+        yield row, tests
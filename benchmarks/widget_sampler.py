@@ -0,0 +1,105 @@
+"""Bezgłowe wywoływanie formularzy modułów diagnostycznych.
+
+WidgetSampler udaje API Streamlit używane w run_interview /
+run_physical_examination i zwraca losowe, ale poprawne wartości z list
+opcji widgetów. Podstawiony za `st` w modułach pozwala generować
+realistyczne słowniki wyników badania bez uruchamiania serwera.
+"""
+import importlib
+import random
+import sys
+import types
+from contextlib import nullcontext
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# Moduły diagnostyczne importują modele przez `..database.models`, więc
+# ładujemy katalog repozytorium jako podpakiet sztucznego pakietu nadrzędnego
+PARENT_PACKAGE = 'fizjo'
+
+
+class _SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class WidgetSampler:
+    """Zastępuje `st` i losuje wartości widgetów"""
+
+    def __init__(self, rng: random.Random, checkbox_probability: float = 0.3):
+        self.rng = rng
+        self.checkbox_probability = checkbox_probability
+        self.session_state = _SessionState()
+
+    # === WIDGETY ZWRACAJĄCE WARTOŚCI ===
+
+    def selectbox(self, label, options, *args, **kwargs):
+        return self.rng.choice(list(options))
+
+    def radio(self, label, options, *args, **kwargs):
+        return self.rng.choice(list(options))
+
+    def multiselect(self, label, options, *args, **kwargs):
+        options = list(options)
+        return self.rng.sample(options, self.rng.randint(0, min(3, len(options))))
+
+    def slider(self, label, min_value=0, max_value=10, value=None, *args, **kwargs):
+        return self.rng.randint(min_value, max_value)
+
+    def checkbox(self, label, *args, **kwargs):
+        return self.rng.random() < self.checkbox_probability
+
+    def text_input(self, label, *args, **kwargs):
+        return ""
+
+    def text_area(self, label, *args, **kwargs):
+        return ""
+
+    def button(self, label, *args, **kwargs):
+        return False
+
+    # === UKŁAD STRONY ===
+
+    def columns(self, spec, *args, **kwargs):
+        count = spec if isinstance(spec, int) else len(spec)
+        return [nullcontext() for _ in range(count)]
+
+    def expander(self, *args, **kwargs):
+        return nullcontext()
+
+    def tabs(self, labels, *args, **kwargs):
+        return [nullcontext() for _ in labels]
+
+    def __getattr__(self, name):
+        # markdown, write, error, warning, progress, video, image... - bez efektu
+        return lambda *args, **kwargs: None
+
+
+def load_module(name: str) -> types.ModuleType:
+    """Importuje moduł z katalogu database/ jako część pakietu nadrzędnego"""
+    if PARENT_PACKAGE not in sys.modules:
+        parent = types.ModuleType(PARENT_PACKAGE)
+        parent.__path__ = [str(REPO_ROOT)]
+        sys.modules[PARENT_PACKAGE] = parent
+    return importlib.import_module(f"{PARENT_PACKAGE}.database.{name}")
+
+
+def install_sampler(sampler: WidgetSampler, *modules: types.ModuleType):
+    """Podstawia sampler za `st` w podanych modułach"""
+    for module in modules:
+        module.st = sampler
+
+
+def sample_findings(module_instance, sampler: WidgetSampler, mode: str = "specialist") -> dict:
+    """Wypełnia wywiad i badanie fizykalne modułu losowymi wartościami widgetów"""
+    findings = {}
+    findings.update(module_instance.run_interview(None, mode))
+    if mode == "specialist":
+        findings.update(module_instance.run_physical_examination(None, mode))
+    return findings
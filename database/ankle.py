@@ -1,12 +1,15 @@
 import streamlit as st
 from typing import Dict, List, Any, Optional
 from .base_module import BaseModule, AssessmentStep
+from .diagnosis_cache import memoized_diagnosis
 from ..database.models import Patient, DiagnosticTest, Diagnosis
 import json
 
 class AnkleModule(BaseModule):
     """Moduł diagnostyczny dla stawu skokowego"""
     
+    SCORING_RULES_VERSION = "1.0"
+    
     def __init__(self):
         super().__init__("Staw skokowy", "🦶")
     
@@ -594,6 +597,7 @@ class AnkleModule(BaseModule):
         
         return scores
     
+    @memoized_diagnosis
     def generate_diagnosis(self, findings: Dict[str, Any]) -> Diagnosis:
         """Generuje diagnozę dla stawu skokowego"""
         risk_scores = findings.get('risk_scores', {})
@@ -0,0 +1,244 @@
+import asyncio
+import contextvars
+import sqlite3
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .db_manager import DatabaseManager
+from .models import LazyDiagnosisSession
+
+# Wątki czytające i limit zadań oczekujących (wywołań ponad limit czekają na wolne miejsce)
+DEFAULT_READERS = 4
+DEFAULT_MAX_PENDING = 32
+BUSY_TIMEOUT_MS = 5000
+
+# Metody uruchamiające własne wątki - nie mają sensu w wersji async
+EXCLUDED_METHODS = frozenset({'start_backup_schedule', 'start_log_maintenance'})
+
+
+class PooledDatabaseManager(DatabaseManager):
+    """DatabaseManager ze stałym połączeniem na wątek (zamiast nowego połączenia na wywołanie)"""
+
+    def __init__(self, db_path: str, auto_migrate: bool = True):
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        super().__init__(db_path, auto_migrate)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            try:
+                conn.in_transaction
+            except sqlite3.ProgrammingError:
+                # Połączenie zamknięte przez metodę (migracje, archiwum, kopie) - usuwamy z puli i otwieramy nowe
+                with self._connections_lock:
+                    self._connections.remove(conn)
+                conn = None
+            else:
+                # Przywracamy ustawienia, które metody zmieniają na połączeniu
+                conn.row_factory = None
+                conn.isolation_level = ''
+        if conn is None:
+            factory = self.instrumentation.connection_class if self.instrumentation else sqlite3.Connection
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=factory)
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _close_connection(self, conn: sqlite3.Connection):
+        # Połączenie wątku zostaje w puli do close_connections
+        if conn is not getattr(self._local, 'conn', None):
+            conn.close()
+
+    def current_connection(self) -> Optional[sqlite3.Connection]:
+        return getattr(self._local, 'conn', None)
+
+    def close(self):
+        super().close()
+        self.close_connections()
+
+    def close_connections(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._connections.clear()
+
+
+class _Job:
+    """Wywołanie metody w wątku puli; pamięta połączenie, aby móc je przerwać"""
+
+    def __init__(self, db: PooledDatabaseManager, method: Callable, args: tuple, kwargs: Dict[str, Any]):
+        self.db = db
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        # Kontekst wywołującego - spany database.tracing zagnieżdżają się pod jego spanem
+        self.context = contextvars.copy_context()
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def run(self):
+        with self._lock:
+            if self._cancelled:
+                raise asyncio.CancelledError()
+            self.conn = self.db._connect()
+        try:
+            return self.context.run(self.method, *self.args, **self.kwargs)
+        finally:
+            with self._lock:
+                self.conn = None
+
+    def interrupt(self):
+        with self._lock:
+            self._cancelled = True
+            if self.conn is not None:
+                self.conn.interrupt()
+
+
+class AsyncDatabaseManager:
+    """Asynchroniczna fasada DatabaseManager.
+
+    Każda publiczna metoda DatabaseManager jest dostępna jako korutyna, np.
+    `await db.get_patient(1)`. Odczyty wykonuje pula readers wątków (każdy
+    z własnym połączeniem), zapisy - jeden wątek, więc zapisy nie
+    konkurują o blokadę między sobą. Baza pracuje w trybie WAL, w którym
+    odczyty nie czekają na zapis. Najwyżej max_pending wywołań jest
+    w toku - kolejne czekają (backpressure). Anulowanie zadania przerywa
+    trwające zapytanie odczytu (Connection.interrupt); rozpoczęty zapis
+    kończy się normalnie. Pola sesji LazyDiagnosisSession doładowuje
+    `await db.load_session_details(sessions)`.
+    """
+
+    def __init__(self, db_path: str = "fizjo_expert.db", readers: int = DEFAULT_READERS,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.db_path = Path(db_path)
+        # WAL jest trwałym ustawieniem pliku bazy - odczyty nie czekają na zapis
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+        self.db = PooledDatabaseManager(str(db_path))
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self.max_pending = max_pending
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._closed = False
+
+    async def __aenter__(self) -> 'AsyncDatabaseManager':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def __getattr__(self, name: str):
+        if name.startswith('_') or name in EXCLUDED_METHODS:
+            raise AttributeError(name)
+        method = getattr(self.db, name)
+        if not callable(method):
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            return await self.run(name, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    @property
+    def pending(self) -> int:
+        """Liczba wywołań w toku (wykonywanych lub czekających w kolejce puli)"""
+        return self._pending
+
+    def is_write(self, name: str) -> bool:
+        """Metoda oznaczona w DatabaseManager dekoratorem write_method"""
+        return getattr(getattr(type(self.db), name, None), 'is_write_method', False)
+
+    def _release(self):
+        self._pending -= 1
+        self._semaphore.release()
+
+    async def run(self, name: str, *args, **kwargs) -> Any:
+        """Wykonuje metodę DatabaseManager w puli wątków"""
+        if self._closed:
+            raise RuntimeError("AsyncDatabaseManager jest zamknięty")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        loop = asyncio.get_running_loop()
+        is_write = self.is_write(name)
+        executor = self._writer if is_write else self._readers
+        job = _Job(self.db, getattr(self.db, name), args, kwargs)
+
+        await self._semaphore.acquire()
+        self._pending += 1
+        try:
+            future = executor.submit(job.run)
+        except BaseException:
+            self._release()
+            raise
+        # Miejsce zwalnia dopiero koniec pracy wątku - także po anulowaniu
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not is_write:
+                job.interrupt()
+            raise
+        return self._bind_loaders(result)
+
+    def _bind_loaders(self, result: Any) -> Any:
+        """Sesje LazyDiagnosisSession doładowują pola w puli odczytów, nie w wątku pętli zdarzeń"""
+        for session in result if isinstance(result, list) else [result]:
+            if isinstance(session, LazyDiagnosisSession):
+                session._loader = self._load_details_in_pool
+        return result
+
+    def _load_details_in_pool(self, session_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            warnings.warn("Dostęp do pól sesji blokuje pętlę zdarzeń - użyj await db.load_session_details(...)",
+                          RuntimeWarning, stacklevel=4)
+        return self._readers.submit(self.db.get_session_details, session_id).result()
+
+    async def load_session_details(self, sessions: List[LazyDiagnosisSession]) -> List[LazyDiagnosisSession]:
+        """Doładowuje pola HEAVY_SESSION_FIELDS sesji z historii (równolegle, w puli odczytów)"""
+        pending = [session for session in sessions
+                   if isinstance(session, LazyDiagnosisSession) and not session.details_loaded]
+        details = await asyncio.gather(*(self.get_session_details(session.id) for session in pending))
+        for session, session_details in zip(pending, details):
+            session.apply_details(session_details)
+        return sessions
+
+    async def get_patient_card(self, patient_id: int, history_limit: int = 20) -> Dict[str, Any]:
+        """Dane karty pacjenta - niezależne odczyty wykonywane równolegle"""
+        patient, history, stats = await asyncio.gather(
+            self.get_patient(patient_id),
+            self.get_patient_history_summary(patient_id, history_limit),
+            self.get_patient_stats(patient_id)
+        )
+        return {'patient': patient, 'history': history, 'stats': stats}
+
+    async def close(self):
+        """Czeka na zakończenie wywołań w toku i zamyka połączenia"""
+        if self._closed:
+            return
+        self._closed = True
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        self.db.close()
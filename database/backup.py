@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Strony kopiowane w jednym kroku - pomiędzy krokami blokada odczytu jest zwalniana
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_PAUSE_SECONDS = 0.005
+# Po tylu restartach kopii (zapisy w trakcie kopiowania) reszta jest kopiowana w jednym kroku
+BACKUP_MAX_RESTARTS = 3
+# Wiek migawki analitycznej, po którym get_analytics_data(use_snapshot=True) odświeża ją w tle
+SNAPSHOT_MAX_AGE_SECONDS = 15 * 60
+
+
+class BackupRestarted(Exception):
+    """Kopia krokowa restartowała się zbyt często"""
+
+
+def online_backup(connect: Callable[[], sqlite3.Connection], target_path: Path,
+                  pages_per_step: int = BACKUP_PAGES_PER_STEP, pause: float = BACKUP_PAUSE_SECONDS,
+                  progress: Optional[Callable[[int, int], None]] = None,
+                  max_restarts: int = BACKUP_MAX_RESTARTS) -> Dict[str, Any]:
+    """Kopiuje bazę przez sqlite3 backup API, pages_per_step stron na krok.
+
+    Między krokami kopia nie trzyma żadnej blokady, więc zapisy aplikacji
+    nie czekają dłużej niż jeden krok. Zapis z innego połączenia w trakcie
+    kopiowania powoduje, że SQLite zaczyna kopię od nowa - przy ciągłym
+    ruchu kopia zaczynałaby się bez końca, więc po max_restarts restartach
+    baza jest kopiowana w jednym kroku (blokada odczytu na czas całej
+    kopii, w trybie WAL zapisy nie czekają). Kopia powstaje w pliku
+    tymczasowym i dopiero kompletna zastępuje plik docelowy (os.replace),
+    więc nigdy nie zostaje urwana kopia.
+    """
+    target_path = Path(target_path)
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target_path.with_name(target_path.name + '.tmp')
+    if temp_path.exists():
+        temp_path.unlink()
+
+    stats = {'steps': 0, 'pages': 0, 'restarts': 0, 'single_step': False}
+    last_remaining = [None]
+
+    def on_step(status, remaining, total):
+        stats['steps'] += 1
+        stats['pages'] = total
+        # Zapis z innego połączenia cofa kopię na początek - liczba pozostałych stron rośnie
+        if last_remaining[0] is not None and remaining > last_remaining[0]:
+            stats['restarts'] += 1
+            if stats['restarts'] > max_restarts:
+                raise BackupRestarted()
+        last_remaining[0] = remaining
+        if progress:
+            progress(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    started = time.perf_counter()
+    source = connect()
+    target = sqlite3.connect(temp_path)
+    try:
+        try:
+            source.backup(target, pages=pages_per_step, progress=on_step)
+        except BackupRestarted:
+            stats['single_step'] = True
+            source.backup(target)
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+        source.close()
+    os.replace(temp_path, target_path)
+
+    stats['bytes'] = target_path.stat().st_size
+    stats['duration_s'] = round(time.perf_counter() - started, 3)
+    stats['path'] = str(target_path)
+    return stats
+
+
+class BackupScheduler(threading.Thread):
+    """Wątek w tle tworzący kopię co interval sekund i zostawiający keep najnowszych"""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], directory: Path, prefix: str,
+                 interval: float, keep: int, pages_per_step: int = BACKUP_PAGES_PER_STEP):
+        super().__init__(name='db-backup', daemon=True)
+        self.connect = connect
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.interval = interval
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+
+    def backups(self) -> List[Path]:
+        """Kopie od najstarszej (nazwa zawiera znacznik czasu)"""
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"{self.prefix}_*.db"))
+
+    def backup_now(self) -> Dict[str, Any]:
+        target = self.directory / f"{self.prefix}_{datetime.now():%Y%m%d_%H%M%S}.db"
+        result = online_backup(self.connect, target, self.pages_per_step)
+        for old in self.backups()[:-self.keep]:
+            old.unlink()
+        return result
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.last_result = self.backup_now()
+                self.last_error = None
+            except (sqlite3.Error, OSError) as error:
+                self.last_error = str(error)
+            self._stop_event.wait(self.interval)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        self.join(timeout)
+
+
+class AnalyticsSnapshot:
+    """Migawka bazy tylko do odczytu dla zapytań analitycznych.
+
+    Długie skany dashboardu czytają kopię zamiast bazy roboczej, więc nie
+    konkurują z zapisami terapeutów. Dane są aktualne na chwilę refresh().
+    """
+
+    def __init__(self, db_path: Path, connect: Callable[[], sqlite3.Connection],
+                 max_age: float = SNAPSHOT_MAX_AGE_SECONDS):
+        self.path = Path(db_path).with_name(f"{Path(db_path).stem}_analytics.db")
+        self.connect_source = connect
+        self.max_age = max_age
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def age(self) -> Optional[float]:
+        """Wiek migawki w sekundach (None - migawki nie ma)"""
+        if not self.path.exists():
+            return None
+        return time.time() - self.path.stat().st_mtime
+
+    def refresh(self) -> Dict[str, Any]:
+        with self._lock:
+            return online_backup(self.connect_source, self.path)
+
+    def refresh_in_background(self) -> bool:
+        """Odświeża migawkę w wątku w tle; False - odświeżanie już trwa"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._background_refresh, name='analytics-snapshot', daemon=True)
+            self._thread.start()
+        return True
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+            self.last_error = None
+        except (sqlite3.Error, OSError) as error:
+            self.last_error = str(error)
+
+    def connect(self) -> sqlite3.Connection:
+        """Połączenie tylko do odczytu (zamyka je wywołujący).
+
+        Migawka starsza niż max_age jest nadal zwracana, a nowa powstaje
+        w tle - zapytanie użytkownika nie czeka na kopię bazy. Tylko gdy
+        migawki jeszcze nie ma, jest tworzona od razu.
+        """
+        age = self.age()
+        if age is None:
+            self.refresh()
+        elif age > self.max_age:
+            self.refresh_in_background()
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
@@ -3,6 +3,8 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 import streamlit as st
 from ..database.models import Patient, DiagnosisSession, TestResult, DiagnosticTest, Diagnosis
+from .metrics import assessment_render_duration
+from .tracing import span
 
 @dataclass
 class AssessmentStep:
@@ -16,6 +18,10 @@ class AssessmentStep:
 class BaseModule(ABC):
     """Bazowa klasa dla wszystkich modułów diagnostycznych"""
     
+    # Wersja reguł punktacji - część klucza cache diagnoz (memoized_diagnosis); podbij przy każdej
+    # zmianie calculate_risk_scores/generate_diagnosis (None - bez cache)
+    SCORING_RULES_VERSION: Optional[str] = None
+    
     def __init__(self, module_name: str, module_icon: str):
         self.module_name = module_name
         self.module_icon = module_icon
@@ -61,6 +67,11 @@ class BaseModule(ABC):
     
     def run_assessment(self, patient: Patient, session: DiagnosisSession, mode: str) -> Dict[str, Any]:
         """Główna funkcja przeprowadzająca pełną ocenę"""
+        with assessment_render_duration.labels(module=self.module_name).time(), \
+                span('module.run_assessment', module=self.module_name, mode=mode):
+            return self._run_assessment(patient, session, mode)
+    
+    def _run_assessment(self, patient: Patient, session: DiagnosisSession, mode: str) -> Dict[str, Any]:
         st.markdown(f"## {self.module_icon} {self.module_name} - Ocena diagnostyczna")
         
         # Progress tracking
@@ -69,22 +80,27 @@ class BaseModule(ABC):
         st.write(f"Postęp: {progress*100:.0f}%")
         
         # Red flags check
-        if self._check_red_flags(patient, mode):
+        with span('module._check_red_flags'):
+            red_flags_detected = self._check_red_flags(patient, mode)
+        if red_flags_detected:
             return {"red_flags_detected": True}
         
         # Wywiad
         st.markdown("### 📋 Wywiad medyczny")
-        interview_results = self.run_interview(patient, mode)
+        with span('module.run_interview'):
+            interview_results = self.run_interview(patient, mode)
         self.current_findings.update(interview_results)
         
         # Badanie fizykalne
         if mode == "specialist":
             st.markdown("### 🔬 Badanie fizykalne")
-            exam_results = self.run_physical_examination(patient, mode)
+            with span('module.run_physical_examination'):
+                exam_results = self.run_physical_examination(patient, mode)
             self.current_findings.update(exam_results)
         
         # Risk scores
-        risk_scores = self.calculate_risk_scores(self.current_findings)
+        with span('module.calculate_risk_scores'):
+            risk_scores = self.calculate_risk_scores(self.current_findings)
         self.current_findings['risk_scores'] = risk_scores
         
         return self.current_findings
@@ -230,7 +246,9 @@ class BaseModule(ABC):
         
         return summary
     
-    def export_findings_to_json(self, findings: Dict[str, Any]) -> str:
-        """Eksportuje wyniki do JSON"""
+    def export_findings_to_json(self, findings: Dict[str, Any], compact: bool = False) -> str:
+        """Eksportuje wyniki do JSON (compact - bez wcięć, do zapisu i eksportu masowego)"""
         import json
+        if compact:
+            return json.dumps(findings, ensure_ascii=False, separators=(',', ':'), default=str)
         return json.dumps(findings, ensure_ascii=False, indent=2, default=str)
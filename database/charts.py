@@ -0,0 +1,168 @@
+from typing import Any, Callable, Dict, List
+from .cache import LRUCache, stable_hash
+from .metrics import track_cache
+
+# Limit pamięci dla zbudowanych wykresów (współdzielony przez wszystkie sesje)
+FIGURE_CACHE_MAX_ENTRIES = 64
+FIGURE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+# Wpisy to wykresy zapisane jako JSON, więc ich rozmiar to po prostu długość tekstu
+figure_cache = LRUCache(
+    max_entries=FIGURE_CACHE_MAX_ENTRIES,
+    max_bytes=FIGURE_CACHE_MAX_BYTES,
+    sizeof=len
+)
+track_cache('figures', figure_cache)
+
+
+def cached_figure(kind: str, data: Any, builder: Callable[[Any], Any]) -> str:
+    """Zwraca JSON wykresu z cache lub buduje i serializuje go dla danych o danym skrócie.
+
+    Cache trzyma tekst (fig.to_json()), a nie obiekty Figure - jego rozmiar
+    jest znany bez ponownej serializacji, a wpis nie odwołuje się do
+    obiektów plotly. Wyświetlenie: st.plotly_chart(figure_from_json(...)).
+    """
+    key = (kind, stable_hash(data))
+    return figure_cache.get_or_create(key, lambda: builder(data).to_json())
+
+
+def figure_from_json(figure_json: str):
+    """Odtwarza obiekt Figure z JSON zapisanego w cache"""
+    import plotly.io as pio
+
+    return pio.from_json(figure_json)
+
+
+# === WYKRESY DIAGNOZY ===
+
+def _build_differential_chart(data: Dict[str, List]):
+    import plotly.graph_objects as go
+
+    probabilities = data['probabilities']
+    fig = go.Figure(data=[
+        go.Bar(
+            x=data['labels'],
+            y=probabilities,
+            marker_color=['#FF6B6B' if p == max(probabilities) else '#4ECDC4' for p in probabilities]
+        )
+    ])
+
+    fig.update_layout(
+        title="Prawdopodobieństwo diagnoz",
+        xaxis_title="Diagnoza",
+        yaxis_title="Prawdopodobieństwo (%)",
+        template="plotly_white"
+    )
+    return fig
+
+
+def differential_diagnosis_chart(labels: List[str], probabilities: List[float]) -> str:
+    """Wykres słupkowy analizy różnicowej (JSON)"""
+    return cached_figure(
+        'differential_diagnosis',
+        {'labels': list(labels), 'probabilities': list(probabilities)},
+        _build_differential_chart
+    )
+
+
+# === WYKRESY ANALITYCZNE ===
+
+def _build_diagnoses_over_time(rows: List[Dict[str, Any]]):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[
+        go.Scatter(
+            x=[row['data'] for row in rows],
+            y=[row['liczba_diagnoz'] for row in rows],
+            mode='lines+markers',
+            line_color='#2196F3'
+        )
+    ])
+    fig.update_layout(title="Diagnozy w ostatnich 30 dniach", template="plotly_white")
+    return fig
+
+
+def _build_module_usage(rows: List[Dict[str, Any]]):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[
+        go.Pie(
+            labels=[row['modul'] for row in rows],
+            values=[row['liczba'] for row in rows],
+            hole=0.4
+        )
+    ])
+    fig.update_layout(title="Użycie modułów", template="plotly_white")
+    return fig
+
+
+def _build_top_diagnoses(rows: List[Dict[str, Any]]):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[
+        go.Bar(
+            x=[row['liczba'] for row in rows],
+            y=[row['diagnoza'] for row in rows],
+            orientation='h',
+            marker_color='#4ECDC4'
+        )
+    ])
+    fig.update_layout(title="Najczęstsze diagnozy", template="plotly_white", yaxis={'autorange': 'reversed'})
+    return fig
+
+
+def _build_confidence_distribution(rows: List[Dict[str, Any]]):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[
+        go.Histogram(x=[row['confidence_level'] for row in rows], nbinsx=20, marker_color='#667eea')
+    ])
+    fig.update_layout(
+        title="Rozkład pewności diagnoz",
+        xaxis_title="Pewność (%)",
+        yaxis_title="Liczba diagnoz",
+        template="plotly_white"
+    )
+    return fig
+
+
+def _build_therapist_effectiveness(rows: List[Dict[str, Any]]):
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[
+        go.Bar(
+            x=[row['terapeuta'] for row in rows],
+            y=[row['srednia_pewnosc'] for row in rows],
+            marker_color='#4CAF50'
+        )
+    ])
+    fig.update_layout(
+        title="Średnia pewność diagnoz terapeutów",
+        yaxis_title="Średnia pewność (%)",
+        template="plotly_white"
+    )
+    return fig
+
+
+ANALYTICS_CHART_BUILDERS = {
+    'diagnoses_over_time': _build_diagnoses_over_time,
+    'module_usage': _build_module_usage,
+    'top_diagnoses': _build_top_diagnoses,
+    'confidence_distribution': _build_confidence_distribution,
+    'therapist_effectiveness': _build_therapist_effectiveness
+}
+
+
+def analytics_charts(analytics_data: Dict[str, Any]) -> Dict[str, str]:
+    """Zwraca wykresy dashboardu (JSON) dla danych z get_analytics_data.
+
+    Każdy wykres ma własny klucz w cache, więc zmiana jednej serii danych
+    nie wymusza przebudowy pozostałych. Puste serie są pomijane.
+    """
+    charts = {}
+    for name, builder in ANALYTICS_CHART_BUILDERS.items():
+        rows = analytics_data.get(name) or []
+        if rows:
+            charts[name] = cached_figure(f'analytics_{name}', rows, builder)
+    return charts
@@ -0,0 +1,121 @@
+import base64
+import binascii
+import hashlib
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+# Klucze (base64, 32 bajty każdy) - bez nich dane pacjentów są zapisywane jawnie, jak dotąd
+FIELD_KEY_ENV = 'FIZJO_FIELD_KEY'
+BLIND_INDEX_KEY_ENV = 'FIZJO_BLIND_INDEX_KEY'
+
+# Pola pacjenta przechowywane w postaci zaszyfrowanej
+ENCRYPTED_PATIENT_FIELDS = ('pesel', 'phone', 'email', 'emergency_contact')
+ENCRYPTED_PREFIX = 'enc1:'
+NONCE_BYTES = 12
+# Długość indeksu ślepego (kluczowany BLAKE2b, 128 bitów, zapisany szesnastkowo)
+BLIND_INDEX_BYTES = 16
+
+
+def _decode_key(value: str, name: str) -> bytes:
+    try:
+        key = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError) as error:
+        raise ValueError(f"{name}: klucz musi być zakodowany w base64") from error
+    if len(key) != 32:
+        raise ValueError(f"{name}: klucz musi mieć 32 bajty (ma {len(key)})")
+    return key
+
+
+def generate_key() -> str:
+    """Nowy losowy klucz w formacie zmiennych FIZJO_FIELD_KEY / FIZJO_BLIND_INDEX_KEY"""
+    return base64.b64encode(os.urandom(32)).decode('ascii')
+
+
+class FieldCipher:
+    """Szyfrowanie pól (AES-256-GCM) i indeks ślepy (kluczowany BLAKE2b).
+
+    Zaszyfrowana wartość to tekst 'enc1:' + base64(nonce + szyfrogram);
+    nazwa pola jest danymi uwierzytelnianymi, więc wartości nie da się
+    przenieść do innej kolumny. Szyfrogram jest losowy, więc do wyszukiwania
+    i unikalności służy indeks ślepy - deterministyczny skrót wartości
+    z osobnym kluczem (BLAKE2b w trybie z kluczem, kilka razy szybszy od
+    HMAC-SHA256 przy tej samej roli). Wartości bez prefiksu (sprzed szyfrowania) są
+    zwracane bez zmian. Wymaga pakietu cryptography.
+    """
+
+    def __init__(self, field_key: bytes, blind_index_key: bytes):
+        try:
+            from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        except ImportError as error:
+            raise ImportError("Szyfrowanie danych pacjentów wymaga pakietu cryptography "
+                              "(pip install cryptography)") from error
+        self._keys = (field_key, blind_index_key)
+        self._aead = AESGCM(field_key)
+        # Stan skrótu z kluczem przygotowany raz - na wartość tylko copy() i update()
+        self._blind_index = hashlib.blake2b(key=blind_index_key, digest_size=BLIND_INDEX_BYTES)
+
+    def __reduce__(self):
+        # Obiekty AESGCM i BLAKE2b nie są serializowalne - do procesów skanu duplikatów trafiają klucze
+        return FieldCipher, self._keys
+
+    @classmethod
+    def from_env(cls) -> Optional['FieldCipher']:
+        """Szyfrowanie z kluczy w zmiennych środowiskowych; None - szyfrowanie wyłączone"""
+        field_key, blind_index_key = os.environ.get(FIELD_KEY_ENV), os.environ.get(BLIND_INDEX_KEY_ENV)
+        if not field_key and not blind_index_key:
+            return None
+        if not (field_key and blind_index_key):
+            raise ValueError(f"Ustaw oba klucze: {FIELD_KEY_ENV} i {BLIND_INDEX_KEY_ENV}")
+        return cls(_decode_key(field_key, FIELD_KEY_ENV), _decode_key(blind_index_key, BLIND_INDEX_KEY_ENV))
+
+    def blind_index(self, value: Optional[str], field: str = 'pesel') -> Optional[str]:
+        if value is None:
+            return None
+        digest = self._blind_index.copy()
+        digest.update(f"{field}:{value.strip()}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def encrypt(self, value: Optional[str], field: str) -> Optional[str]:
+        return self.encrypt_many([value], field)[0]
+
+    def decrypt(self, value: Optional[str], field: str) -> Optional[str]:
+        return self.decrypt_many([value], field)[0]
+
+    def encrypt_many(self, values: Sequence[Optional[str]], field: str) -> List[Optional[str]]:
+        """Szyfruje kolumnę wartości jednym obiektem szyfru (bez kosztu przygotowania klucza na wartość)"""
+        encrypt, associated = self._aead.encrypt, field.encode('utf-8')
+        result = []
+        for value in values:
+            if value is None or (isinstance(value, str) and value.startswith(ENCRYPTED_PREFIX)):
+                result.append(value)
+                continue
+            nonce = os.urandom(NONCE_BYTES)
+            data = nonce + encrypt(nonce, str(value).encode('utf-8'), associated)
+            result.append(ENCRYPTED_PREFIX + base64.b64encode(data).decode('ascii'))
+        return result
+
+    def decrypt_many(self, values: Sequence[Optional[str]], field: str) -> List[Optional[str]]:
+        decrypt, associated = self._aead.decrypt, field.encode('utf-8')
+        prefix_length = len(ENCRYPTED_PREFIX)
+        result = []
+        for value in values:
+            if not (isinstance(value, str) and value.startswith(ENCRYPTED_PREFIX)):
+                result.append(value)
+                continue
+            data = base64.b64decode(value[prefix_length:])
+            result.append(decrypt(data[:NONCE_BYTES], data[NONCE_BYTES:], associated).decode('utf-8'))
+        return result
+
+    def decrypt_records(self, records: List[Dict[str, Any]], fields: Sequence[str] = ENCRYPTED_PATIENT_FIELDS):
+        """Odszyfrowuje pola listy słowników w miejscu - kolumna po kolumnie"""
+        for field in fields:
+            if records and field in records[0]:
+                for record, value in zip(records, self.decrypt_many([record[field] for record in records], field)):
+                    record[field] = value
+
+
+@lru_cache(maxsize=None)
+def field_cipher() -> Optional[FieldCipher]:
+    """Szyfrowanie skonfigurowane dla procesu (klucze czytane ze środowiska raz)"""
+    return FieldCipher.from_env()
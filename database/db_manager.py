@@ -1,131 +1,164 @@
 import sqlite3
 import json
+import time
+import warnings
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime, date
-from typing import List, Optional, Dict, Any
-from .models import Patient, DiagnosisSession, TestResult
+from typing import List, Optional, Dict, Any, Callable, Sequence, Tuple
+from .models import Patient, DiagnosisSession, LazyDiagnosisSession, TestResult, SystemConfiguration
+from .findings import FILTER_OPERATORS, FindingFilter, findings_subquery, flatten_findings
+from .json_indexes import JSON_INDEXES_BY_NAME
+from .migrations import (
+    ENCRYPT_PATIENTS_SQL, BackfillWorker, MigrationRunner, backfill_session_findings, encrypt_patient_fields,
+    start_background_backfills,
+)
+from .log_archive import LogArchive, LogMaintenance
+from .settings_cache import SettingsCache
+from .crypto import ENCRYPTED_PATIENT_FIELDS, ENCRYPTED_PREFIX, FieldCipher, field_cipher
+from .duplicates import DUPLICATE_MIN_SCORE, DuplicateCandidate, find_candidates, index_patients, scan_duplicates
+from .export import ExportFilter, EXPORT_CHUNK_SIZE, export_table
+from .patient_import import IMPORT_BATCH_SIZE, import_patients
+from .backup import AnalyticsSnapshot, BackupScheduler, BACKUP_PAGES_PER_STEP, BACKUP_PAUSE_SECONDS, online_backup
+from .notes_codec import decode_notes, encode_notes
+from .metrics import log_writes, log_write_duration, log_writes_in_progress
+from .tracing import trace_database
+
+# Dozwolone kolumny sortowania listy pacjentów (nazwa -> wyrażenie ORDER BY)
+PATIENT_SORT_COLUMNS = {
+    'last_name': ('last_name', 'first_name'),
+    'first_name': ('first_name', 'last_name'),
+    'birth_date': ('birth_date',),
+    'created_at': ('created_at',),
+    'id': ('id',)
+}
+
+# Kolumny DiagnosisSession - bez kolumn generowanych z session_notes (notes_*),
+# których nie ma w modelu i których liczenie przy każdym odczycie jest zbędne
+SESSION_COLUMNS = """id, patient_id, module_type, session_date, therapist_name, primary_diagnosis,
+    confidence_level, treatment_plan, referral_notes, session_notes, is_completed, created_at"""
+# Kolumny listy historii - bez długich pól tekstowych (LazyDiagnosisSession doładuje je przy dostępie)
+SESSION_SUMMARY_COLUMNS = """id, patient_id, module_type, session_date, therapist_name, primary_diagnosis,
+    confidence_level, is_completed, created_at"""
+
+def write_method(method: Callable) -> Callable:
+    """Oznacza metodę modyfikującą bazę - AsyncDatabaseManager wykonuje takie metody w wątku zapisującym"""
+    method.is_write_method = True
+    return method
+
 
 class DatabaseManager:
     """Manager bazy danych SQLite"""
     
-    def __init__(self, db_path: str = "fizjo_expert.db"):
+    def __init__(self, db_path: str = "fizjo_expert.db", auto_migrate: bool = True):
         self.db_path = Path(db_path)
-        self.init_database()
+        # Pomiar zapytań (database.instrumentation) - None oznacza wyłączony
+        self.instrumentation = None
+        # Szyfrowanie PESEL i danych kontaktowych (klucze FIZJO_FIELD_KEY / FIZJO_BLIND_INDEX_KEY)
+        self.cipher: Optional[FieldCipher] = field_cipher()
+        self.migrations = MigrationRunner(self._connect, cipher=self.cipher)
+        # Uzupełnianie danych w tle po starcie istniejącej bazy (None - nic do uzupełnienia)
+        self.backfill_worker: Optional[BackfillWorker] = None
+        # Archiwum system_logs (retencja z FIZJO_LOG_RETENTION_DAYS / FIZJO_LOG_ARCHIVE_MONTHS)
+        self.log_archive = LogArchive(self.db_path, self._connect)
+        # Migawka tylko do odczytu dla get_analytics_data(use_snapshot=True)
+        self.analytics_snapshot = AnalyticsSnapshot(self.db_path, self._connect)
+        # Ustawienia w pamięci procesu (write-through, zmiany innych procesów przez PRAGMA data_version)
+        self.settings = SettingsCache(self.db_path)
+        # auto_migrate=False - schemat aktualizuje osobno migrate() (tools/migrate_db.py)
+        if auto_migrate:
+            self.init_database()
+        # Spany db.<metoda> zagnieżdżone w krokach workflow (gdy włączono FIZJO_TRACE_FILE)
+        trace_database(self)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Otwiera połączenie z bazą (instrumentowane, jeśli pomiar jest włączony)"""
+        if self.instrumentation is None:
+            return sqlite3.connect(self.db_path)
+        return self.instrumentation.connect(self.db_path)
     
+    def close(self):
+        """Zamyka stałe połączenie pamięci ustawień (manager można potem dalej używać)"""
+        self.settings.close()
+    
+    def __enter__(self) -> 'DatabaseManager':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _close_connection(self, conn: sqlite3.Connection):
+        """Zamyka połączenie z _connect (podklasy z pulą połączeń zostawiają je otwarte)"""
+        conn.close()
+    
+    @write_method
     def init_database(self):
-        """Inicjalizuje bazę danych"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Tabela pacjentów
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS patients (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    first_name TEXT NOT NULL,
-                    last_name TEXT NOT NULL,
-                    pesel TEXT UNIQUE NOT NULL,
-                    birth_date DATE NOT NULL,
-                    gender TEXT CHECK(gender IN ('M', 'K', 'Inna')),
-                    phone TEXT,
-                    email TEXT,
-                    emergency_contact TEXT,
-                    allergies TEXT,
-                    medications TEXT,
-                    medical_history TEXT,
-                    notes TEXT,
-                    consent_treatment BOOLEAN NOT NULL,
-                    consent_data BOOLEAN NOT NULL,
-                    consent_marketing BOOLEAN DEFAULT FALSE,
-                    is_active BOOLEAN DEFAULT TRUE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Tabela sesji diagnostycznych
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS diagnosis_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    patient_id INTEGER NOT NULL,
-                    module_type TEXT NOT NULL,
-                    session_date TIMESTAMP NOT NULL,
-                    therapist_name TEXT NOT NULL,
-                    primary_diagnosis TEXT,
-                    confidence_level REAL,
-                    treatment_plan TEXT,
-                    referral_notes TEXT,
-                    session_notes TEXT,
-                    is_completed BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (patient_id) REFERENCES patients (id)
-                )
-            """)
-            
-            # Tabela wyników testów
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS test_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id INTEGER NOT NULL,
-                    test_name TEXT NOT NULL,
-                    test_result TEXT NOT NULL,
-                    test_score REAL,
-                    test_notes TEXT,
-                    performed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (session_id) REFERENCES diagnosis_sessions (id)
-                )
-            """)
-            
-            # Tabela ustawień użytkownika
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_settings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    setting_key TEXT UNIQUE NOT NULL,
-                    setting_value TEXT NOT NULL,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Tabela logów systemu
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS system_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    log_level TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    module_name TEXT,
-                    user_id TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Indeksy dla optymalizacji
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_patients_pesel ON patients(pesel)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_patient ON diagnosis_sessions(patient_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_date ON diagnosis_sessions(session_date)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tests_session ON test_results(session_id)")
-            
-            conn.commit()
+        """Inicjalizuje bazę danych - zakłada lub aktualizuje schemat (database.migrations).
+        
+        Nowa baza dostaje od razu cały schemat. W istniejącej start wykonuje
+        szybkie zmiany schematu, a uzupełnianie danych (session_findings,
+        patient_blocks, szyfrowanie) uruchamia w wątku w tle - do jego końca
+        wyniki kohort, duplikatów i wyszukiwania po PESEL są niepełne.
+        Budowa indeksów (migracje deferred) należy do migrate() /
+        tools/migrate_db.py i przy starcie jest tylko zgłaszana ostrzeżeniem.
+        """
+        if self.migrations.is_new_database():
+            self.migrations.upgrade()
+            self.migrations.run_backfills()
+            return
+        
+        self.migrations.upgrade(include_deferred=False)
+        if self.migrations.pending_backfills():
+            self.backfill_worker = start_background_backfills(self.migrations, str(self.db_path.resolve()))
+        pending = [migration.version for migration in self.migrations.pending()]
+        if pending:
+            warnings.warn(
+                f"{self.db_path}: oczekujące migracje {pending} (budowa indeksów) - uruchom tools/migrate_db.py",
+                RuntimeWarning, stacklevel=3
+            )
     
     # === OPERACJE NA PACJENTACH ===
     
+    def _encrypt(self, value: Optional[str], field: str) -> Optional[str]:
+        return self.cipher.encrypt(value, field) if self.cipher else value
+    
+    def _pesel_hash(self, pesel: Optional[str]) -> Optional[str]:
+        """Indeks ślepy PESEL (None, gdy szyfrowanie jest wyłączone)"""
+        return self.cipher.blind_index(pesel) if self.cipher else None
+    
+    def _patients_from_rows(self, rows: List[sqlite3.Row]) -> List[Patient]:
+        """Tworzy obiekty Patient; zaszyfrowane pola całej listy są odszyfrowywane kolumnami"""
+        records = [dict(row) for row in rows]
+        if self.cipher:
+            self.cipher.decrypt_records(records, ENCRYPTED_PATIENT_FIELDS)
+        for record in records:
+            record.pop('pesel_hash', None)
+        return [Patient.from_dict(record) for record in records]
+    
+    @write_method
     def add_patient(self, patient: Patient) -> int:
         """Dodaje nowego pacjenta"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
                 INSERT INTO patients (
                     first_name, last_name, pesel, birth_date, gender,
                     phone, email, emergency_contact, allergies, medications,
-                    medical_history, notes, consent_treatment, consent_data, consent_marketing
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    medical_history, notes, consent_treatment, consent_data, consent_marketing, pesel_hash
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
-                patient.first_name, patient.last_name, patient.pesel, patient.birth_date,
-                patient.gender, patient.phone, patient.email, patient.emergency_contact,
+                patient.first_name, patient.last_name, self._encrypt(patient.pesel, 'pesel'), patient.birth_date,
+                patient.gender, self._encrypt(patient.phone, 'phone'), self._encrypt(patient.email, 'email'),
+                self._encrypt(patient.emergency_contact, 'emergency_contact'),
                 patient.allergies, patient.medications, patient.medical_history, patient.notes,
-                patient.consent_treatment, patient.consent_data, patient.consent_marketing
+                patient.consent_treatment, patient.consent_data, patient.consent_marketing,
+                self._pesel_hash(patient.pesel)
             ))
             
             patient_id = cursor.lastrowid
+            index_patients(cursor, [(patient_id, patient.first_name, patient.last_name, patient.pesel,
+                                     str(patient.birth_date))], cipher=self.cipher)
             conn.commit()
             
             self.log_action("INFO", f"Dodano nowego pacjenta: {patient.first_name} {patient.last_name}", "patient_management")
@@ -134,7 +167,7 @@ class DatabaseManager:
     
     def get_patient(self, patient_id: int) -> Optional[Patient]:
         """Pobiera pacjenta po ID"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -142,28 +175,43 @@ class DatabaseManager:
             row = cursor.fetchone()
             
             if row:
-                return Patient.from_dict(dict(row))
+                return self._patients_from_rows([row])[0]
             return None
     
+    def get_patients_by_ids(self, patient_ids: Sequence[int]) -> List[Patient]:
+        """Pobiera pacjentów o podanych ID w ich kolejności (brakujący są pomijani)"""
+        ids = list(patient_ids)
+        found = {}
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            # Limit parametrów SQLite - identyfikatory w porcjach
+            for start in range(0, len(ids), 900):
+                chunk = ids[start:start + 900]
+                cursor.execute(f"SELECT * FROM patients WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+                found.update((patient.id, patient) for patient in self._patients_from_rows(cursor.fetchall()))
+        return [found[patient_id] for patient_id in ids if patient_id in found]
+    
     def search_patients(self, search_term: str) -> List[Patient]:
         """Wyszukuje pacjentów"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            search_pattern = f"%{search_term}%"
-            cursor.execute("""
+            condition, params = self._search_condition(search_term)
+            cursor.execute(f"""
                 SELECT * FROM patients 
-                WHERE first_name LIKE ? OR last_name LIKE ? OR pesel LIKE ?
+                WHERE {condition}
                 ORDER BY last_name, first_name
-            """, (search_pattern, search_pattern, search_pattern))
+            """, params)
             
             rows = cursor.fetchall()
-            return [Patient.from_dict(dict(row)) for row in rows]
+            return self._patients_from_rows(rows)
     
     def get_all_patients(self, active_only: bool = True) -> List[Patient]:
         """Pobiera wszystkich pacjentów"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -173,18 +221,96 @@ class DatabaseManager:
                 cursor.execute("SELECT * FROM patients ORDER BY last_name, first_name")
             
             rows = cursor.fetchall()
-            return [Patient.from_dict(dict(row)) for row in rows]
+            return self._patients_from_rows(rows)
+    
+    def _search_condition(self, search_term: str) -> Tuple[str, List[Any]]:
+        """Warunek wyszukiwania po imieniu, nazwisku lub PESEL"""
+        search_pattern = f"%{search_term}%"
+        if self.cipher is None:
+            return ("first_name LIKE ? OR last_name LIKE ? OR pesel LIKE ?",
+                    [search_pattern, search_pattern, search_pattern])
+        # Zaszyfrowany PESEL można znaleźć tylko w całości - po indeksie ślepym; LIKE tylko na
+        # wierszach jeszcze niezaszyfrowanych (przed uzupełnieniem migracji 10), nie na szyfrogramie
+        return ("first_name LIKE ? OR last_name LIKE ? OR (pesel NOT LIKE ? AND pesel LIKE ?) OR pesel_hash = ?",
+                [search_pattern, search_pattern, f"{ENCRYPTED_PREFIX}%", search_pattern, self._pesel_hash(search_term)])
+    
+    def _patient_filter(self, search_term: Optional[str], active_only: bool):
+        """Buduje warunek WHERE dla listy pacjentów"""
+        conditions = []
+        params = []
+        
+        if active_only:
+            conditions.append("is_active = 1")
+        
+        if search_term:
+            condition, search_params = self._search_condition(search_term)
+            conditions.append(f"({condition})")
+            params.extend(search_params)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+    
+    def count_patients(self, search_term: Optional[str] = None, active_only: bool = True) -> int:
+        """Zlicza pacjentów (bez pobierania wierszy)"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            
+            where, params = self._patient_filter(search_term, active_only)
+            cursor.execute(f"SELECT COUNT(*) FROM patients {where}", params)
+            return cursor.fetchone()[0]
+    
+    def get_patients_page(self, page: int = 0, page_size: int = 50, sort_by: str = 'last_name',
+                          descending: bool = False, search_term: Optional[str] = None,
+                          active_only: bool = True) -> List[Patient]:
+        """Pobiera jedną stronę listy pacjentów (sortowanie i filtrowanie w SQL)"""
+        if sort_by not in PATIENT_SORT_COLUMNS:
+            raise ValueError(f"Nieobsługiwana kolumna sortowania: {sort_by}")
+        
+        # ID na końcu zapewnia stabilną kolejność między stronami
+        columns = PATIENT_SORT_COLUMNS[sort_by]
+        if 'id' not in columns:
+            columns += ('id',)
+        direction = "DESC" if descending else "ASC"
+        order_by = ", ".join(f"{column} {direction}" for column in columns)
+        
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            where, params = self._patient_filter(search_term, active_only)
+            cursor.execute(
+                f"SELECT * FROM patients {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                params + [page_size, max(page, 0) * page_size]
+            )
+            
+            rows = cursor.fetchall()
+            return self._patients_from_rows(rows)
     
     def patient_exists(self, pesel: str) -> bool:
         """Sprawdza czy pacjent istnieje"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM patients WHERE pesel = ?", (pesel,))
+            # pesel = ? - wiersze jeszcze niezaszyfrowane (przed uzupełnieniem migracji 10)
+            cursor.execute("SELECT 1 FROM patients WHERE pesel_hash = ? OR pesel = ?", (self._pesel_hash(pesel), pesel))
             return cursor.fetchone() is not None
     
+    def find_duplicate_candidates(self, patient: Patient,
+                                  min_score: float = DUPLICATE_MIN_SCORE) -> List[DuplicateCandidate]:
+        """Pacjenci podobni do podanego (literówki w nazwisku, PESEL lub dacie) - przed dodaniem lub po edycji"""
+        with self._connect() as conn:
+            return find_candidates(conn.cursor(), patient.first_name, patient.last_name, patient.pesel,
+                                   str(patient.birth_date), exclude_id=patient.id, min_score=min_score,
+                                   cipher=self.cipher)
+    
+    def scan_duplicates(self, workers: Optional[int] = None,
+                        min_score: float = DUPLICATE_MIN_SCORE) -> List[Dict[str, Any]]:
+        """Kandydaci do scalenia w całej tabeli patients (równolegle, database.duplicates)"""
+        return scan_duplicates(self.db_path, workers, min_score, cipher=self.cipher)
+    
+    @write_method
     def update_patient(self, patient: Patient):
         """Aktualizuje dane pacjenta"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -194,19 +320,24 @@ class DatabaseManager:
                     medical_history = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ?
             """, (
-                patient.first_name, patient.last_name, patient.phone, patient.email,
-                patient.emergency_contact, patient.allergies, patient.medications,
-                patient.medical_history, patient.notes, patient.id
+                patient.first_name, patient.last_name, self._encrypt(patient.phone, 'phone'),
+                self._encrypt(patient.email, 'email'), self._encrypt(patient.emergency_contact, 'emergency_contact'),
+                patient.allergies, patient.medications, patient.medical_history, patient.notes, patient.id
             ))
+            # Imię lub nazwisko mogło się zmienić - odświeżamy klucze indeksu duplikatów
+            cursor.execute("SELECT id, first_name, last_name, pesel, birth_date FROM patients WHERE id = ?",
+                           (patient.id,))
+            index_patients(cursor, cursor.fetchall(), cipher=self.cipher)
             
             conn.commit()
             self.log_action("INFO", f"Zaktualizowano dane pacjenta ID: {patient.id}", "patient_management")
     
     # === OPERACJE NA SESJACH DIAGNOSTYCZNYCH ===
     
+    @write_method
     def add_diagnosis_session(self, session: DiagnosisSession) -> int:
         """Dodaje nową sesję diagnostyczną"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -220,9 +351,10 @@ class DatabaseManager:
             
             return session_id
     
+    @write_method
     def update_diagnosis_session(self, session: DiagnosisSession):
         """Aktualizuje sesję diagnostyczną"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -234,17 +366,18 @@ class DatabaseManager:
                 session.primary_diagnosis, session.confidence_level, session.treatment_plan,
                 session.referral_notes, session.session_notes, session.is_completed, session.id
             ))
+            self._write_session_findings(cursor, session.id, session.get_session_notes_dict())
             
             conn.commit()
     
     def get_patient_history(self, patient_id: int) -> List[DiagnosisSession]:
         """Pobiera historię sesji pacjenta"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT * FROM diagnosis_sessions 
+            cursor.execute(f"""
+                SELECT {SESSION_COLUMNS} FROM diagnosis_sessions 
                 WHERE patient_id = ? 
                 ORDER BY session_date DESC
             """, (patient_id,))
@@ -252,14 +385,45 @@ class DatabaseManager:
             rows = cursor.fetchall()
             return [DiagnosisSession.from_dict(dict(row)) for row in rows]
     
+    def get_patient_history_summary(self, patient_id: int, limit: int = None,
+                                    offset: int = 0) -> List[LazyDiagnosisSession]:
+        """Pobiera historię pacjenta do listy - tylko kolumny podsumowania, od najnowszej"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute(f"""
+                SELECT {SESSION_SUMMARY_COLUMNS} FROM diagnosis_sessions 
+                WHERE patient_id = ? 
+                ORDER BY session_date DESC
+                LIMIT ? OFFSET ?
+            """, (patient_id, -1 if limit is None else limit, offset))
+            
+            rows = cursor.fetchall()
+            return [LazyDiagnosisSession.from_summary(dict(row), self.get_session_details) for row in rows]
+    
+    def get_session_details(self, session_id: int) -> Optional[Dict[str, Any]]:
+        """Pobiera długie pola sesji (plan leczenia, skierowanie, notatki)"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT treatment_plan, referral_notes, session_notes FROM diagnosis_sessions 
+                WHERE id = ?
+            """, (session_id,))
+            
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
     def get_last_session(self, patient_id: int) -> Optional[DiagnosisSession]:
         """Pobiera ostatnią sesję pacjenta"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT * FROM diagnosis_sessions 
+            cursor.execute(f"""
+                SELECT {SESSION_COLUMNS} FROM diagnosis_sessions 
                 WHERE patient_id = ? 
                 ORDER BY session_date DESC 
                 LIMIT 1
@@ -270,11 +434,240 @@ class DatabaseManager:
                 return DiagnosisSession.from_dict(dict(row))
             return None
     
+    # === WYNIKI BADANIA (session_findings) ===
+    
+    def _write_session_findings(self, cursor, session_id: int, notes: Dict[str, Any]):
+        """Zastępuje spłaszczone wyniki badania sesji (w transakcji wywołującego)"""
+        if not isinstance(notes, dict):
+            notes = {}
+        cursor.execute("DELETE FROM session_findings WHERE session_id = ?", (session_id,))
+        cursor.executemany("""
+            INSERT INTO session_findings (session_id, section, key, value_type, value_text, value_num)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(session_id,) + row for row in flatten_findings(notes)])
+    
+    def find_sessions_by_findings(self, filters: List[FindingFilter], module_type: str = None,
+                                  limit: int = None) -> List[DiagnosisSession]:
+        """Pobiera sesje spełniające wszystkie warunki na wynikach badania"""
+        subquery, params = findings_subquery(filters)
+        sql = f"SELECT {SESSION_COLUMNS} FROM diagnosis_sessions WHERE id IN ({subquery})"
+        if module_type:
+            sql += " AND module_type = ?"
+            params.append(module_type)
+        sql += " ORDER BY session_date DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            
+            rows = cursor.fetchall()
+            return [DiagnosisSession.from_dict(dict(row)) for row in rows]
+    
+    def find_patients_by_findings(self, filters: List[FindingFilter], module_type: str = None) -> List[Patient]:
+        """Pobiera pacjentów, którzy mieli sesję spełniającą wszystkie warunki"""
+        subquery, params = findings_subquery(filters)
+        module_filter = ""
+        if module_type:
+            module_filter = " AND module_type = ?"
+            params.append(module_type)
+        
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT * FROM patients WHERE id IN (
+                    SELECT patient_id FROM diagnosis_sessions
+                    WHERE id IN ({subquery}){module_filter}
+                )
+                ORDER BY last_name, first_name
+            """, params)
+            
+            rows = cursor.fetchall()
+            return self._patients_from_rows(rows)
+    
+    @write_method
+    def rebuild_session_findings(self, batch_size: int = 1000) -> int:
+        """Odbudowuje session_findings z session_notes wszystkich sesji (wsadowo)"""
+        processed = 0
+        last_id = 0
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute("""
+                    SELECT id, session_notes FROM diagnosis_sessions
+                    WHERE id > ? ORDER BY id LIMIT ?
+                """, (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                backfill_session_findings(cursor, rows)
+                conn.commit()
+                
+                processed += len(rows)
+                last_id = rows[-1][0]
+        return processed
+    
+    @write_method
+    def encrypt_patient_data(self, batch_size: int = 500) -> int:
+        """Szyfruje dane pacjentów zapisane jawnie (np. po ustawieniu kluczy w działającej bazie)"""
+        if self.cipher is None:
+            raise ValueError("Szyfrowanie wyłączone - ustaw FIZJO_FIELD_KEY i FIZJO_BLIND_INDEX_KEY")
+        processed = 0
+        last_id = 0
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute(ENCRYPT_PATIENTS_SQL, (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                encrypt_patient_fields(cursor, rows, self.cipher)
+                conn.commit()
+                
+                processed += len(rows)
+                last_id = rows[-1][0]
+        return processed
+    
+    @write_method
+    def compact_session_notes(self, batch_size: int = 1000, threshold: Optional[int] = None) -> Dict[str, int]:
+        """Przepisuje session_notes do formatu kompaktowego (wsadowo).
+        
+        Zwolnione miejsce wraca do systemu plików dopiero po VACUUM.
+        """
+        stats = {'sessions': 0, 'rewritten': 0, 'skipped': 0, 'bytes_before': 0, 'bytes_after': 0}
+        last_id = 0
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute("""
+                    SELECT id, session_notes FROM diagnosis_sessions
+                    WHERE id > ? AND session_notes IS NOT NULL ORDER BY id LIMIT ?
+                """, (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                updates = []
+                for session_id, session_notes in rows:
+                    try:
+                        encoded = encode_notes(decode_notes(session_notes, strict=True), threshold)
+                    except ValueError:
+                        # Uszkodzone notatki zostają bez zmian - nie nadpisujemy ich pustym JSON
+                        stats['skipped'] += 1
+                        continue
+                    before = len(session_notes.encode('utf-8')) if isinstance(session_notes, str) else len(session_notes)
+                    after = len(encoded.encode('utf-8')) if isinstance(encoded, str) else len(encoded)
+                    stats['bytes_before'] += before
+                    stats['bytes_after'] += after
+                    if encoded != session_notes:
+                        updates.append((encoded, session_id))
+                
+                cursor.executemany("UPDATE diagnosis_sessions SET session_notes = ? WHERE id = ?", updates)
+                conn.commit()
+                
+                stats['sessions'] += len(rows)
+                stats['rewritten'] += len(updates)
+                last_id = rows[-1][0]
+        return stats
+    
+    # === MIGRACJE ===
+    
+    @write_method
+    def migrate(self, max_seconds: Optional[float] = None,
+                progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Wykonuje oczekujące migracje schematu i uzupełnianie danych (wznawialne).
+        
+        Przy max_seconds uzupełnianie przerywa się po tym czasie - kolejne
+        wywołanie kontynuuje od ostatniej zapisanej partii.
+        """
+        started = time.perf_counter()
+        migrations = self.migrations.upgrade(progress=progress)
+        backfills = self.migrations.run_backfills(max_seconds=max_seconds, progress=progress)
+        return {
+            'migrations': migrations,
+            'backfills': backfills,
+            'pending_backfills': len(self.migrations.pending_backfills()),
+            'duration_s': round(time.perf_counter() - started, 2)
+        }
+    
+    def get_schema_status(self) -> Dict[str, Any]:
+        """Wersja schematu, czasy migracji i postęp uzupełniania danych"""
+        return self.migrations.status()
+    
+    # === INDEKSY JSON (session_notes) ===
+    
+    def _notes_condition(self, name: str, op: str, value: Any) -> Tuple[str, List[Any]]:
+        """Warunek SQL na kolumnie generowanej z JSON_INDEXES"""
+        json_index = JSON_INDEXES_BY_NAME.get(name)
+        if json_index is None:
+            raise ValueError(f"Nieindeksowana wartość session_notes: {name}")
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Nieobsługiwany operator: {op}")
+        if op == 'in':
+            values = list(value)
+            return f"{json_index.column} IN ({', '.join('?' * len(values))})", values
+        return f"{json_index.column} {op} ?", [value]
+    
+    def find_sessions_by_notes(self, conditions: List[Tuple[str, str, Any]], module_type: str = None,
+                               limit: int = None) -> List[DiagnosisSession]:
+        """Pobiera sesje po indeksowanych wartościach session_notes, np. [('pain_intensity', '>=', 8)]"""
+        where, params = [], []
+        for name, op, value in conditions:
+            condition, condition_params = self._notes_condition(name, op, value)
+            where.append(condition)
+            params.extend(condition_params)
+        if module_type:
+            where.append("module_type = ?")
+            params.append(module_type)
+        
+        sql = f"SELECT {SESSION_COLUMNS} FROM diagnosis_sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # Unarny + wyłącza idx_sessions_date przy sortowaniu - inaczej planer skanuje
+        # całą tabelę w kolejności dat zamiast użyć indeksu na wartości z notatek
+        sql += " ORDER BY +session_date DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            
+            rows = cursor.fetchall()
+            return [DiagnosisSession.from_dict(dict(row)) for row in rows]
+    
+    def get_notes_value_counts(self, name: str, since: str = None) -> Dict[Any, int]:
+        """Zlicza sesje per wartość indeksowanej ścieżki session_notes (np. mechanizm urazu)"""
+        json_index = JSON_INDEXES_BY_NAME.get(name)
+        if json_index is None:
+            raise ValueError(f"Nieindeksowana wartość session_notes: {name}")
+        
+        sql = f"SELECT {json_index.column}, COUNT(*) FROM diagnosis_sessions WHERE {json_index.column} IS NOT NULL"
+        params = []
+        if since:
+            sql += " AND session_date >= ?"
+            params.append(since)
+        sql += f" GROUP BY {json_index.column} ORDER BY COUNT(*) DESC"
+        
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return {value: count for value, count in cursor.fetchall()}
+    
     # === OPERACJE NA WYNIKACH TESTÓW ===
     
+    @write_method
     def add_test_result(self, test_result: TestResult) -> int:
         """Dodaje wynik testu"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -293,7 +686,7 @@ class DatabaseManager:
     
     def get_session_test_results(self, session_id: int) -> List[TestResult]:
         """Pobiera wyniki testów dla sesji"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -310,7 +703,7 @@ class DatabaseManager:
     
     def get_patient_stats(self, patient_id: int) -> Dict[str, Any]:
         """Pobiera statystyki pacjenta"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Liczba wizyt
@@ -338,9 +731,18 @@ class DatabaseManager:
                 'success_rate': success_rate
             }
     
-    def get_analytics_data(self) -> Dict[str, Any]:
-        """Pobiera dane analityczne"""
-        with sqlite3.connect(self.db_path) as conn:
+    @contextmanager
+    def _analytics_connection(self, use_snapshot: bool):
+        """Połączenie dla zapytań analitycznych (migawka lub baza robocza), zamykane po użyciu"""
+        conn = self.analytics_snapshot.connect() if use_snapshot else self._connect()
+        try:
+            yield conn
+        finally:
+            self._close_connection(conn)
+    
+    def get_analytics_data(self, use_snapshot: bool = False) -> Dict[str, Any]:
+        """Pobiera dane analityczne (use_snapshot - z migawki, bez obciążania bazy roboczej)"""
+        with self._analytics_connection(use_snapshot) as conn:
             cursor = conn.cursor()
             
             # Podstawowe statystyki
@@ -419,11 +821,76 @@ class DatabaseManager:
                 'therapist_effectiveness': therapist_effectiveness
             }
     
+    def get_diagnosis_counts(self, use_snapshot: bool = False) -> Dict[str, int]:
+        """Liczba sesji per rozpoznanie (wszystkie rozpoznania - do scalania wyników shardów)"""
+        with self._analytics_connection(use_snapshot) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT primary_diagnosis, COUNT(*) FROM diagnosis_sessions
+                WHERE primary_diagnosis IS NOT NULL
+                GROUP BY primary_diagnosis
+            """)
+            return dict(cursor.fetchall())
+    
+    def get_therapist_confidence(self, use_snapshot: bool = False) -> Dict[str, Tuple[float, int]]:
+        """Suma i liczba ocen pewności per terapeuta (średnie da się scalić między shardami)"""
+        with self._analytics_connection(use_snapshot) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT therapist_name, SUM(confidence_level), COUNT(*) FROM diagnosis_sessions
+                WHERE confidence_level IS NOT NULL
+                GROUP BY therapist_name
+            """)
+            return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    
+    # === EKSPORT I IMPORT ===
+    
+    def export_data(self, table: str, path: str, filters: Optional[ExportFilter] = None,
+                    chunk_size: int = EXPORT_CHUNK_SIZE,
+                    progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+        """Eksportuje patients, sessions lub test_results do CSV/NDJSON/Parquet (strumieniowo)"""
+        return export_table(self._connect, table, Path(path), filters=filters, chunk_size=chunk_size,
+                            progress=progress, cipher=self.cipher)
+    
+    @write_method
+    def import_patients(self, path: str, rejected_path: Optional[str] = None,
+                        batch_size: int = IMPORT_BATCH_SIZE, dry_run: bool = False,
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        select: Optional[Callable[[Dict[str, str]], bool]] = None) -> Dict[str, Any]:
+        """Importuje pacjentów z CSV partiami (database.patient_import); jeden wpis w logu na import"""
+        result = import_patients(self._connect, Path(path), rejected_path, batch_size=batch_size,
+                                 dry_run=dry_run, progress=progress, cipher=self.cipher, select=select)
+        if not dry_run:
+            self.log_action("INFO", f"Import pacjentów z {Path(path).name}: dodano {result['imported']}, "
+                                    f"odrzucono {result['rejected']}", "patient_management")
+        return result
+    
+    # === KOPIE ZAPASOWE ===
+    
+    def backup_to(self, path: str, pages_per_step: int = BACKUP_PAGES_PER_STEP,
+                  pause: float = BACKUP_PAUSE_SECONDS,
+                  progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """Tworzy spójną kopię bazy bez blokowania zapisów (backup API, kopiowanie krokami)"""
+        return online_backup(self._connect, Path(path), pages_per_step, pause, progress)
+    
+    def start_backup_schedule(self, directory: str, interval: float = 3600.0, keep: int = 24,
+                              pages_per_step: int = BACKUP_PAGES_PER_STEP) -> BackupScheduler:
+        """Uruchamia wątek w tle tworzący kopię co interval sekund (zostaje keep najnowszych)"""
+        scheduler = BackupScheduler(self._connect, Path(directory), self.db_path.stem, interval, keep, pages_per_step)
+        scheduler.start()
+        return scheduler
+    
+    @write_method
+    def refresh_analytics_snapshot(self) -> Dict[str, Any]:
+        """Odświeża migawkę analityczną"""
+        return self.analytics_snapshot.refresh()
+    
     # === SYSTEM LOGÓW ===
     
+    @write_method
     def log_action(self, level: str, message: str, module_name: str = None, user_id: str = None):
         """Loguje akcję w systemie"""
-        with sqlite3.connect(self.db_path) as conn:
+        with log_writes_in_progress.track_in_progress(), log_write_duration.time(), self._connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -432,50 +899,84 @@ class DatabaseManager:
             """, (level, message, module_name, user_id))
             
             conn.commit()
+        log_writes.inc()
     
-    def get_logs(self, limit: int = 100, level: str = None) -> List[Dict]:
-        """Pobiera logi systemu"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_logs(self, limit: int = 100, level: str = None, since: str = None, until: str = None,
+                 include_archive: bool = False) -> List[Dict]:
+        """Pobiera logi systemu (od najnowszych); include_archive sięga do archiwum miesięcznego"""
+        where, params = [], []
+        if level:
+            where.append("log_level = ?")
+            params.append(level)
+        if since:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until:
+            where.append("created_at < ?")
+            params.append(until)
+        
+        sql = "SELECT * FROM system_logs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            
-            if level:
-                cursor.execute("""
-                    SELECT * FROM system_logs 
-                    WHERE log_level = ? 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                """, (level, limit))
-            else:
-                cursor.execute("""
-                    SELECT * FROM system_logs 
-                    ORDER BY created_at DESC 
-                    LIMIT ?
-                """, (limit,))
-            
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            cursor.execute(sql, params)
+            
+            logs = [dict(row) for row in cursor.fetchall()]
+        
+        # Archiwum zawiera tylko wpisy starsze od wszystkich w bazie - dopełniamy wynik
+        if include_archive and len(logs) < limit:
+            logs.extend(self.log_archive.query(limit - len(logs), level, since, until))
+        return logs
+    
+    @write_method
+    def archive_logs(self, progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Przenosi logi starsze niż okres retencji do archiwum miesięcznego"""
+        return self.log_archive.archive(progress=progress)
+    
+    def get_log_archives(self) -> List[Dict[str, Any]]:
+        """Lista miesięcznych plików archiwum logów"""
+        return self.log_archive.summary()
+    
+    def start_log_maintenance(self, interval: float = 3600.0) -> LogMaintenance:
+        """Uruchamia wątek w tle archiwizujący logi co interval sekund"""
+        return self.log_archive.start_maintenance(interval)
     
     # === USTAWIENIA ===
     
     def get_setting(self, key: str, default_value: str = None) -> str:
         """Pobiera ustawienie"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT setting_value FROM user_settings WHERE setting_key = ?", (key,))
-            result = cursor.fetchone()
-            
-            return result[0] if result else default_value
+        return self.settings.get(key, default_value)
     
+    @write_method
     def set_setting(self, key: str, value: str):
         """Ustawia wartość ustawienia"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT OR REPLACE INTO user_settings (setting_key, setting_value, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-            """, (key, value))
-            
-            conn.commit()
+        self.settings.set(key, value)
+    
+    def get_settings(self) -> Dict[str, str]:
+        """Pobiera wszystkie ustawienia"""
+        return self.settings.get_all()
+    
+    def get_system_configuration(self) -> SystemConfiguration:
+        """Konfiguracja systemu z ustawień (brakujące wartości - domyślne)"""
+        defaults = SystemConfiguration()
+        settings = self.settings.get_all()
+        values = {}
+        for name, default in defaults.to_dict().items():
+            if name not in settings:
+                continue
+            value = settings[name]
+            if isinstance(default, bool):
+                values[name] = value.lower() in ('1', 'true', 'tak')
+            else:
+                values[name] = type(default)(value)
+        return SystemConfiguration(**{**defaults.to_dict(), **values})
+    
+    @write_method
+    def set_system_configuration(self, config: SystemConfiguration):
+        """Zapisuje konfigurację systemu jako ustawienia (jedna transakcja)"""
+        self.settings.set_many({name: str(value) for name, value in config.to_dict().items()})
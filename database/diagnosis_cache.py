@@ -0,0 +1,168 @@
+import copy
+import functools
+import json
+import sqlite3
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Optional
+from .cache import LRUCache, stable_hash
+from .metrics import track_cache
+from .models import Diagnosis
+
+
+def canonicalize_findings(value: Any) -> Any:
+    """Sprowadza wyniki badania do postaci kanonicznej.
+
+    Klucze słowników są sortowane, zbiory sortowane, a liczby
+    zmiennoprzecinkowe o wartości całkowitej zamieniane na int - dzięki temu
+    te same wyniki dają ten sam skrót. Listy zachowują kolejność (może mieć
+    znaczenie), więc inna kolejność to po prostu inny wpis w cache.
+    """
+    if isinstance(value, dict):
+        return {str(key): canonicalize_findings(value[key]) for key in sorted(value, key=str)}
+    if isinstance(value, (set, frozenset)):
+        items = [canonicalize_findings(item) for item in value]
+        return sorted(items, key=lambda item: json.dumps(item, sort_keys=True, ensure_ascii=False, default=str))
+    if isinstance(value, (list, tuple)):
+        return [canonicalize_findings(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def findings_digest(findings: Any, namespace: str, rules_version: str) -> str:
+    """Zwraca skrót wyników badania powiązany z modułem i wersją reguł"""
+    return stable_hash({
+        'namespace': namespace,
+        'rules_version': rules_version,
+        'findings': canonicalize_findings(findings)
+    })
+
+
+class DiagnosisCache:
+    """Pamięć podręczna diagnoz: LRU w pamięci + opcjonalnie tabela SQLite"""
+
+    def __init__(self, max_entries: int = 512, db_path: Optional[str] = None):
+        self.memory = LRUCache(max_entries=max_entries)
+        self.db_path = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self.enable_persistence(db_path)
+
+    def enable_persistence(self, db_path: str):
+        """Włącza zapis diagnoz w bazie SQLite (przetrwa restart procesu).
+
+        Tabelę diagnosis_cache zakłada migracja 11 (database.migrations).
+        """
+        with sqlite3.connect(db_path) as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'diagnosis_cache'"
+            ).fetchone()
+        if not exists:
+            raise RuntimeError(f"Brak tabeli diagnosis_cache w {db_path} - uruchom migracje bazy (DatabaseManager.migrate)")
+        self.db_path = Path(db_path)
+
+    def get(self, key: str) -> Optional[Diagnosis]:
+        """Zwraca kopię zapamiętanej diagnozy lub None"""
+        payload = self.memory.get(key)
+
+        if payload is None and self.db_path:
+            with self._db_lock, sqlite3.connect(self.db_path) as conn:
+                row = conn.execute("SELECT payload FROM diagnosis_cache WHERE cache_key = ?", (key,)).fetchone()
+            if row:
+                payload = json.loads(row[0])
+                self.memory.put(key, payload)
+
+        if payload is None:
+            return None
+        # Każde trafienie dostaje własny obiekt i własne listy - wywołujący mogą je modyfikować
+        # (pola Diagnosis to napisy, liczby i listy napisów, więc płytka kopia list wystarcza)
+        return Diagnosis(**{name: list(value) if isinstance(value, list) else value
+                            for name, value in payload.items()})
+
+    def put(self, key: str, diagnosis: Diagnosis, module_name: str, rules_version: str):
+        """Zapamiętuje diagnozę"""
+        payload = asdict(diagnosis)
+        self.memory.put(key, payload)
+
+        if self.db_path:
+            with self._db_lock, sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO diagnosis_cache (cache_key, module_name, rules_version, payload)
+                    VALUES (?, ?, ?, ?)
+                """, (key, module_name, rules_version, json.dumps(payload, ensure_ascii=False)))
+                conn.commit()
+
+    def purge_stale(self, module_name: str, rules_version: str) -> int:
+        """Usuwa z bazy wpisy modułu zapisane dla innej wersji reguł"""
+        if not self.db_path:
+            return 0
+        with self._db_lock, sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "DELETE FROM diagnosis_cache WHERE module_name = ? AND rules_version != ?",
+                (module_name, rules_version)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """Czyści pamięć podręczną (również tabelę w bazie)"""
+        self.memory.clear()
+        if self.db_path:
+            with self._db_lock, sqlite3.connect(self.db_path) as conn:
+                conn.execute("DELETE FROM diagnosis_cache")
+                conn.commit()
+
+
+# Wspólne dla całego procesu (moduły diagnostyczne i sesje Streamlit)
+diagnosis_cache = DiagnosisCache()
+results_cache = LRUCache(max_entries=512)
+track_cache('diagnoses', diagnosis_cache.memory)
+track_cache('diagnosis_results', results_cache)
+
+
+def configure_diagnosis_cache(max_entries: Optional[int] = None, db_path: Optional[str] = None):
+    """Zmienia limit LRU i/lub włącza trwały zapis diagnoz w SQLite"""
+    if max_entries is not None:
+        diagnosis_cache.memory.max_entries = max_entries
+        results_cache.max_entries = max_entries
+    if db_path:
+        diagnosis_cache.enable_persistence(db_path)
+
+
+def memoized_diagnosis(method: Callable) -> Callable:
+    """Dekorator generate_diagnosis zapamiętujący wynik dla identycznych wyników badania.
+
+    Klucz (skrót kanonicznych wyników badania) zawiera nazwę klasy i
+    SCORING_RULES_VERSION modułu, więc po zmianie reguł (i podbiciu wersji)
+    stare wpisy przestają pasować. Moduł z SCORING_RULES_VERSION = None
+    liczy diagnozę zawsze od nowa.
+    """
+    @functools.wraps(method)
+    def wrapper(self, findings):
+        rules_version = getattr(self, 'SCORING_RULES_VERSION', None)
+        if rules_version is None:
+            return method(self, findings)
+
+        module_name = type(self).__name__
+        key = findings_digest(findings, module_name, rules_version)
+        cached = diagnosis_cache.get(key)
+        if cached is not None:
+            return cached
+
+        diagnosis = method(self, findings)
+        diagnosis_cache.put(key, diagnosis, module_name, rules_version)
+        return diagnosis
+
+    return wrapper
+
+
+def memoized_results(namespace: str, rules_version: str, findings: Any, compute: Callable[[], Any]) -> Any:
+    """Zwraca wynik obliczeń dla wyników badania z cache lub liczy go funkcją compute.
+
+    Jak w DiagnosisCache.get każde wywołanie dostaje własną kopię wyniku,
+    więc zmiany u wywołującego nie psują wpisu w cache.
+    """
+    key = findings_digest(findings, namespace, rules_version)
+    return copy.deepcopy(results_cache.get_or_create(key, compute))
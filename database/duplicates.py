@@ -0,0 +1,240 @@
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .crypto import FieldCipher
+
+# Wiersz pacjenta używany przez indeks: (id, first_name, last_name, pesel, birth_date)
+PatientKeyRow = Tuple[int, str, str, str, str]
+
+# Grupy większe niż limit (np. popularne nazwisko i rok) są zbyt mało wybiórcze do porównań
+MAX_BLOCK_SIZE = 200
+# Minimalny wynik pary (0-1), aby uznać ją za kandydata do scalenia: PESEL z nazwiskiem, imieniem
+# lub datą urodzenia albo - przy literówce w PESEL - nazwisko, imię i data urodzenia
+DUPLICATE_MIN_SCORE = 0.55
+# Pary porównywane przez jeden proces skanu naraz
+SCAN_CHUNK_PAIRS = 20000
+
+# Wagi cech w ocenie pary - sumują się do 1, więc wynik (i DUPLICATE_MIN_SCORE) jest w zakresie 0-1
+SCORE_WEIGHTS = {'pesel': 0.45, 'last_name': 0.23, 'first_name': 0.14, 'birth_date': 0.18}
+
+# Kolejność ma znaczenie - najpierw dłuższe połączenia liter
+PHONETIC_DIGRAPHS = (
+    ('dzi', 'z'), ('dź', 'z'), ('dż', 'z'), ('dz', 'z'), ('rz', 'z'), ('sz', 's'), ('cz', 'c'),
+    ('ch', 'h'), ('si', 's'), ('ci', 'c'), ('zi', 'z'), ('ni', 'n'), ('ph', 'f'), ('th', 't'),
+)
+# Polskie litery i głoski dźwięczne sprowadzone do bezdźwięcznych odpowiedników
+PHONETIC_LETTERS = str.maketrans({
+    'ą': 'o', 'ę': 'e', 'ó': 'u', 'ł': 'l', 'ś': 's', 'ć': 'c', 'ź': 's', 'ż': 's', 'ń': 'n',
+    'b': 'p', 'd': 't', 'g': 'k', 'w': 'f', 'v': 'f', 'z': 's', 'y': 'i', 'q': 'k', 'x': 's',
+})
+ASCII_LETTERS = str.maketrans('ąćęłńóśźż', 'acelnoszz')
+VOWELS = frozenset('aeiou')
+
+
+@lru_cache(maxsize=65536)
+def phonetic_key(name: str) -> str:
+    """Klucz fonetyczny polskiego imienia lub nazwiska.
+
+    Zapisy brzmiące podobnie (Wiśniewski/Wisniewsky, Kowalczyk/Kovalczyk,
+    Rzepka/Żepka) dają ten sam klucz: dwuznaki i polskie litery są
+    ujednolicane, głoski dźwięczne zastępowane bezdźwięcznymi, a samogłoski
+    poza pierwszą literą i powtórzenia liter pomijane.
+    """
+    text = (name or '').strip().lower()
+    for source, target in PHONETIC_DIGRAPHS:
+        text = text.replace(source, target)
+    letters = [letter for letter in text.translate(PHONETIC_LETTERS) if letter.isalpha()]
+    if not letters:
+        return ''
+    key = [letters[0]]
+    for letter in letters[1:]:
+        if letter not in VOWELS and letter != key[-1]:
+            key.append(letter)
+    return ''.join(key)
+
+
+def osa_distance(a: str, b: str) -> int:
+    """Odległość edycyjna z zamianą sąsiednich znaków (optimal string alignment)"""
+    previous_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        previous_previous, previous = previous, current
+    return previous[len(b)]
+
+
+def block_keys(first_name: str, last_name: str, pesel: str, birth_date: str,
+               cipher: Optional[FieldCipher] = None) -> List[str]:
+    """Klucze grup, w których szukamy duplikatów pacjenta.
+
+    n: - to samo brzmienie nazwiska i data urodzenia (literówka w PESEL),
+    y: - brzmienie nazwiska i imienia oraz rok urodzenia (literówka w dacie),
+    p: - PESEL bez jednej cyfry; dwa numery mają wspólny klucz, gdy różnią
+    się jedną cyfrą lub zamianą dwóch sąsiednich cyfr. Z cipher
+    (database.crypto) zapisywany jest skrót z kluczem tych fragmentów.
+    """
+    last, first = phonetic_key(last_name), phonetic_key(first_name)
+    birth_date = str(birth_date or '')[:10]
+    keys = {f"n:{last}:{birth_date}", f"y:{last}:{first}:{birth_date[:4]}"}
+    pesel = pesel or ''
+    fragments = {pesel[:i] + pesel[i + 1:] for i in range(len(pesel))}
+    if cipher is not None:
+        fragments = {cipher.blind_index(fragment, 'patient_blocks') for fragment in fragments}
+    keys.update(f"p:{fragment}" for fragment in fragments)
+    return sorted(keys)
+
+
+def _decrypted(rows: Sequence[PatientKeyRow], cipher: Optional[FieldCipher]) -> List[PatientKeyRow]:
+    """Wiersze z odszyfrowanym PESEL (kolumna może być zaszyfrowana - database.crypto)"""
+    if cipher is None:
+        return list(rows)
+    pesels = cipher.decrypt_many([row[3] for row in rows], 'pesel')
+    return [row[:3] + (pesel,) + row[4:] for row, pesel in zip(rows, pesels)]
+
+
+def index_patients(cursor: sqlite3.Cursor, rows: Sequence[PatientKeyRow], replace: bool = True,
+                   cipher: Optional[FieldCipher] = None):
+    """Zapisuje klucze grup pacjentów; replace - usuwa najpierw poprzednie klucze tych pacjentów"""
+    rows = _decrypted(rows, cipher)
+    if replace:
+        cursor.executemany("DELETE FROM patient_blocks WHERE patient_id = ?", [(row[0],) for row in rows])
+    # Klucze posortowane - kolejne wstawienia trafiają do tych samych stron indeksu
+    cursor.executemany("INSERT OR IGNORE INTO patient_blocks (block_key, patient_id) VALUES (?, ?)", sorted(
+        (key, row[0]) for row in rows for key in block_keys(row[1], row[2], row[3], row[4], cipher)
+    ))
+
+
+@dataclass
+class DuplicateCandidate:
+    """Pacjent podobny do sprawdzanego; reasons - zgodne cechy"""
+    patient_id: int
+    score: float
+    reasons: List[str] = field(default_factory=list)
+
+
+def score_pair(a: PatientKeyRow, b: PatientKeyRow) -> Tuple[float, List[str]]:
+    """Ocena podobieństwa dwóch pacjentów (0-1) i lista zgodnych cech"""
+    score, reasons = 0.0, []
+    pesel_distance = osa_distance(a[3] or '', b[3] or '')
+    if pesel_distance <= 1:
+        score += SCORE_WEIGHTS['pesel']
+        reasons.append('pesel')
+    for index, name in ((2, 'last_name'), (1, 'first_name')):
+        if phonetic_key(a[index]) == phonetic_key(b[index]):
+            score += SCORE_WEIGHTS[name]
+            reasons.append(name)
+        elif osa_distance((a[index] or '').lower().translate(ASCII_LETTERS),
+                          (b[index] or '').lower().translate(ASCII_LETTERS)) <= 1:
+            score += SCORE_WEIGHTS[name] / 2
+            reasons.append(name)
+    if str(a[4])[:10] == str(b[4])[:10]:
+        score += SCORE_WEIGHTS['birth_date']
+        reasons.append('birth_date')
+    return round(score, 3), reasons
+
+
+def _fetch_patients(cursor: sqlite3.Cursor, ids: Iterable[int],
+                    cipher: Optional[FieldCipher]) -> Dict[int, PatientKeyRow]:
+    ids = list(ids)
+    rows = {}
+    # Limit parametrów SQLite - identyfikatory w porcjach
+    for start in range(0, len(ids), 900):
+        chunk = ids[start:start + 900]
+        cursor.execute(f"""
+            SELECT id, first_name, last_name, pesel, birth_date FROM patients
+            WHERE id IN ({', '.join('?' * len(chunk))})
+        """, chunk)
+        rows.update((row[0], row) for row in _decrypted(cursor.fetchall(), cipher))
+    return rows
+
+
+def find_candidates(cursor: sqlite3.Cursor, first_name: str, last_name: str, pesel: str, birth_date: str,
+                    exclude_id: Optional[int] = None, min_score: float = DUPLICATE_MIN_SCORE,
+                    cipher: Optional[FieldCipher] = None) -> List[DuplicateCandidate]:
+    """Prawdopodobne duplikaty pacjenta - kilkanaście odczytów indeksu, niezależnie od wielkości bazy"""
+    keys = block_keys(first_name, last_name, pesel, birth_date, cipher)
+    cursor.execute(f"""
+        SELECT DISTINCT patient_id FROM patient_blocks
+        WHERE block_key IN ({', '.join('?' * len(keys))})
+        LIMIT {MAX_BLOCK_SIZE}
+    """, keys)
+    ids = [row[0] for row in cursor.fetchall() if row[0] != exclude_id]
+    probe = (exclude_id, first_name, last_name, pesel, str(birth_date))
+
+    candidates = []
+    for patient_id, row in _fetch_patients(cursor, ids, cipher).items():
+        score, reasons = score_pair(probe, row)
+        if score >= min_score:
+            candidates.append(DuplicateCandidate(patient_id, score, reasons))
+    return sorted(candidates, key=lambda candidate: (-candidate.score, candidate.patient_id))
+
+
+def candidate_pairs(cursor: sqlite3.Cursor, max_block_size: int = MAX_BLOCK_SIZE) -> List[Tuple[int, int]]:
+    """Wszystkie pary pacjentów ze wspólną grupą (bez powtórzeń)"""
+    cursor.execute("""
+        SELECT group_concat(patient_id) FROM patient_blocks
+        GROUP BY block_key HAVING COUNT(*) BETWEEN 2 AND ?
+    """, (max_block_size,))
+    pairs = set()
+    for (members,) in cursor:
+        pairs.update(combinations(sorted(int(member) for member in members.split(',')), 2))
+    return sorted(pairs)
+
+
+def _score_pairs(db_path: str, pairs: List[Tuple[int, int]], min_score: float,
+                 cipher: Optional[FieldCipher] = None) -> List[tuple]:
+    """Ocena porcji par - wykonywana w osobnym procesie z własnym połączeniem tylko do odczytu"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        patients = _fetch_patients(conn.cursor(), sorted({patient_id for pair in pairs for patient_id in pair}), cipher)
+    finally:
+        conn.close()
+    results = []
+    for a, b in pairs:
+        if a in patients and b in patients:
+            score, reasons = score_pair(patients[a], patients[b])
+            if score >= min_score:
+                results.append((a, b, score, reasons))
+    return results
+
+
+def scan_duplicates(db_path: Path, workers: Optional[int] = None, min_score: float = DUPLICATE_MIN_SCORE,
+                    chunk_pairs: int = SCAN_CHUNK_PAIRS, cipher: Optional[FieldCipher] = None) -> List[Dict]:
+    """Przegląda całą tabelę patients i zwraca pary kandydatów do scalenia (od najpewniejszych).
+
+    Pary wynikają z indeksu patient_blocks (jedno zapytanie GROUP BY),
+    a ich ocena jest dzielona na porcje wykonywane równolegle przez
+    workers procesów (domyślnie liczba rdzeni). cipher trafia do procesów
+    jako klucze (FieldCipher jest serializowany przez pickle).
+    """
+    db_path = str(db_path)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        pairs = candidate_pairs(conn.cursor())
+    finally:
+        conn.close()
+
+    chunks = [pairs[start:start + chunk_pairs] for start in range(0, len(pairs), chunk_pairs)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        scored = [_score_pairs(db_path, chunk, min_score, cipher) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scored = list(pool.map(_score_pairs, [db_path] * len(chunks), chunks, [min_score] * len(chunks),
+                                   [cipher] * len(chunks)))
+
+    results = [
+        {'patient_id': a, 'duplicate_id': b, 'score': score, 'reasons': reasons}
+        for chunk in scored for a, b, score, reasons in chunk
+    ]
+    return sorted(results, key=lambda pair: (-pair['score'], pair['patient_id'], pair['duplicate_id']))
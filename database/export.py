@@ -0,0 +1,245 @@
+import csv
+import gzip
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from .crypto import ENCRYPTED_PATIENT_FIELDS, FieldCipher
+from .notes_codec import decode_notes
+
+EXPORT_FORMATS = ('csv', 'ndjson', 'parquet')
+# Wiersze pobierane z bazy na raz (fetchmany) i zapisywane jedną partią
+EXPORT_CHUNK_SIZE = 5000
+
+# Eksportowane tabele: kolumny i typ każdej (schemat Parquet)
+EXPORT_TABLES = {
+    'patients': [
+        ('id', 'int'), ('first_name', 'str'), ('last_name', 'str'), ('pesel', 'str'), ('birth_date', 'str'),
+        ('gender', 'str'), ('phone', 'str'), ('email', 'str'), ('emergency_contact', 'str'),
+        ('allergies', 'str'), ('medications', 'str'), ('medical_history', 'str'), ('notes', 'str'),
+        ('consent_treatment', 'bool'), ('consent_data', 'bool'), ('consent_marketing', 'bool'),
+        ('is_active', 'bool'), ('created_at', 'str'), ('updated_at', 'str'),
+    ],
+    'sessions': [
+        ('id', 'int'), ('patient_id', 'int'), ('module_type', 'str'), ('session_date', 'str'),
+        ('therapist_name', 'str'), ('primary_diagnosis', 'str'), ('confidence_level', 'float'),
+        ('treatment_plan', 'str'), ('referral_notes', 'str'), ('session_notes', 'json'),
+        ('is_completed', 'bool'), ('created_at', 'str'),
+    ],
+    'test_results': [
+        ('id', 'int'), ('session_id', 'int'), ('test_name', 'str'), ('test_result', 'str'),
+        ('test_score', 'float'), ('test_notes', 'str'), ('performed_at', 'str'),
+    ],
+}
+TABLE_SOURCES = {'patients': 'patients', 'sessions': 'diagnosis_sessions', 'test_results': 'test_results'}
+
+
+@dataclass
+class ExportFilter:
+    """Filtry eksportu; daty w formacie ISO, date_to wyłącznie.
+
+    Filtry dotyczą sesji - wyniki testów są eksportowane dla pasujących
+    sesji, a pacjenci, którzy mieli co najmniej jedną pasującą sesję.
+    """
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    module_type: Optional[str] = None
+    therapist_name: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        return not any((self.date_from, self.date_to, self.module_type, self.therapist_name))
+
+    def session_conditions(self, alias: str = 'diagnosis_sessions') -> Tuple[List[str], List[Any]]:
+        conditions, params = [], []
+        for column, op, value in (('session_date', '>=', self.date_from), ('session_date', '<', self.date_to),
+                                  ('module_type', '=', self.module_type),
+                                  ('therapist_name', '=', self.therapist_name)):
+            if value:
+                conditions.append(f"{alias}.{column} {op} ?")
+                params.append(value)
+        return conditions, params
+
+
+def export_query(table: str, filters: Optional[ExportFilter] = None) -> Tuple[str, List[Any]]:
+    """Zapytanie jednej partii eksportu - po parametrach filtrów dochodzą ostatnie id i limit partii"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Nieznana tabela eksportu: {table}")
+    columns = ", ".join(f"t.{name}" for name, _ in EXPORT_TABLES[table])
+    sql = f"SELECT {columns} FROM {TABLE_SOURCES[table]} t"
+    conditions, params = [], []
+    if filters is not None and not filters.is_empty():
+        session_conditions, params = filters.session_conditions('s')
+        where = " AND ".join(session_conditions)
+        if table == 'sessions':
+            conditions, params = filters.session_conditions('t')
+        elif table == 'test_results':
+            sql += " JOIN diagnosis_sessions s ON s.id = t.session_id"
+            conditions = session_conditions
+        else:
+            conditions = [f"EXISTS (SELECT 1 FROM diagnosis_sessions s WHERE s.patient_id = t.id AND {where})"]
+    # Stronicowanie po kluczu - każda partia to krótki odczyt od miejsca, w którym skończyła poprzednia
+    conditions.append("t.id > ?")
+    return sql + " WHERE " + " AND ".join(conditions) + " ORDER BY t.id LIMIT ?", params
+
+
+def _open_output(path: Path) -> IO:
+    if path.suffix == '.gz':
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def detect_format(path: Path) -> str:
+    suffixes = [suffix.lstrip('.') for suffix in Path(path).suffixes if suffix != '.gz']
+    fmt = suffixes[-1] if suffixes else ''
+    fmt = 'ndjson' if fmt in ('jsonl', 'json') else fmt
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Nieznany format eksportu: {path} (obsługiwane: {', '.join(EXPORT_FORMATS)})")
+    return fmt
+
+
+class _CsvWriter:
+    def __init__(self, path: Path, columns: List[Tuple[str, str]]):
+        self.file = _open_output(path)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in columns])
+        # Notatki jako zwarty JSON w jednej komórce; tekst przechodzi bez parsowania
+        self.json_columns = [i for i, (_, kind) in enumerate(columns) if kind == 'json']
+
+    def write(self, rows: List[tuple]):
+        if self.json_columns:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for i in self.json_columns:
+                    if isinstance(row[i], bytes):
+                        row[i] = json.dumps(decode_notes(row[i]), ensure_ascii=False, separators=(',', ':'))
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _NdjsonWriter:
+    def __init__(self, path: Path, columns: List[Tuple[str, str]]):
+        self.file = _open_output(path)
+        self.names = [name for name, _ in columns]
+        self.json_columns = [name for name, kind in columns if kind == 'json']
+        self.bool_columns = [name for name, kind in columns if kind == 'bool']
+
+    def write(self, rows: List[tuple]):
+        lines = []
+        for row in rows:
+            record = dict(zip(self.names, row))
+            for name in self.json_columns:
+                record[name] = decode_notes(record[name]) if record[name] is not None else None
+            for name in self.bool_columns:
+                if record[name] is not None:
+                    record[name] = bool(record[name])
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self.file.write("\n".join(lines) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: Path, columns: List[Tuple[str, str]]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("Eksport do Parquet wymaga pakietu pyarrow (pip install pyarrow)") from error
+        types = {'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_(), 'str': pa.string(), 'json': pa.string()}
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression='zstd')
+
+    def write(self, rows: List[tuple]):
+        arrays = []
+        for i, (name, kind) in enumerate(self.columns):
+            values = [row[i] for row in rows]
+            if kind == 'json':
+                values = [json.dumps(decode_notes(value), ensure_ascii=False, separators=(',', ':'))
+                          if isinstance(value, bytes) else value for value in values]
+            elif kind == 'bool':
+                values = [None if value is None else bool(value) for value in values]
+            arrays.append(self.pa.array(values, type=self.schema.field(name).type))
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'csv': _CsvWriter, 'ndjson': _NdjsonWriter, 'parquet': _ParquetWriter}
+
+
+def iter_chunks(conn: sqlite3.Connection, sql: str, params: List[Any], chunk_size: int) -> Iterator[List[tuple]]:
+    """Partie zapytania export_query; każda czytana osobnym zapytaniem (pierwsza kolumna to id)"""
+    last_id = 0
+    while True:
+        rows = conn.execute(sql, params + [last_id, chunk_size]).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+def decrypt_chunk(rows: List[tuple], columns: List[Tuple[str, str]], cipher: FieldCipher) -> List[tuple]:
+    """Odszyfrowuje zaszyfrowane kolumny partii - jedna kolumna naraz"""
+    values = [list(column) for column in zip(*rows)]
+    names = [name for name, _ in columns]
+    for field in ENCRYPTED_PATIENT_FIELDS:
+        index = names.index(field)
+        values[index] = cipher.decrypt_many(values[index], field)
+    return list(zip(*values))
+
+
+def export_table(connect: Callable[[], sqlite3.Connection], table: str, path: Path, fmt: Optional[str] = None,
+                 filters: Optional[ExportFilter] = None, chunk_size: int = EXPORT_CHUNK_SIZE,
+                 progress: Optional[Callable[[int, float], None]] = None,
+                 cipher: Optional[FieldCipher] = None) -> Dict[str, Any]:
+    """Eksportuje tabelę strumieniowo - w pamięci jest najwyżej chunk_size wierszy.
+
+    Format wynika z rozszerzenia pliku (.csv, .ndjson/.jsonl, .parquet;
+    dodatkowe .gz kompresuje CSV i NDJSON). Zwraca liczbę wierszy, czas
+    i przepustowość (wiersze/s). Z cipher zaszyfrowane pola pacjentów
+    są odszyfrowywane partiami (database.crypto).
+
+    Każda partia to osobna, krótka transakcja odczytu (WHERE id > ostatnie
+    id), więc zapisy aplikacji nie czekają na koniec eksportu. Eksport nie
+    jest przez to migawką jednej chwili - wiersze dodane w trakcie
+    trafiają do pliku, jeśli ich id jest większe od już zapisanych.
+    """
+    path = Path(path)
+    fmt = fmt or detect_format(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Nieznany format eksportu: {fmt}")
+    sql, params = export_query(table, filters)
+    columns = EXPORT_TABLES[table]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    rows_done = 0
+    writer = WRITERS[fmt](path, columns)
+    conn = connect()
+    try:
+        for rows in iter_chunks(conn, sql, params, chunk_size):
+            if cipher and table == 'patients':
+                rows = decrypt_chunk(rows, columns, cipher)
+            writer.write(rows)
+            rows_done += len(rows)
+            if progress:
+                progress(rows_done, time.perf_counter() - started)
+    finally:
+        writer.close()
+        conn.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        'table': table, 'path': str(path), 'format': fmt, 'rows': rows_done,
+        'seconds': round(seconds, 3), 'rows_per_s': round(rows_done / seconds) if seconds else None,
+        'bytes': path.stat().st_size
+    }
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Sekcja dla wartości zapisanych bezpośrednio w głównym słowniku wyników
+ROOT_SECTION = ''
+# Operatory dozwolone w filtrach
+FILTER_OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'in')
+
+FindingRow = Tuple[str, str, str, Optional[str], Optional[float]]
+
+
+def typed_value(value: Any) -> Tuple[str, Optional[str], Optional[float]]:
+    """Zwraca (value_type, value_text, value_num) dla pojedynczej wartości"""
+    if value is None:
+        return 'null', None, None
+    if isinstance(value, bool):
+        return 'bool', None, float(value)
+    if isinstance(value, int):
+        return 'int', None, float(value)
+    if isinstance(value, float):
+        return 'real', None, value
+    return 'text', str(value), None
+
+
+def flatten_findings(notes: Dict[str, Any]) -> List[FindingRow]:
+    """Spłaszcza wyniki badania do wierszy (section, key, value_type, value_text, value_num).
+
+    Słownik najwyższego poziomu (np. interview, risk_scores, test_results)
+    jest sekcją, a zagnieżdżone słowniki dają klucze z kropką
+    ("test_results.Test Thompson'a"). Wartości najwyższego poziomu trafiają
+    do sekcji ROOT_SECTION. Lista (np. z multiselect) daje wiersz na element.
+    """
+    rows = []
+    for name, value in notes.items():
+        if isinstance(value, dict):
+            rows.extend(_flatten(str(name), '', value))
+        else:
+            rows.extend(_flatten(ROOT_SECTION, str(name), value))
+    return rows
+
+
+def _flatten(section: str, key: str, value: Any) -> Iterator[FindingRow]:
+    if isinstance(value, dict):
+        for child_key, child_value in value.items():
+            yield from _flatten(section, f"{key}.{child_key}" if key else str(child_key), child_value)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from _flatten(section, key, item)
+    else:
+        yield (section, key) + typed_value(value)
+
+
+@dataclass
+class FindingFilter:
+    """Warunek na jedną wartość wyników badania, np. FindingFilter('test_results', "Test Thompson'a", '=', 'Pozytywny')"""
+    section: str
+    key: str
+    op: str = '='
+    value: Any = True
+
+    def to_sql(self) -> Tuple[str, List[Any]]:
+        """Zwraca podzapytanie zwracające session_id sesji spełniających warunek"""
+        if self.op not in FILTER_OPERATORS:
+            raise ValueError(f"Nieobsługiwany operator: {self.op}")
+
+        values = list(self.value) if self.op == 'in' else [self.value]
+        if not values:
+            raise ValueError("Operator 'in' wymaga niepustej listy wartości")
+        value_type, _, _ = typed_value(values[0])
+        column = 'value_text' if value_type == 'text' else 'value_num'
+        params = [typed_value(v)[1] if column == 'value_text' else typed_value(v)[2] for v in values]
+
+        if value_type == 'null':
+            condition = "value_type = 'null'" if self.op == '=' else "value_type != 'null'"
+            params = []
+        elif self.op == 'in':
+            condition = f"{column} IN ({', '.join('?' * len(params))})"
+        else:
+            condition = f"{column} {self.op} ?"
+
+        sql = f"SELECT session_id FROM session_findings WHERE section = ? AND key = ? AND {condition}"
+        return sql, [self.section, self.key] + params
+
+
+def findings_subquery(filters: List[FindingFilter]) -> Tuple[str, List[Any]]:
+    """Łączy warunki (AND) w jedno podzapytanie o session_id"""
+    if not filters:
+        raise ValueError("Podaj co najmniej jeden warunek")
+    parts, params = [], []
+    for finding_filter in filters:
+        sql, filter_params = finding_filter.to_sql()
+        parts.append(sql)
+        params.extend(filter_params)
+    return " INTERSECT ".join(parts), params
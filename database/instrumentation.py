@@ -0,0 +1,395 @@
+import functools
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .metrics import observe_instrumentation
+
+# Górne granice kubełków histogramu latencji (ms); ostatni łapie wszystko powyżej
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+# Maksymalna długość nazwy zapytania (znormalizowanego SQL)
+QUERY_NAME_LENGTH = 120
+# Tylko te instrukcje mają sensowny EXPLAIN QUERY PLAN
+EXPLAINABLE_PREFIXES = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def query_name(sql: str) -> str:
+    """Zwraca nazwę zapytania - SQL ze znormalizowanymi białymi znakami"""
+    return _WHITESPACE.sub(' ', sql).strip()[:QUERY_NAME_LENGTH]
+
+
+class LatencyHistogram:
+    """Histogram latencji o stałych kubełkach (liczba, suma, maksimum, percentyle przybliżone)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def observe(self, elapsed_ms: float, rows: int = 0):
+        for index, bound in enumerate(self.buckets):
+            if elapsed_ms <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.rows += rows
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, fraction: float) -> float:
+        """Zwraca górną granicę kubełka zawierającego dany percentyl"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows
+        }
+
+
+class QueryStats:
+    """Histogramy latencji i liczba zwróconych wierszy per nazwa (zapytanie lub metoda)"""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, elapsed_ms: float, rows: int = 0):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.observe(elapsed_ms, rows)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in self._histograms.items()}
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+class _CountingParameters:
+    """Iterator parametrów executemany liczący wiersze i wartości w trakcie przejścia (bez kopiowania)"""
+
+    __slots__ = ('_iterator', 'rows', 'values')
+
+    def __init__(self, seq_of_parameters):
+        self._iterator = iter(seq_of_parameters)
+        self.rows = 0
+        self.values = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        parameters = next(self._iterator)
+        self.rows += 1
+        self.values += len(parameters)
+        return parameters
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Kursor mierzący czas wykonania i pobierania wyników oraz liczbę wierszy"""
+
+    instrumentation: 'Instrumentation' = None
+    _pending: Optional[Dict[str, Any]] = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._begin(sql, parameters, started, many=False)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        # Generator parametrów (import wsadowy) jest przekazywany strumieniowo - liczymy w trakcie
+        seq_of_parameters = _CountingParameters(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._begin(sql, seq_of_parameters, started, many=True)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._track(started, 0 if row is None else 1, exhausted=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._track(started, len(rows), exhausted=len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._track(started, len(rows), exhausted=True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._track(started, 0, exhausted=True)
+            raise
+        self._track(started, 1, exhausted=False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Kursor porzucony bez pobrania wyników; połączenie mogło już zostać zamknięte
+        if self._pending is not None:
+            try:
+                self._finish()
+            except sqlite3.Error:
+                pass
+
+    def _begin(self, sql: str, parameters, started: float, many: bool):
+        self._pending = {
+            'sql': sql,
+            'parameters': None if many else parameters,
+            'param_count': parameters.values if many else len(parameters),
+            'elapsed': time.perf_counter() - started,
+            'rows': 0
+        }
+        self.connection._pending_cursors.add(self)
+
+    def _track(self, started: float, rows: int, exhausted: bool):
+        pending = self._pending
+        if pending is None:
+            return
+        pending['elapsed'] += time.perf_counter() - started
+        pending['rows'] += rows
+        if exhausted:
+            self._finish()
+
+    def _finish(self):
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        self.connection._pending_cursors.discard(self)
+        if pending['rows'] == 0 and self.rowcount > 0:
+            # INSERT/UPDATE/DELETE - liczba zmienionych wierszy
+            pending['rows'] = self.rowcount
+        self.instrumentation.record_query(self.connection, pending)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Połączenie, którego kursory są instrumentowane"""
+
+    instrumentation: 'Instrumentation' = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending_cursors = set()
+
+    def cursor(self, factory=None):
+        cursor = super().cursor(factory or InstrumentedCursor)
+        cursor.instrumentation = self.instrumentation
+        return cursor
+
+    # Connection.execute w C omija cursor(), więc kierujemy go przez nasz kursor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def flush_pending(self):
+        """Zamyka pomiary kursorów, których wyniki nie zostały pobrane do końca"""
+        for cursor in list(self._pending_cursors):
+            cursor._finish()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush_pending()
+        return super().__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        self.flush_pending()
+        super().close()
+
+
+class Instrumentation:
+    """Pomiar metod publicznych DatabaseManager i instrukcji SQL.
+
+    Zbiera histogramy latencji per zapytanie i per metodę, a instrukcje
+    wolniejsze niż slow_threshold_ms zapisuje do dziennika wolnych zapytań
+    (JSON lines) razem z EXPLAIN QUERY PLAN. Wartości parametrów nie są
+    zapisywane - zawierają dane pacjentów.
+    """
+
+    def __init__(self, slow_threshold_ms: float = 100.0, slow_log_path: Optional[str] = None,
+                 explain: bool = True):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_path = Path(slow_log_path) if slow_log_path else None
+        self.explain = explain
+        self.queries = QueryStats()
+        self.methods = QueryStats()
+        self.slow_queries: List[Dict[str, Any]] = []
+        self.max_slow_queries = 100
+        self._listeners: List[Callable[[str, str, float, int], None]] = []
+        self._local = threading.local()
+        self._log_lock = threading.Lock()
+
+        self.connection_class = type('InstrumentedConnection', (InstrumentedConnection,), {'instrumentation': self})
+
+    def connect(self, db_path) -> sqlite3.Connection:
+        """Otwiera instrumentowane połączenie"""
+        return sqlite3.connect(db_path, factory=self.connection_class)
+
+    def add_listener(self, listener: Callable[[str, str, float, int], None]):
+        """Rejestruje funkcję listener(kind, name, elapsed_ms, rows) wywoływaną po każdym pomiarze"""
+        self._listeners.append(listener)
+
+    # === POMIAR ===
+
+    def current_method(self) -> Optional[str]:
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def wrap_method(self, name: str, method: Callable) -> Callable:
+        """Zwraca metodę mierzącą swój czas wykonania"""
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            stack = getattr(self._local, 'stack', None)
+            if stack is None:
+                stack = self._local.stack = []
+            stack.append(name)
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stack.pop()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.methods.observe(name, elapsed_ms)
+                self._notify('method', name, elapsed_ms, 0)
+        timed._instrumented = True
+        return timed
+
+    def record_query(self, conn: sqlite3.Connection, pending: Dict[str, Any]):
+        name = query_name(pending['sql'])
+        elapsed_ms = pending['elapsed'] * 1000
+        rows = max(pending['rows'], 0)
+        self.queries.observe(name, elapsed_ms, rows)
+        self._notify('query', name, elapsed_ms, rows)
+        if elapsed_ms >= self.slow_threshold_ms:
+            self._log_slow_query(conn, pending, elapsed_ms, rows)
+
+    def _notify(self, kind: str, name: str, elapsed_ms: float, rows: int):
+        for listener in self._listeners:
+            listener(kind, name, elapsed_ms, rows)
+
+    def _log_slow_query(self, conn: sqlite3.Connection, pending: Dict[str, Any], elapsed_ms: float, rows: int):
+        entry = {
+            'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+            'method': self.current_method(),
+            'sql': _WHITESPACE.sub(' ', pending['sql']).strip(),
+            'param_count': pending['param_count'],
+            'elapsed_ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'plan': self._explain(conn, pending['sql'], pending['parameters'])
+        }
+        with self._log_lock:
+            self.slow_queries.append(entry)
+            del self.slow_queries[:-self.max_slow_queries]
+            if self.slow_log_path:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def _explain(self, conn: sqlite3.Connection, sql: str, parameters) -> Optional[List[str]]:
+        if not self.explain or parameters is None or not sql.lstrip().upper().startswith(EXPLAINABLE_PREFIXES):
+            return None
+        try:
+            # Zwykły kursor - plan zapytania nie powinien trafić do statystyk
+            cursor = sqlite3.Cursor(conn)
+            rows = sqlite3.Cursor.execute(cursor, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+            return [row[-1] for row in rows]
+        except sqlite3.Error:
+            return None
+
+    # === RAPORT ===
+
+    def report(self, limit: int = 20) -> Dict[str, Any]:
+        """Zwraca najwolniejsze (łączny czas) zapytania i metody oraz ostatnie wolne zapytania"""
+        def top(stats: QueryStats):
+            summary = stats.summary()
+            ordered = sorted(summary.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+            return dict(ordered[:limit])
+
+        with self._log_lock:
+            slow_queries = list(self.slow_queries)
+        return {
+            'queries': top(self.queries),
+            'methods': top(self.methods),
+            'slow_queries': slow_queries
+        }
+
+    def reset(self):
+        self.queries.clear()
+        self.methods.clear()
+        with self._log_lock:
+            self.slow_queries.clear()
+
+
+def instrument(db, slow_threshold_ms: float = 100.0, slow_log_path: Optional[str] = None,
+               explain: bool = True) -> Instrumentation:
+    """Włącza pomiar dla instancji DatabaseManager (pomiary trafiają też do metryk fizjo_db_*)"""
+    if db.instrumentation is not None:
+        return db.instrumentation
+
+    instrumentation = Instrumentation(slow_threshold_ms, slow_log_path, explain)
+    observe_instrumentation(instrumentation)
+    for name in dir(type(db)):
+        if name.startswith('_'):
+            continue
+        method = getattr(db, name)
+        if callable(method):
+            setattr(db, name, instrumentation.wrap_method(name, method))
+    db.instrumentation = instrumentation
+    return instrumentation
+
+
+def uninstrument(db):
+    """Wyłącza pomiar - przywraca niemierzone metody i zwykłe połączenia"""
+    for name, value in list(vars(db).items()):
+        if getattr(value, '_instrumented', False):
+            # Pod spodem może być inne opakowanie (np. span z database.tracing)
+            setattr(db, name, value.__wrapped__)
+    db.instrumentation = None
@@ -0,0 +1,56 @@
+import sqlite3
+from dataclasses import dataclass
+from typing import Tuple
+
+# Kolumny generowane wymagają SQLite 3.31+
+GENERATED_COLUMNS_MIN_SQLITE = (3, 31, 0)
+
+
+@dataclass(frozen=True)
+class JsonIndex:
+    """Indeksowana wartość z session_notes.
+
+    paths to ścieżki JSON1 sprawdzane po kolei (COALESCE) - moduły zapisują
+    wyniki płasko ($.mechanism), a starsze notatki w sekcjach
+    ($.interview.mechanism).
+    """
+    name: str
+    paths: Tuple[str, ...]
+    affinity: str = 'TEXT'
+
+    @property
+    def column(self) -> str:
+        return f"notes_{self.name}"
+
+    @property
+    def index_name(self) -> str:
+        return f"idx_sessions_notes_{self.name}"
+
+    def expression(self, source: str = 'session_notes') -> str:
+        """Wyrażenie kolumny generowanej; niepoprawny JSON (lub BLOB) daje NULL zamiast błędu"""
+        extracts = ", ".join(f"json_extract({source}, '{path}')" for path in self.paths)
+        value = f"COALESCE({extracts})" if len(self.paths) > 1 else extracts
+        return f"CASE WHEN typeof({source}) = 'text' AND json_valid({source}) THEN {value} END"
+
+    def column_definition(self) -> str:
+        return f"{self.column} {self.affinity} GENERATED ALWAYS AS ({self.expression()}) VIRTUAL"
+
+    def index_definition(self) -> str:
+        # Indeks częściowy - sesje bez tej wartości nie zajmują miejsca
+        return (f"CREATE INDEX IF NOT EXISTS {self.index_name} ON diagnosis_sessions"
+                f"({self.column}, session_date) WHERE {self.column} IS NOT NULL")
+
+
+# Ścieżki session_notes indeksowane w diagnosis_sessions (dopisz, aby dodać kolejną)
+JSON_INDEXES = (
+    JsonIndex('mechanism', ('$.interview.mechanism', '$.mechanism'), 'TEXT'),
+    JsonIndex('pain_intensity', ('$.interview.pain_intensity', '$.pain_intensity'), 'INTEGER'),
+    JsonIndex('acl_injury_risk', ('$.risk_scores.acl_injury_risk',), 'REAL'),
+    JsonIndex('ottawa_fracture_risk', ('$.risk_scores.ottawa_fracture_risk',), 'REAL'),
+)
+
+JSON_INDEXES_BY_NAME = {json_index.name: json_index for json_index in JSON_INDEXES}
+
+
+def generated_columns_supported() -> bool:
+    return sqlite3.sqlite_version_info >= GENERATED_COLUMNS_MIN_SQLITE
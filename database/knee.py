@@ -1,11 +1,14 @@
 import streamlit as st
 from typing import Dict, List, Any, Optional
 from .base_module import BaseModule, AssessmentStep
+from .diagnosis_cache import memoized_diagnosis
 from ..database.models import Patient, DiagnosticTest, Diagnosis
 
 class KneeModule(BaseModule):
     """Moduł diagnostyczny dla kolana"""
     
+    SCORING_RULES_VERSION = "1.0"
+    
     def __init__(self):
         super().__init__("Kolano", "🦵")
     
@@ -701,6 +704,7 @@ class KneeModule(BaseModule):
         
         return scores
     
+    @memoized_diagnosis
     def generate_diagnosis(self, findings: Dict[str, Any]) -> Diagnosis:
         """Generuje diagnozę dla kolana"""
         risk_scores = findings.get('risk_scores', {})
@@ -0,0 +1,267 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Zmienne środowiskowe konfigurujące retencję logów
+LOG_RETENTION_DAYS_ENV = 'FIZJO_LOG_RETENTION_DAYS'
+LOG_ARCHIVE_MONTHS_ENV = 'FIZJO_LOG_ARCHIVE_MONTHS'
+# Format created_at (CURRENT_TIMESTAMP w SQLite, UTC)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+ARCHIVE_FILE_PATTERN = re.compile(r'^system_logs_(\d{4})_(\d{2})\.db$')
+
+ARCHIVE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.system_logs (
+        id INTEGER PRIMARY KEY,
+        log_level TEXT NOT NULL,
+        message TEXT NOT NULL,
+        module_name TEXT,
+        user_id TEXT,
+        created_at TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_logs_created ON system_logs(created_at)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_logs_level_created ON system_logs(log_level, created_at)",
+)
+
+
+@dataclass
+class LogRetention:
+    """Retencja system_logs.
+
+    Wpisy starsze niż keep_days przenoszone są do miesięcznych plików
+    archiwum (<baza>_logs/system_logs_RRRR_MM.db). Pliki archiwum starsze
+    niż archive_months miesięcy są usuwane; None - archiwum jest trwałe.
+    """
+    keep_days: int = 90
+    archive_months: Optional[int] = None
+    batch_size: int = 500
+    pause_seconds: float = 0.05
+
+    @classmethod
+    def from_env(cls) -> 'LogRetention':
+        retention = cls()
+        if os.environ.get(LOG_RETENTION_DAYS_ENV):
+            retention.keep_days = int(os.environ[LOG_RETENTION_DAYS_ENV])
+        if os.environ.get(LOG_ARCHIVE_MONTHS_ENV):
+            retention.archive_months = int(os.environ[LOG_ARCHIVE_MONTHS_ENV])
+        return retention
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(moment: datetime) -> datetime:
+    return (month_start(moment) + timedelta(days=32)).replace(day=1)
+
+
+class LogArchive:
+    """Miesięczne archiwum system_logs w osobnych plikach SQLite (ATTACH)"""
+
+    def __init__(self, db_path: Path, connect: Callable[[], sqlite3.Connection],
+                 retention: Optional[LogRetention] = None):
+        self.db_path = Path(db_path)
+        self.connect = connect
+        self.retention = retention or LogRetention.from_env()
+        self.archive_dir = self.db_path.with_name(f"{self.db_path.stem}_logs")
+        self._lock = threading.Lock()
+
+    def segment_path(self, month: datetime) -> Path:
+        return self.archive_dir / f"system_logs_{month:%Y_%m}.db"
+
+    def segments(self) -> List[Tuple[datetime, Path]]:
+        """Pliki archiwum posortowane od najstarszego"""
+        if not self.archive_dir.exists():
+            return []
+        found = []
+        for path in self.archive_dir.iterdir():
+            match = ARCHIVE_FILE_PATTERN.match(path.name)
+            if match:
+                found.append((datetime(int(match.group(1)), int(match.group(2)), 1), path))
+        return sorted(found)
+
+    def _attach(self, cursor: sqlite3.Cursor, path: Path, schema: str = 'archive'):
+        cursor.execute("ATTACH DATABASE ? AS " + schema, (str(path),))
+
+    def archive(self, now: Optional[datetime] = None,
+                progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Przenosi wpisy starsze niż keep_days do archiwum miesięcznego (partiami).
+
+        Każda partia (kopia do archiwum i usunięcie z bazy) to jedna krótka
+        transakcja. Kopia używa INSERT OR IGNORE po id, więc przerwana
+        partia powtórzona później nie tworzy duplikatów.
+        """
+        with self._lock:
+            return self._archive(now or datetime.utcnow(), progress)
+
+    def _archive(self, now: datetime, progress: Optional[Callable[[str], None]]) -> Dict[str, Any]:
+        retention = self.retention
+        cutoff = (now - timedelta(days=retention.keep_days)).strftime(TIMESTAMP_FORMAT)
+        stats = {'archived': 0, 'batches': 0, 'segments': [], 'removed_segments': []}
+        started = time.perf_counter()
+
+        conn = self.connect()
+        conn.isolation_level = None
+        try:
+            cursor = conn.cursor()
+            month = self._oldest_month(cursor, '', cutoff)
+
+            while month is not None:
+                lower = month.strftime(TIMESTAMP_FORMAT)
+                upper = min(next_month(month).strftime(TIMESTAMP_FORMAT), cutoff)
+                self.archive_dir.mkdir(parents=True, exist_ok=True)
+                self._attach(cursor, self.segment_path(month))
+                try:
+                    for sql in ARCHIVE_SCHEMA:
+                        cursor.execute(sql.format(schema='archive'))
+                    moved, batches = self._move_month(cursor, lower, upper, progress)
+                finally:
+                    cursor.execute("DETACH DATABASE archive")
+                stats['batches'] += batches
+                if moved:
+                    stats['archived'] += moved
+                    stats['segments'].append(f"{month:%Y-%m}")
+                # Następny miesiąc z wpisami - bez pustych plików dla miesięcy bez logów
+                month = self._oldest_month(cursor, upper, cutoff)
+        finally:
+            conn.close()
+
+        if retention.archive_months is not None:
+            expire_before = month_start(now)
+            for _ in range(retention.archive_months):
+                expire_before = month_start(expire_before - timedelta(days=1))
+            for month, path in self.segments():
+                if month < expire_before:
+                    path.unlink()
+                    stats['removed_segments'].append(f"{month:%Y-%m}")
+
+        stats['duration_s'] = round(time.perf_counter() - started, 2)
+        return stats
+
+    def _oldest_month(self, cursor: sqlite3.Cursor, since: str, cutoff: str) -> Optional[datetime]:
+        """Początek miesiąca najstarszego wpisu z przedziału [since, cutoff) lub None"""
+        oldest = cursor.execute("SELECT MIN(created_at) FROM main.system_logs WHERE created_at >= ? AND created_at < ?",
+                                (since, cutoff)).fetchone()[0]
+        return month_start(datetime.strptime(oldest[:19], TIMESTAMP_FORMAT)) if oldest else None
+
+    def _move_month(self, cursor: sqlite3.Cursor, lower: str, upper: str,
+                    progress: Optional[Callable[[str], None]]) -> Tuple[int, int]:
+        batch = """
+            SELECT id FROM main.system_logs
+            WHERE created_at >= ? AND created_at < ?
+            ORDER BY created_at LIMIT ?
+        """
+        params = (lower, upper, self.retention.batch_size)
+        moved = batches = 0
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(f"""
+                    INSERT OR IGNORE INTO archive.system_logs
+                    SELECT id, log_level, message, module_name, user_id, created_at
+                    FROM main.system_logs WHERE id IN ({batch})
+                """, params)
+                cursor.execute(f"DELETE FROM main.system_logs WHERE id IN ({batch})", params)
+                deleted = cursor.rowcount
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
+            moved += deleted
+            batches += 1
+            if deleted < self.retention.batch_size:
+                return moved, batches
+            if progress:
+                progress(f"{lower[:7]}: {moved} wpisów")
+            time.sleep(self.retention.pause_seconds)
+
+    def query(self, limit: int = 100, level: str = None, since: str = None,
+              until: str = None) -> List[Dict[str, Any]]:
+        """Pobiera wpisy z plików archiwum (od najnowszych), dołączając je po kolei"""
+        results = []
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            for month, path in reversed(self.segments()):
+                if len(results) >= limit:
+                    break
+                if since and next_month(month).strftime(TIMESTAMP_FORMAT) <= since:
+                    break
+                if until and month.strftime(TIMESTAMP_FORMAT) >= until:
+                    continue
+
+                where, params = [], []
+                if level:
+                    where.append("log_level = ?")
+                    params.append(level)
+                if since:
+                    where.append("created_at >= ?")
+                    params.append(since)
+                if until:
+                    where.append("created_at < ?")
+                    params.append(until)
+                sql = "SELECT * FROM archive.system_logs"
+                if where:
+                    sql += " WHERE " + " AND ".join(where)
+                sql += " ORDER BY created_at DESC LIMIT ?"
+                params.append(limit - len(results))
+
+                self._attach(cursor, path)
+                try:
+                    rows = cursor.execute(sql, params).fetchall()
+                    results.extend(dict(row, archive=f"{month:%Y-%m}") for row in rows)
+                finally:
+                    cursor.execute("DETACH DATABASE archive")
+        finally:
+            conn.close()
+        return results
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Lista plików archiwum z liczbą wpisów i rozmiarem"""
+        summary = []
+        for month, path in self.segments():
+            with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+                count = conn.execute("SELECT COUNT(*) FROM system_logs").fetchone()[0]
+            summary.append({'month': f"{month:%Y-%m}", 'path': str(path), 'rows': count,
+                            'bytes': path.stat().st_size})
+        return summary
+
+    def start_maintenance(self, interval: float = 3600.0) -> 'LogMaintenance':
+        maintenance = LogMaintenance(self, interval)
+        maintenance.start()
+        return maintenance
+
+
+class LogMaintenance(threading.Thread):
+    """Wątek w tle archiwizujący logi co interval sekund (stop() kończy go po bieżącym przebiegu)"""
+
+    def __init__(self, archive: LogArchive, interval: float):
+        super().__init__(name='log-maintenance', daemon=True)
+        self.archive = archive
+        self.interval = interval
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.last_result = self.archive.archive()
+                self.last_error = None
+            except sqlite3.Error as error:
+                # Baza zajęta lub zablokowana - spróbujemy w następnym cyklu
+                self.last_error = str(error)
+            self._stop_event.wait(self.interval)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        self.join(timeout)
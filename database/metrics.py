@@ -0,0 +1,395 @@
+import bisect
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Domyślne kubełki histogramów (sekundy)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Kubełki dla czasu całej oceny pacjenta (od wejścia w ocenę do diagnozy)
+ASSESSMENT_BUCKETS = (15, 30, 60, 120, 300, 600, 900, 1800, 3600)
+# Zmienne środowiskowe włączające eksport metryk
+METRICS_PORT_ENV = 'FIZJO_METRICS_PORT'
+METRICS_FILE_ENV = 'FIZJO_METRICS_FILE'
+METRICS_FILE_INTERVAL_SECONDS = 15
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _escape_help(value: str) -> str:
+    # W HELP cudzysłów nie jest znakiem specjalnym - tylko \ i nowa linia
+    return value.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# === WARTOŚCI POJEDYNCZYCH SERII ===
+
+class CounterValue:
+    """Licznik rosnący - zwiększany ręcznie albo odczytywany funkcją przy eksporcie"""
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Wartość będzie odczytywana z licznika prowadzonego gdzie indziej (np. LRUCache.hits)"""
+        self.function = function
+
+    def samples(self, name: str, labels) -> List[str]:
+        value = self.value
+        if self.function is not None:
+            try:
+                value = float(self.function())
+            except Exception:
+                return []
+        return [f"{name}{_format_labels(labels)} {_format_value(value)}"]
+
+
+class GaugeValue:
+    """Wartość chwilowa - ustawiana ręcznie albo liczona funkcją przy eksporcie"""
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        """Wartość będzie liczona wywołaniem funkcji przy każdym eksporcie"""
+        self.function = function
+
+    @contextmanager
+    def track_in_progress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def samples(self, name: str, labels) -> List[str]:
+        value = self.value
+        if self.function is not None:
+            try:
+                value = float(self.function())
+            except Exception:
+                return []
+        return [f"{name}{_format_labels(labels)} {_format_value(value)}"]
+
+
+class HistogramValue:
+    """Histogram o stałych kubełkach"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        # Wyszukanie kubełka poza blokadą - pod blokadą tylko trzy dodawania
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Mierzy czas wykonania bloku w sekundach"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name: str, labels) -> List[str]:
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            bucket_labels = list(labels) + [('le', _format_value(float(bound)))]
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+# === METRYKI ===
+
+class Metric(ABC):
+    """Metryka z opcjonalnymi etykietami; każda kombinacja etykiet to osobna seria"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child_for(())
+
+    @abstractmethod
+    def _new_child(self):
+        """Tworzy wartość jednej serii (CounterValue, GaugeValue, HistogramValue)"""
+
+    def _child_for(self, key: Tuple[str, ...]):
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def labels(self, *values, **kwargs):
+        """Zwraca serię dla podanych wartości etykiet"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"Metryka {self.name} wymaga etykiet {self.labelnames}")
+        return self._child_for(tuple(str(value) for value in values))
+
+    def __getattr__(self, name):
+        # Metryka bez etykiet deleguje inc/observe/set do jedynej serii
+        if name.startswith('_') or 'labelnames' not in self.__dict__ or self.labelnames:
+            raise AttributeError(name)
+        return getattr(self._default, name)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape_help(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.samples(self.name, list(zip(self.labelnames, key))))
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return CounterValue()
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return GaugeValue()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return HistogramValue(self.buckets)
+
+
+class MetricsRegistry:
+    """Rejestr metryk procesu eksportowany w formacie tekstowym Prometheusa"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not metric_class or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metryka {name} jest już zarejestrowana z innym typem lub etykietami")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Zwraca wszystkie metryki w formacie tekstowym Prometheusa"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        """Zapisuje metryki do pliku (atomowo - np. dla textfile collectora node_exportera)"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(self.render(), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    def start_http_server(self, port: int, addr: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Uruchamia w wątku w tle lokalny endpoint /metrics"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
+
+    def start_textfile_writer(self, path: str, interval: float = METRICS_FILE_INTERVAL_SECONDS) -> threading.Thread:
+        """Uruchamia wątek w tle zapisujący metryki do pliku co interval sekund"""
+        def loop():
+            while True:
+                try:
+                    self.write_textfile(path)
+                except OSError:
+                    pass
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name='metrics-textfile', daemon=True)
+        thread.start()
+        return thread
+
+
+registry = MetricsRegistry()
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+
+def start_exporter_from_env():
+    """Uruchamia eksport metryk raz na proces, jeśli ustawiono FIZJO_METRICS_PORT lub FIZJO_METRICS_FILE"""
+    global _exporter_started
+    if _exporter_started:
+        return
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+        port = os.environ.get(METRICS_PORT_ENV)
+        path = os.environ.get(METRICS_FILE_ENV)
+        if port:
+            try:
+                registry.start_http_server(int(port))
+            except OSError as e:
+                # Port zajęty (np. drugi proces Streamlit) - aplikacja działa dalej bez endpointu
+                warnings.warn(f"Nie udało się uruchomić eksportu metryk na porcie {port}: {e}", RuntimeWarning)
+        if path:
+            registry.start_textfile_writer(path)
+
+
+# === METRYKI APLIKACJI ===
+
+app_reruns = registry.counter(
+    'fizjo_app_reruns_total', 'Liczba przebiegów skryptu Streamlit per ekran', ['screen'])
+assessment_duration = registry.histogram(
+    'fizjo_assessment_duration_seconds', 'Czas od rozpoczęcia oceny do przejścia do diagnozy', ['module'],
+    buckets=ASSESSMENT_BUCKETS)
+assessment_render_duration = registry.histogram(
+    'fizjo_assessment_render_seconds', 'Czas jednego przebiegu BaseModule.run_assessment', ['module'])
+diagnosis_duration = registry.histogram(
+    'fizjo_diagnosis_duration_seconds', 'Czas wyliczenia diagnozy (z pamięcią podręczną)', ['engine'])
+db_query_duration = registry.histogram(
+    'fizjo_db_query_duration_seconds', 'Czas wykonania instrukcji SQL z pobraniem wyników')
+db_query_rows = registry.counter(
+    'fizjo_db_query_rows_total', 'Liczba wierszy zwróconych lub zmienionych przez instrukcje SQL')
+db_method_duration = registry.histogram(
+    'fizjo_db_method_duration_seconds', 'Czas wykonania metod DatabaseManager', ['method'])
+log_writes = registry.counter(
+    'fizjo_system_logs_writes_total', 'Liczba zapisów do system_logs')
+log_write_duration = registry.histogram(
+    'fizjo_system_logs_write_seconds', 'Czas zapisu wpisu do system_logs')
+log_writes_in_progress = registry.gauge(
+    'fizjo_system_logs_writes_in_progress', 'Zapisy do system_logs oczekujące na zakończenie')
+cache_hits = registry.counter(
+    'fizjo_cache_hits_total', 'Liczba trafień pamięci podręcznej', ['cache'])
+cache_misses = registry.counter(
+    'fizjo_cache_misses_total', 'Liczba chybień pamięci podręcznej', ['cache'])
+cache_entries = registry.gauge(
+    'fizjo_cache_entries', 'Liczba wpisów w pamięci podręcznej', ['cache'])
+active_sessions = registry.gauge(
+    'fizjo_active_sessions', 'Liczba aktywnych sesji użytkowników')
+session_bytes = registry.gauge(
+    'fizjo_session_state_bytes', 'Szacowany łączny rozmiar stanów sesji')
+
+
+def track_cache(name: str, cache):
+    """Eksportuje statystyki pamięci podręcznej (obiekt z metodą stats(), np. LRUCache).
+
+    Trafienia i chybienia są licznikami - odsetek trafień w dowolnym oknie
+    czasu liczy się w zapytaniu (rate hits / rate hits + misses).
+    """
+    cache_hits.labels(cache=name).set_function(lambda: cache.stats()['hits'])
+    cache_misses.labels(cache=name).set_function(lambda: cache.stats()['misses'])
+    cache_entries.labels(cache=name).set_function(lambda: cache.stats()['entries'])
+
+
+def observe_instrumentation(instrumentation):
+    """Przekazuje pomiary z database.instrumentation do metryk bazy danych"""
+    def listener(kind: str, name: str, elapsed_ms: float, rows: int):
+        if kind == 'query':
+            db_query_duration.observe(elapsed_ms / 1000)
+            if rows:
+                db_query_rows.inc(rows)
+        else:
+            db_method_duration.labels(method=name).observe(elapsed_ms / 1000)
+
+    instrumentation.add_listener(listener)
@@ -0,0 +1,581 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .crypto import ENCRYPTED_PATIENT_FIELDS, FieldCipher
+from .duplicates import index_patients
+from .findings import flatten_findings
+from .json_indexes import JSON_INDEXES, generated_columns_supported
+from .notes_codec import decode_notes
+
+# Krok migracji - krótka zmiana schematu wykonywana w osobnej transakcji
+Step = Callable[[sqlite3.Cursor], None]
+# Przetwarza jedną partię wierszy (pierwsza kolumna to klucz, po którym partie są stronicowane);
+# trzeci argument to szyfrowanie pól bazy (database.crypto) lub None
+BatchProcessor = Callable[[sqlite3.Cursor, List[tuple], Optional[FieldCipher]], None]
+
+# Przerwa między partiami uzupełniania - w tym czasie zapisy aplikacji dostają blokadę
+BACKFILL_PAUSE_SECONDS = 0.05
+# Uzupełnianie w tle przy starcie: długość jednego przebiegu i odstęp ponowienia po błędzie (baza zajęta)
+BACKGROUND_BACKFILL_SLICE_SECONDS = 5.0
+BACKGROUND_BACKFILL_RETRY_SECONDS = 30.0
+
+
+@dataclass
+class Backfill:
+    """Uzupełnienie danych po zmianie schematu, wykonywane partiami.
+
+    select_sql dostaje parametry (last_key, batch_size) i zwraca kolejne
+    wiersze posortowane po kluczu w pierwszej kolumnie. Każda partia i
+    zapis postępu to jedna transakcja, więc przerwane uzupełnianie jest
+    wznawiane od ostatniej zatwierdzonej partii.
+    """
+    select_sql: str
+    process: BatchProcessor
+    batch_size: int = 1000
+
+
+@dataclass
+class Migration:
+    """Numerowana zmiana schematu.
+
+    Kroki (steps) muszą być idempotentne (IF NOT EXISTS itp.) - bazy sprzed
+    wprowadzenia migracji mają już część obiektów, a przerwana migracja
+    jest powtarzana od pierwszego kroku. deferred - migracja buduje indeks
+    na istniejących danych (blokada zapisu na czas budowy), więc w
+    istniejącej bazie wykonuje ją tylko jawne migrate(), nie start aplikacji.
+    """
+    version: int
+    name: str
+    steps: Sequence[Step] = field(default_factory=tuple)
+    backfill: Optional[Backfill] = None
+    deferred: bool = False
+
+
+def sql_step(sql: str) -> Step:
+    def step(cursor: sqlite3.Cursor):
+        cursor.execute(sql)
+    step.__name__ = sql.split('(')[0].strip()
+    return step
+
+
+# === MIGRACJA 1: schemat początkowy ===
+
+BASE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS patients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        pesel TEXT UNIQUE NOT NULL,
+        birth_date DATE NOT NULL,
+        gender TEXT CHECK(gender IN ('M', 'K', 'Inna')),
+        phone TEXT,
+        email TEXT,
+        emergency_contact TEXT,
+        allergies TEXT,
+        medications TEXT,
+        medical_history TEXT,
+        notes TEXT,
+        consent_treatment BOOLEAN NOT NULL,
+        consent_data BOOLEAN NOT NULL,
+        consent_marketing BOOLEAN DEFAULT FALSE,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS diagnosis_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        patient_id INTEGER NOT NULL,
+        module_type TEXT NOT NULL,
+        session_date TIMESTAMP NOT NULL,
+        therapist_name TEXT NOT NULL,
+        primary_diagnosis TEXT,
+        confidence_level REAL,
+        treatment_plan TEXT,
+        referral_notes TEXT,
+        session_notes TEXT,
+        is_completed BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (patient_id) REFERENCES patients (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS test_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER NOT NULL,
+        test_name TEXT NOT NULL,
+        test_result TEXT NOT NULL,
+        test_score REAL,
+        test_notes TEXT,
+        performed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES diagnosis_sessions (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        setting_key TEXT UNIQUE NOT NULL,
+        setting_value TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS system_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        log_level TEXT NOT NULL,
+        message TEXT NOT NULL,
+        module_name TEXT,
+        user_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_patients_pesel ON patients(pesel)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_patient ON diagnosis_sessions(patient_id)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_date ON diagnosis_sessions(session_date)",
+    "CREATE INDEX IF NOT EXISTS idx_tests_session ON test_results(session_id)",
+)
+
+
+# === MIGRACJA 3: session_findings ===
+
+def backfill_session_findings(cursor: sqlite3.Cursor, rows: List[tuple], cipher: Optional[FieldCipher] = None):
+    """Spłaszcza session_notes partii sesji do session_findings"""
+    findings = []
+    for session_id, session_notes in rows:
+        notes = decode_notes(session_notes)
+        if isinstance(notes, dict):
+            findings.extend((session_id,) + row for row in flatten_findings(notes))
+
+    # Sesje zapisane w trakcie uzupełniania mają już wyniki - zastępujemy je w całym zakresie partii
+    cursor.execute("DELETE FROM session_findings WHERE session_id >= ? AND session_id <= ?",
+                   (rows[0][0], rows[-1][0]))
+    cursor.executemany("""
+        INSERT INTO session_findings (session_id, section, key, value_type, value_text, value_num)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, findings)
+
+
+# === MIGRACJE 4-5: indeksy JSON session_notes ===
+
+def add_json_columns(cursor: sqlite3.Cursor):
+    """Dodaje kolumny generowane z JSON_INDEXES (bez przepisywania tabeli - VIRTUAL)"""
+    if not generated_columns_supported():
+        return
+    cursor.execute("PRAGMA table_xinfo(diagnosis_sessions)")
+    columns = {row[1] for row in cursor.fetchall()}
+    for json_index in JSON_INDEXES:
+        if json_index.column not in columns:
+            cursor.execute(f"ALTER TABLE diagnosis_sessions ADD COLUMN {json_index.column_definition()}")
+
+
+def json_index_step(json_index) -> Step:
+    def step(cursor: sqlite3.Cursor):
+        if generated_columns_supported():
+            cursor.execute(json_index.index_definition())
+    step.__name__ = json_index.index_name
+    return step
+
+
+# === MIGRACJA 9: indeks duplikatów pacjentów ===
+
+def index_patient_blocks(cursor: sqlite3.Cursor, rows: List[tuple], cipher: Optional[FieldCipher]):
+    """Klucze grup duplikatów (database.duplicates) dla partii pacjentów"""
+    index_patients(cursor, rows, cipher=cipher)
+
+
+# === MIGRACJA 10: szyfrowanie danych pacjentów ===
+
+def add_pesel_hash_column(cursor: sqlite3.Cursor):
+    cursor.execute("PRAGMA table_info(patients)")
+    if 'pesel_hash' not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE patients ADD COLUMN pesel_hash TEXT")
+
+
+def encrypt_patient_fields(cursor: sqlite3.Cursor, rows: List[tuple], cipher: Optional[FieldCipher]):
+    """Szyfruje PESEL i dane kontaktowe partii pacjentów i wylicza pesel_hash.
+
+    Bez cipher (szyfrowanie wyłączone) nic nie zmienia. Wartości już
+    zaszyfrowane zostają bez zmian, więc partię można przetworzyć ponownie.
+    """
+    if cipher is None:
+        return
+    pesels = cipher.decrypt_many([row[3] for row in rows], 'pesel')
+    columns = {
+        field: cipher.encrypt_many([row[index] for row in rows], field)
+        for index, field in zip((3, 5, 6, 7), ENCRYPTED_PATIENT_FIELDS)
+    }
+    cursor.executemany("""
+        UPDATE patients SET pesel = ?, pesel_hash = ?, phone = ?, email = ?, emergency_contact = ?
+        WHERE id = ?
+    """, [
+        (columns['pesel'][i], cipher.blind_index(pesels[i]), columns['phone'][i], columns['email'][i],
+         columns['emergency_contact'][i], row[0])
+        for i, row in enumerate(rows)
+    ])
+    # Klucze PESEL indeksu duplikatów zapisane przed szyfrowaniem były jawne - zastępujemy je skrótami
+    index_patients(cursor, [(row[0], row[1], row[2], pesels[i], row[4]) for i, row in enumerate(rows)],
+                   cipher=cipher)
+
+
+ENCRYPT_PATIENTS_SQL = """
+    SELECT id, first_name, last_name, pesel, birth_date, phone, email, emergency_contact FROM patients
+    WHERE id > ? ORDER BY id LIMIT ?
+"""
+
+
+# Kolejność jest stała - nowe zmiany schematu dopisuj na końcu z kolejnym numerem
+MIGRATIONS = (
+    Migration(1, 'schemat początkowy', [sql_step(sql) for sql in BASE_SCHEMA]),
+    Migration(2, 'indeks listy aktywnych pacjentów', [
+        sql_step("CREATE INDEX IF NOT EXISTS idx_patients_active_name ON patients(is_active, last_name, first_name)"),
+    ], deferred=True),
+    Migration(3, 'tabela session_findings', [
+        sql_step("""
+            CREATE TABLE IF NOT EXISTS session_findings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id INTEGER NOT NULL,
+                section TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value_type TEXT NOT NULL,
+                value_text TEXT,
+                value_num REAL,
+                FOREIGN KEY (session_id) REFERENCES diagnosis_sessions (id)
+            )
+        """),
+        sql_step("CREATE INDEX IF NOT EXISTS idx_findings_text ON session_findings(section, key, value_text, session_id)"),
+        sql_step("CREATE INDEX IF NOT EXISTS idx_findings_num ON session_findings(section, key, value_num, session_id)"),
+        sql_step("CREATE INDEX IF NOT EXISTS idx_findings_session ON session_findings(session_id)"),
+    ], Backfill("""
+        SELECT id, session_notes FROM diagnosis_sessions
+        WHERE id > ? ORDER BY id LIMIT ?
+    """, backfill_session_findings, batch_size=250)),
+    Migration(4, 'kolumny generowane session_notes', [add_json_columns]),
+    Migration(5, 'indeksy JSON session_notes', [json_index_step(json_index) for json_index in JSON_INDEXES],
+              deferred=True),
+    Migration(6, 'indeks historii pacjenta', [
+        sql_step("CREATE INDEX IF NOT EXISTS idx_sessions_patient_date ON diagnosis_sessions(patient_id, session_date)"),
+    ], deferred=True),
+    Migration(7, 'indeksy system_logs', [
+        sql_step("CREATE INDEX IF NOT EXISTS idx_logs_created ON system_logs(created_at)"),
+        sql_step("CREATE INDEX IF NOT EXISTS idx_logs_level_created ON system_logs(log_level, created_at)"),
+    ], deferred=True),
+    Migration(8, 'licznik wersji ustawień', [
+        sql_step("CREATE TABLE IF NOT EXISTS settings_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)"),
+        sql_step("INSERT OR IGNORE INTO settings_version (id, version) VALUES (1, 0)"),
+    ] + [sql_step(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_user_settings_{event.lower()} AFTER {event} ON user_settings
+        BEGIN
+            UPDATE settings_version SET version = version + 1 WHERE id = 1;
+        END
+    """) for event in ('INSERT', 'UPDATE', 'DELETE')]),
+    Migration(9, 'indeks duplikatów pacjentów', [
+        sql_step("""
+            CREATE TABLE IF NOT EXISTS patient_blocks (
+                block_key TEXT NOT NULL,
+                patient_id INTEGER NOT NULL,
+                PRIMARY KEY (block_key, patient_id)
+            ) WITHOUT ROWID
+        """),
+        sql_step("CREATE INDEX IF NOT EXISTS idx_patient_blocks_patient ON patient_blocks(patient_id)"),
+    ], Backfill("""
+        SELECT id, first_name, last_name, pesel, birth_date FROM patients
+        WHERE id > ? ORDER BY id LIMIT ?
+    """, index_patient_blocks, batch_size=500)),
+    Migration(10, 'szyfrowanie PESEL i danych kontaktowych', [
+        add_pesel_hash_column,
+        sql_step("CREATE UNIQUE INDEX IF NOT EXISTS idx_patients_pesel_hash ON patients(pesel_hash)"),
+    ], Backfill(ENCRYPT_PATIENTS_SQL, encrypt_patient_fields, batch_size=500)),
+    Migration(11, 'trwała pamięć podręczna diagnoz', [
+        sql_step("""
+            CREATE TABLE IF NOT EXISTS diagnosis_cache (
+                cache_key TEXT PRIMARY KEY,
+                module_name TEXT NOT NULL,
+                rules_version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """),
+        sql_step("CREATE INDEX IF NOT EXISTS idx_diagnosis_cache_module ON diagnosis_cache(module_name, rules_version)"),
+    ]),
+)
+
+
+class MigrationRunner:
+    """Wykonuje migracje schematu i wznawialne uzupełnianie danych.
+
+    upgrade() wykonuje kroki schematu - każdy w osobnej transakcji, więc
+    blokada zapisu trwa najwyżej tyle, co jeden krok (np. budowa jednego
+    indeksu). Uzupełnianie danych (run_backfills) jest od upgrade()
+    niezależne: po zmianie schematu aplikacja działa dalej, a dane są
+    uzupełniane partiami z przerwami, w ramach zadanego limitu czasu.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection],
+                 migrations: Sequence[Migration] = MIGRATIONS,
+                 pause_seconds: float = BACKFILL_PAUSE_SECONDS,
+                 cipher: Optional[FieldCipher] = None):
+        self.connect = connect
+        # Szyfrowanie pól bazy przekazywane do uzupełniania danych (migracje 9 i 10)
+        self.cipher = cipher
+        self.migrations = sorted(migrations, key=lambda migration: migration.version)
+        self.pause_seconds = pause_seconds
+
+    def _open(self) -> sqlite3.Connection:
+        conn = self.connect()
+        # Transakcje są otwierane jawnie (BEGIN IMMEDIATE), również dla DDL
+        conn.isolation_level = None
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL,
+                duration_ms REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_backfills (
+                version INTEGER PRIMARY KEY,
+                last_key INTEGER NOT NULL DEFAULT 0,
+                rows_done INTEGER NOT NULL DEFAULT 0,
+                batches INTEGER NOT NULL DEFAULT 0,
+                duration_ms REAL NOT NULL DEFAULT 0,
+                completed_at TIMESTAMP
+            )
+        """)
+        return conn
+
+    def _completed_version(self, applied: set, unfinished: set) -> int:
+        version = 0
+        for migration in self.migrations:
+            if migration.version not in applied or migration.version in unfinished:
+                break
+            version = migration.version
+        return version
+
+    def current_version(self) -> int:
+        """Najwyższa wersja, do której włącznie wszystkie migracje są wykonane - razem z uzupełnianiem danych.
+
+        Migracja deferred pominięta przy starcie albo niedokończone
+        uzupełnianie zatrzymują wersję na poprzedniej, nawet jeśli późniejsze
+        migracje są już wykonane.
+        """
+        conn = self._open()
+        try:
+            applied = {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+            unfinished = {row[0] for row in conn.execute("SELECT version FROM schema_backfills WHERE completed_at IS NULL")}
+        finally:
+            conn.close()
+        return self._completed_version(applied, unfinished)
+
+    def pending(self) -> List[Migration]:
+        """Migracje, których kroki schematu nie zostały jeszcze wykonane"""
+        conn = self._open()
+        try:
+            applied = {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+        finally:
+            conn.close()
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    def is_new_database(self) -> bool:
+        """Baza bez tabel aplikacji (świeży plik) - cały schemat można założyć od razu"""
+        conn = self._open()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'patients'").fetchone()[0] == 0
+        finally:
+            conn.close()
+
+    def upgrade(self, target: Optional[int] = None, progress: Optional[Callable[[str], None]] = None,
+                include_deferred: bool = True) -> List[Dict[str, Any]]:
+        """Wykonuje oczekujące migracje (do wersji target włącznie) i zwraca ich czasy.
+
+        include_deferred=False pomija migracje deferred (budowa indeksów) -
+        zostają oczekujące do kolejnego upgrade().
+        """
+        results = []
+        # Lista przed otwarciem połączenia - pending() zamyka swoje (przy puli to samo połączenie)
+        pending = self.pending()
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            for migration in pending:
+                if target is not None and migration.version > target:
+                    break
+                if migration.deferred and not include_deferred:
+                    continue
+
+                started = time.perf_counter()
+                step_times = []
+                for step in migration.steps:
+                    step_started = time.perf_counter()
+                    cursor.execute("BEGIN IMMEDIATE")
+                    try:
+                        step(cursor)
+                    except Exception:
+                        cursor.execute("ROLLBACK")
+                        raise
+                    cursor.execute("COMMIT")
+                    step_ms = (time.perf_counter() - step_started) * 1000
+                    step_times.append((step.__name__, step_ms))
+                    if progress:
+                        progress(f"{migration.version} {migration.name}: {step.__name__} {step_ms:.0f} ms")
+
+                duration_ms = (time.perf_counter() - started) * 1000
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("INSERT INTO schema_version (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+                               (migration.version, migration.name, datetime.now().isoformat(), duration_ms))
+                if migration.backfill is not None:
+                    cursor.execute("INSERT OR IGNORE INTO schema_backfills (version) VALUES (?)", (migration.version,))
+                cursor.execute("COMMIT")
+
+                results.append({'version': migration.version, 'name': migration.name,
+                                'duration_ms': round(duration_ms, 1),
+                                'steps': [(name, round(ms, 1)) for name, ms in step_times]})
+        finally:
+            conn.close()
+        return results
+
+    def pending_backfills(self) -> List[Dict[str, Any]]:
+        conn = self._open()
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute("SELECT * FROM schema_backfills WHERE completed_at IS NULL ORDER BY version")
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def run_backfills(self, max_seconds: Optional[float] = None,
+                      progress: Optional[Callable[[str], None]] = None) -> List[Dict[str, Any]]:
+        """Uzupełnia dane migracji partiami; po max_seconds przerywa (postęp zostaje zapisany)"""
+        by_version = {migration.version: migration for migration in self.migrations}
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+        results = []
+
+        pending = self.pending_backfills()
+        conn = self._open()
+        try:
+            cursor = conn.cursor()
+            for state in pending:
+                migration = by_version.get(state['version'])
+                if migration is None or migration.backfill is None:
+                    continue
+                backfill = migration.backfill
+                last_key, rows_done = state['last_key'], 0
+                started = time.perf_counter()
+                completed = False
+
+                while deadline is None or time.perf_counter() < deadline:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    try:
+                        # Postęp czytany pod blokadą - inny proces (lub wątek w tle) mógł już przetworzyć partie
+                        last_key, completed_at = cursor.execute(
+                            "SELECT last_key, completed_at FROM schema_backfills WHERE version = ?",
+                            (migration.version,)).fetchone()
+                        if completed_at is not None:
+                            cursor.execute("COMMIT")
+                            completed = True
+                            break
+                        rows = cursor.execute(backfill.select_sql, (last_key, backfill.batch_size)).fetchall()
+                        if rows:
+                            backfill.process(cursor, rows, self.cipher)
+                            last_key = rows[-1][0]
+                            rows_done += len(rows)
+                        completed = len(rows) < backfill.batch_size
+                        cursor.execute("""
+                            UPDATE schema_backfills
+                            SET last_key = ?, rows_done = rows_done + ?, batches = batches + 1,
+                                completed_at = CASE WHEN ? THEN ? END
+                            WHERE version = ?
+                        """, (last_key, len(rows), completed, datetime.now().isoformat(), migration.version))
+                    except Exception:
+                        cursor.execute("ROLLBACK")
+                        raise
+                    cursor.execute("COMMIT")
+
+                    if completed:
+                        break
+                    if progress:
+                        progress(f"{migration.version} {migration.name}: {rows_done} wierszy (klucz {last_key})")
+                    time.sleep(self.pause_seconds)
+
+                duration_ms = (time.perf_counter() - started) * 1000
+                cursor.execute("UPDATE schema_backfills SET duration_ms = duration_ms + ? WHERE version = ?",
+                               (duration_ms, migration.version))
+                results.append({'version': migration.version, 'name': migration.name, 'rows': rows_done,
+                                'completed': completed, 'duration_ms': round(duration_ms, 1)})
+                if not completed:
+                    break
+        finally:
+            conn.close()
+        return results
+
+    def status(self) -> Dict[str, Any]:
+        conn = self._open()
+        conn.row_factory = sqlite3.Row
+        try:
+            applied = [dict(row) for row in conn.execute("SELECT * FROM schema_version ORDER BY version")]
+            backfills = [dict(row) for row in conn.execute("SELECT * FROM schema_backfills ORDER BY version")]
+        finally:
+            conn.close()
+        applied_versions = {row['version'] for row in applied}
+        unfinished = {row['version'] for row in backfills if row['completed_at'] is None}
+        return {
+            # Jak current_version() - tylko wersje wykonane w całości, z uzupełnianiem danych
+            'version': self._completed_version(applied_versions, unfinished),
+            'latest': self.migrations[-1].version if self.migrations else 0,
+            'applied': applied,
+            'pending': [migration.version for migration in self.migrations if migration.version not in applied_versions],
+            'backfills': backfills
+        }
+
+
+class BackfillWorker(threading.Thread):
+    """Wątek w tle wykonujący oczekujące uzupełnianie danych (start istniejącej bazy).
+
+    Pracuje przebiegami po BACKGROUND_BACKFILL_SLICE_SECONDS, z przerwami
+    między partiami, więc zapisy aplikacji nie czekają dłużej niż jedna
+    partia. Kończy się, gdy nic nie zostało do uzupełnienia lub po stop().
+    """
+
+    def __init__(self, runner: MigrationRunner, retry_interval: float = BACKGROUND_BACKFILL_RETRY_SECONDS):
+        super().__init__(name='migration-backfills', daemon=True)
+        self.runner = runner
+        self.retry_interval = retry_interval
+        self.results: List[Dict[str, Any]] = []
+        self.last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.results.extend(self.runner.run_backfills(max_seconds=BACKGROUND_BACKFILL_SLICE_SECONDS))
+                self.last_error = None
+                if not self.runner.pending_backfills():
+                    return
+            except sqlite3.Error as error:
+                # Baza zajęta lub zablokowana - spróbujemy po retry_interval
+                self.last_error = str(error)
+                self._stop_event.wait(self.retry_interval)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        self.join(timeout)
+
+
+_backfill_workers: Dict[str, BackfillWorker] = {}
+_backfill_workers_lock = threading.Lock()
+
+
+def start_background_backfills(runner: MigrationRunner, key: str) -> BackfillWorker:
+    """Uruchamia uzupełnianie w tle - jeden wątek na bazę (key, np. ścieżka pliku) w procesie"""
+    with _backfill_workers_lock:
+        worker = _backfill_workers.get(key)
+        if worker is None or not worker.is_alive():
+            worker = _backfill_workers[key] = BackfillWorker(runner)
+            worker.start()
+        return worker
@@ -1,7 +1,8 @@
 from dataclasses import dataclass, field
 from datetime import datetime, date
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Union, Callable
 import json
+from .notes_codec import decode_notes, encode_notes
 
 @dataclass
 class Patient:
@@ -81,7 +82,8 @@ class DiagnosisSession:
     confidence_level: Optional[float] = None
     treatment_plan: Optional[str] = None
     referral_notes: Optional[str] = None
-    session_notes: Optional[str] = None
+    # Zakodowane notatki (notes_codec): JSON tekstowy lub skompresowany BLOB
+    session_notes: Optional[Union[str, bytes]] = None
     is_completed: bool = False
     id: Optional[int] = None
     created_at: Optional[datetime] = None
@@ -101,25 +103,28 @@ class DiagnosisSession:
     def to_dict(self) -> Dict[str, Any]:
         """Konwertuje obiekt do słownika"""
         result = {}
-        for key, value in self.__dict__.items():
+        for key, value in list(self.__dict__.items()):
+            if key.startswith('_'):
+                continue
             if isinstance(value, datetime):
                 result[key] = value.isoformat()
+            elif key == 'session_notes' and isinstance(value, bytes):
+                result[key] = json.dumps(self.get_session_notes_dict(), ensure_ascii=False)
             else:
                 result[key] = value
         return result
     
     def get_session_notes_dict(self) -> Dict[str, Any]:
-        """Parsuje session_notes z JSON"""
-        if self.session_notes:
-            try:
-                return json.loads(self.session_notes)
-            except json.JSONDecodeError:
-                return {}
-        return {}
+        """Zwraca session_notes jako słownik (dekodowany przy pierwszym dostępie i zapamiętany)"""
+        cached = self.__dict__.get('_notes_cache')
+        if cached is None or cached[0] is not self.session_notes:
+            cached = self._notes_cache = (self.session_notes, decode_notes(self.session_notes))
+        return cached[1]
     
     def set_session_notes_dict(self, notes_dict: Dict[str, Any]):
-        """Ustawia session_notes jako JSON"""
-        self.session_notes = json.dumps(notes_dict, ensure_ascii=False, indent=2)
+        """Ustawia session_notes w formacie kompaktowym (notes_codec)"""
+        self.session_notes = encode_notes(notes_dict)
+        self._notes_cache = (self.session_notes, notes_dict)
     
     def get_duration_minutes(self) -> int:
         """Oblicza czas trwania sesji w minutach (przykładowa logika)"""
@@ -128,6 +133,66 @@ class DiagnosisSession:
             return max(1, int(delta.total_seconds() / 60))
         return 30  # domyślnie 30 minut
 
+# Pola sesji z długim tekstem - w widokach historii ładowane dopiero przy dostępie
+HEAVY_SESSION_FIELDS = ('treatment_plan', 'referral_notes', 'session_notes')
+
+def _lazy_session_field(name: str) -> property:
+    def getter(self):
+        if name not in self.__dict__:
+            self.load_details()
+        return self.__dict__[name]
+    
+    def setter(self, value):
+        self.__dict__[name] = value
+    
+    return property(getter, setter)
+
+class LazyDiagnosisSession(DiagnosisSession):
+    """Sesja z historii wczytana bez pól HEAVY_SESSION_FIELDS.
+    
+    Pierwszy dostęp do któregokolwiek z nich pobiera wszystkie trzy jednym
+    zapytaniem przez loader(session_id) -> dict.
+    """
+    
+    treatment_plan = _lazy_session_field('treatment_plan')
+    referral_notes = _lazy_session_field('referral_notes')
+    session_notes = _lazy_session_field('session_notes')
+    
+    @classmethod
+    def from_summary(cls, data: Dict[str, Any], loader: Callable[[int], Dict[str, Any]]) -> 'LazyDiagnosisSession':
+        """Tworzy sesję z kolumn podsumowania; pozostałe pola pobierze loader"""
+        if isinstance(data.get('session_date'), str):
+            data['session_date'] = datetime.fromisoformat(data['session_date'])
+        
+        if isinstance(data.get('created_at'), str):
+            data['created_at'] = datetime.fromisoformat(data['created_at'])
+        
+        session = object.__new__(cls)
+        session.__dict__.update(data)
+        session._loader = loader
+        return session
+    
+    @property
+    def details_loaded(self) -> bool:
+        return all(name in self.__dict__ for name in HEAVY_SESSION_FIELDS)
+    
+    def load_details(self):
+        """Pobiera brakujące pola HEAVY_SESSION_FIELDS"""
+        if self.details_loaded:
+            return
+        self.apply_details(self._loader(self.id))
+    
+    def apply_details(self, details: Optional[Dict[str, Any]]):
+        """Uzupełnia brakujące pola HEAVY_SESSION_FIELDS wynikiem loadera"""
+        details = details or {}
+        for name in HEAVY_SESSION_FIELDS:
+            self.__dict__.setdefault(name, details.get(name))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Konwertuje obiekt do słownika (z doładowaniem pól HEAVY_SESSION_FIELDS)"""
+        self.load_details()
+        return super().to_dict()
+
 @dataclass
 class TestResult:
     """Model wyniku testu diagnostycznego"""
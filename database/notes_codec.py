@@ -0,0 +1,46 @@
+import json
+import zlib
+from typing import Any, Dict, Optional, Union
+
+# Znacznik formatu skompresowanych notatek (BLOB): b'Z1' + zlib(minifikowany JSON)
+COMPRESSED_MARKER = b'Z1'
+# Notatki krótsze od progu zostają tekstem JSON - indeksy JSON1 (json_indexes.py)
+# działają tylko na tekście, a przy małych notatkach zysk z kompresji jest niewielki
+COMPRESSION_THRESHOLD = 2048
+COMPRESSION_LEVEL = 6
+
+EncodedNotes = Union[str, bytes]
+
+
+def encode_notes(notes: Dict[str, Any], threshold: Optional[int] = None) -> EncodedNotes:
+    """Koduje notatki: minifikowany JSON, powyżej progu skompresowany BLOB ze znacznikiem"""
+    text = json.dumps(notes, ensure_ascii=False, separators=(',', ':'))
+    threshold = COMPRESSION_THRESHOLD if threshold is None else threshold
+    data = text.encode('utf-8')
+    if len(data) < threshold:
+        return text
+    return COMPRESSED_MARKER + zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def decode_notes(value: Optional[EncodedNotes], strict: bool = False) -> Dict[str, Any]:
+    """Dekoduje notatki w każdym formacie (stary JSON z wcięciami, minifikowany, skompresowany).
+
+    Uszkodzone notatki dają pusty słownik, a przy strict=True - ValueError.
+    """
+    if not value:
+        return {}
+    try:
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = bytes(value)
+            if value.startswith(COMPRESSED_MARKER):
+                value = zlib.decompress(value[len(COMPRESSED_MARKER):])
+            return json.loads(value.decode('utf-8'))
+        return json.loads(value)
+    except (json.JSONDecodeError, zlib.error, UnicodeDecodeError) as error:
+        if strict:
+            raise ValueError(f"Nie można zdekodować notatek: {error}") from error
+        return {}
+
+
+def is_compressed(value: Optional[EncodedNotes]) -> bool:
+    return isinstance(value, (bytes, bytearray)) and bytes(value[:len(COMPRESSED_MARKER)]) == COMPRESSED_MARKER
@@ -0,0 +1,299 @@
+import csv
+import sqlite3
+import time
+from collections import Counter
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+
+from .crypto import ENCRYPTED_PATIENT_FIELDS, FieldCipher
+from .duplicates import index_patients
+from .pesel import PESEL_ERRORS, validate_pesels
+
+# Wiersze sprawdzane i zapisywane jedną partią (jedno executemany)
+IMPORT_BATCH_SIZE = 5000
+# Partie w jednej transakcji - rzadkie commit to mniej synchronizacji z dyskiem
+IMPORT_BATCHES_PER_TRANSACTION = 10
+# Odrzucone wiersze zwracane w wyniku (wszystkie trafiają do raportu CSV)
+REJECTED_SAMPLE_SIZE = 100
+
+IMPORT_COLUMNS = (
+    'first_name', 'last_name', 'pesel', 'birth_date', 'gender',
+    'phone', 'email', 'emergency_contact', 'allergies', 'medications',
+    'medical_history', 'notes', 'consent_treatment', 'consent_data', 'consent_marketing',
+)
+BOOL_COLUMNS = ('consent_treatment', 'consent_data', 'consent_marketing')
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'pesel')
+# Zgody wymagane przy rejestracji pacjenta (jak w formularzu aplikacji) - kolumny obowiązkowe
+CONSENT_COLUMNS = ('consent_treatment', 'consent_data')
+# Formaty daty urodzenia w plikach z innych systemów
+DATE_FORMATS = ('%d.%m.%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%Y/%m/%d', '%Y.%m.%d')
+# Zapis płci w pliku -> wartość w bazie; 'Inna' nie wynika z PESEL, więc nie jest z nim porównywana
+GENDER_VALUES = {
+    'm': 'M', 'mężczyzna': 'M', 'mezczyzna': 'M', 'k': 'K', 'kobieta': 'K', 'inna': 'Inna',
+}
+# Polskie nagłówki plików z innych systemów
+HEADER_ALIASES = {
+    'imie': 'first_name', 'imię': 'first_name', 'nazwisko': 'last_name',
+    'data_urodzenia': 'birth_date', 'plec': 'gender', 'płeć': 'gender', 'telefon': 'phone',
+    'e-mail': 'email', 'kontakt_awaryjny': 'emergency_contact', 'alergie': 'allergies',
+    'leki': 'medications', 'historia_choroby': 'medical_history', 'uwagi': 'notes',
+    'zgoda_leczenie': 'consent_treatment', 'zgoda_dane': 'consent_data', 'zgoda_marketing': 'consent_marketing',
+}
+TRUE_VALUES = frozenset({'1', 'true', 't', 'tak', 'yes', 'y', 'x'})
+
+REJECT_REASONS = {
+    **PESEL_ERRORS,
+    'missing': "Brak wymaganego pola (imię, nazwisko, PESEL)",
+    'mismatch': "Data urodzenia lub płeć niezgodna z PESEL",
+    'invalid': "Nierozpoznany format daty urodzenia lub płci",
+    'consent': "Brak zgody na leczenie lub przetwarzanie danych",
+    'duplicate_file': "PESEL powtórzony w pliku",
+    'exists': "Pacjent z tym PESEL jest już w bazie",
+}
+
+
+def _open_input(path: Path) -> Tuple[IO, csv.Dialect]:
+    """Otwiera plik CSV; separator (, ; tab) rozpoznawany z początku pliku"""
+    file = open(path, 'r', encoding='utf-8-sig', newline='')
+    sample = file.read(64 * 1024)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    return file, dialect
+
+
+def normalize_header(name: str) -> str:
+    key = name.strip().lower().replace(' ', '_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def _to_bool(value: Optional[str]) -> bool:
+    return value is not None and value.strip().lower() in TRUE_VALUES
+
+
+def parse_date(value: str) -> Optional[str]:
+    """Data w jednym z DATE_FORMATS (ewentualnie z godziną) jako RRRR-MM-DD; None, gdy nierozpoznana"""
+    value = value.split()[0].split('T')[0] if value else ''
+    try:
+        # Najczęstszy zapis RRRR-MM-DD - szybciej niż strptime
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def read_batches(file: IO, dialect: csv.Dialect, batch_size: int,
+                 select: Optional[Callable[[Dict[str, str]], bool]] = None) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    """Czyta plik strumieniowo; zwraca partie (numer linii, wiersz) - z select tylko wiersze, dla których zwraca True"""
+    reader = csv.reader(file, dialect)
+    header = [normalize_header(name) for name in next(reader, [])]
+    missing = [name for name in REQUIRED_COLUMNS + CONSENT_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"Brak kolumn w pliku importu: {', '.join(missing)}")
+
+    batch = []
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        row = dict(zip(header, values))
+        if select is not None and not select(row):
+            continue
+        batch.append((reader.line_num, row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _RejectedReport:
+    """Raport odrzuconych wierszy: CSV z numerem linii, powodem i oryginalnymi polami"""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.file = None
+        self.writer = None
+        self.counts = Counter()
+        self.sample: List[Dict[str, Any]] = []
+
+    def add(self, line: int, row: Dict[str, str], reason: str):
+        self.counts[reason] += 1
+        if len(self.sample) < REJECTED_SAMPLE_SIZE:
+            self.sample.append({'line': line, 'pesel': row.get('pesel'), 'reason': reason})
+        if self.path is None:
+            return
+        if self.writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, 'w', encoding='utf-8', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(('line', 'reason', 'message') + IMPORT_COLUMNS)
+        self.writer.writerow((line, reason, REJECT_REASONS[reason]) + tuple(row.get(name, '') for name in IMPORT_COLUMNS))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def prepare_batch(batch: List[Tuple[int, Dict[str, str]]],
+                  report: _RejectedReport) -> List[Tuple[int, Dict[str, str], tuple]]:
+    """Sprawdza partię; zwraca wiersze do zapisu (linia, wiersz, wartości INSERT)"""
+    rows = []
+    for line, row in batch:
+        row = {name: (row.get(name) or '').strip() for name in IMPORT_COLUMNS}
+        if not all(row[name] for name in REQUIRED_COLUMNS):
+            report.add(line, row, 'missing')
+        elif not all(_to_bool(row[name]) for name in CONSENT_COLUMNS):
+            report.add(line, row, 'consent')
+        else:
+            rows.append((line, row))
+
+    checked = validate_pesels([row['pesel'] for _, row in rows])
+    birth_dates = checked.birth_date_strings()
+    prepared = []
+    seen = set()
+    for i, (line, row) in enumerate(rows):
+        error = checked.errors[i]
+        if error:
+            report.add(line, row, error)
+            continue
+        # Data urodzenia i płeć wynikają z PESEL; podane w pliku muszą się zgadzać
+        birth_date, gender = str(birth_dates[i]), str(checked.genders[i])
+        file_date = parse_date(row['birth_date']) if row['birth_date'] else birth_date
+        file_gender = GENDER_VALUES.get(row['gender'].lower()) if row['gender'] else gender
+        if file_date is None or file_gender is None:
+            report.add(line, row, 'invalid')
+            continue
+        if file_date != birth_date or file_gender not in (gender, 'Inna'):
+            report.add(line, row, 'mismatch')
+            continue
+        if row['pesel'] in seen:
+            report.add(line, row, 'duplicate_file')
+            continue
+        seen.add(row['pesel'])
+
+        values = tuple(
+            _to_bool(row[name]) if name in BOOL_COLUMNS else (row[name] or None)
+            for name in IMPORT_COLUMNS
+        )
+        values = values[:3] + (birth_date, file_gender) + values[5:]
+        prepared.append((line, row, values))
+    return prepared
+
+
+def encrypt_rows(rows: List[tuple], cipher: Optional[FieldCipher]) -> List[tuple]:
+    """Wartości INSERT z dopisanym pesel_hash; z cipher pola wrażliwe są szyfrowane kolumnami"""
+    if cipher is None:
+        return [values + (None,) for values in rows]
+    columns = [list(column) for column in zip(*rows)] or [[] for _ in IMPORT_COLUMNS]
+    hashes = [cipher.blind_index(pesel) for pesel in columns[IMPORT_COLUMNS.index('pesel')]]
+    for field in ENCRYPTED_PATIENT_FIELDS:
+        index = IMPORT_COLUMNS.index(field)
+        columns[index] = cipher.encrypt_many(columns[index], field)
+    return list(zip(*columns, hashes))
+
+
+def import_patients(connect: Callable[[], sqlite3.Connection], path: Path,
+                    rejected_path: Optional[Path] = None, batch_size: int = IMPORT_BATCH_SIZE,
+                    batches_per_transaction: int = IMPORT_BATCHES_PER_TRANSACTION, dry_run: bool = False,
+                    progress: Optional[Callable[[int, int], None]] = None,
+                    cipher: Optional[FieldCipher] = None,
+                    select: Optional[Callable[[Dict[str, str]], bool]] = None) -> Dict[str, Any]:
+    """Importuje pacjentów z pliku CSV (nagłówki jak kolumny patients lub polskie odpowiedniki).
+
+    Plik jest czytany partiami po batch_size wierszy. PESEL-e partii są
+    sprawdzane wektorowo (database.pesel), a z PESEL wyliczane są data
+    urodzenia i płeć - jeśli plik je zawiera, muszą się zgadzać (data
+    w jednym z DATE_FORMATS, płeć M/K; płeć Inna jest zapisywana z pliku).
+    Wymagane są kolumny zgód CONSENT_COLUMNS, a wiersze bez zgody na
+    leczenie i przetwarzanie danych są odrzucane. Istniejących pacjentów
+    wykrywa jedno zapytanie na partię (JOIN tabeli tymczasowej z patients), a zapis to executemany
+    w transakcji obejmującej batches_per_transaction partii. Wiersze
+    odrzucone trafiają do raportu rejected_path (CSV). dry_run sprawdza
+    cały plik i wycofuje zmiany. Z cipher (database.crypto) PESEL i dane
+    kontaktowe partii są szyfrowane kolumnami, a duplikaty wykrywa
+    indeks ślepy pesel_hash. select(wiersz) ogranicza import do części
+    pliku (np. pacjentów jednego shardu) - numery linii zostają z pliku.
+    """
+    path = Path(path)
+    report = _RejectedReport(Path(rejected_path) if rejected_path else None)
+    started = time.perf_counter()
+    total = imported = 0
+    file, dialect = _open_input(path)
+    conn = connect()
+    conn.isolation_level = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS import_pesels (
+                line INTEGER PRIMARY KEY, pesel TEXT NOT NULL, pesel_hash TEXT
+            )
+        """)
+        # Pacjenci o id powyżej tej granicy pochodzą z tego importu (duplikat w pliku, nie w bazie)
+        first_new_id = (cursor.execute("SELECT MAX(id) FROM patients").fetchone()[0] or 0) + 1
+        in_transaction = 0
+        for batch in read_batches(file, dialect, batch_size, select):
+            total += len(batch)
+            prepared = prepare_batch(batch, report)
+            if not in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+
+            cursor.execute("DELETE FROM import_pesels")
+            cursor.executemany("INSERT INTO import_pesels (line, pesel, pesel_hash) VALUES (?, ?, ?)", [
+                (line, row['pesel'], cipher.blind_index(row['pesel']) if cipher else None)
+                for line, row, _ in prepared
+            ])
+            existing = dict(cursor.execute("""
+                SELECT i.line, p.id FROM import_pesels i
+                JOIN patients p ON p.pesel = i.pesel OR p.pesel_hash = i.pesel_hash
+            """).fetchall())
+
+            rows = []
+            for line, row, values in prepared:
+                if line in existing:
+                    report.add(line, row, 'duplicate_file' if existing[line] >= first_new_id else 'exists')
+                else:
+                    rows.append(values)
+            last_id = cursor.execute("SELECT MAX(id) FROM patients").fetchone()[0] or 0
+            cursor.executemany(f"""
+                INSERT INTO patients ({', '.join(IMPORT_COLUMNS)}, pesel_hash)
+                VALUES ({', '.join('?' * (len(IMPORT_COLUMNS) + 1))})
+            """, encrypt_rows(rows, cipher))
+            # Nowi pacjenci trafiają od razu do indeksu duplikatów (database.duplicates)
+            cursor.execute("SELECT id, first_name, last_name, pesel, birth_date FROM patients WHERE id > ?",
+                           (last_id,))
+            index_patients(cursor, cursor.fetchall(), replace=False, cipher=cipher)
+            imported += len(rows)
+
+            in_transaction += 1
+            if in_transaction >= batches_per_transaction and not dry_run:
+                cursor.execute("COMMIT")
+                in_transaction = 0
+            if progress:
+                progress(total, imported)
+
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK" if dry_run else "COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        report.close()
+        file.close()
+        conn.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        'path': str(path), 'rows': total, 'imported': imported, 'rejected': sum(report.counts.values()),
+        'rejected_by_reason': dict(report.counts), 'rejected_sample': report.sample,
+        'rejected_path': str(report.path) if report.writer else None, 'dry_run': dry_run,
+        'seconds': round(seconds, 3), 'rows_per_s': round(total / seconds) if seconds else None,
+    }
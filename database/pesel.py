@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+PESEL_WEIGHTS = np.array([1, 3, 7, 9, 1, 3, 7, 9, 1, 3], dtype=np.int64)
+# Stulecie urodzenia zakodowane w miesiącu: miesiąc // 20 -> stulecie
+CENTURY_BY_MONTH_BLOCK = np.array([1900, 2000, 2100, 2200, 1800], dtype=np.int64)
+
+PESEL_ERRORS = {
+    'format': "PESEL musi mieć 11 cyfr",
+    'checksum': "Błędna cyfra kontrolna PESEL",
+    'date': "PESEL zawiera nieistniejącą datę urodzenia",
+}
+
+
+@dataclass
+class PeselBatch:
+    """Wynik sprawdzenia partii numerów PESEL (tablice tej samej długości co wejście)"""
+    errors: np.ndarray       # kod błędu z PESEL_ERRORS albo None
+    birth_dates: np.ndarray  # datetime64[D]; NaT dla błędnych numerów
+    genders: np.ndarray      # 'M' / 'K'; '' dla błędnych numerów
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.errors == None  # noqa: E711 - porównanie element po elemencie
+
+    def birth_date_strings(self) -> np.ndarray:
+        """Daty urodzenia w formacie ISO (jak zapisuje je add_patient)"""
+        return np.datetime_as_string(self.birth_dates, unit='D')
+
+
+def validate_pesels(pesels: Sequence[str]) -> PeselBatch:
+    """Sprawdza sumy kontrolne i daty wielu numerów PESEL naraz (numpy).
+
+    Cyfry wszystkich numerów trafiają do jednej macierzy n x 11, więc
+    suma kontrolna, data urodzenia i płeć są liczone operacjami na
+    kolumnach, bez pętli po numerach.
+    """
+    count = len(pesels)
+    errors = np.full(count, None, dtype=object)
+    birth_dates = np.full(count, np.datetime64('NaT'), dtype='datetime64[D]')
+    genders = np.full(count, '', dtype='<U1')
+
+    well_formed = np.array([len(p) == 11 and p.isascii() and p.isdigit() for p in pesels], dtype=bool)
+    errors[~well_formed] = 'format'
+    rows = np.flatnonzero(well_formed)
+    if not len(rows):
+        return PeselBatch(errors, birth_dates, genders)
+
+    text = "".join(pesels[i] for i in rows).encode('ascii')
+    digits = (np.frombuffer(text, dtype=np.uint8) - ord('0')).astype(np.int64).reshape(-1, 11)
+
+    checksum = (10 - digits[:, :10] @ PESEL_WEIGHTS % 10) % 10
+    checksum_ok = checksum == digits[:, 10]
+
+    coded_month = digits[:, 2] * 10 + digits[:, 3]
+    month = coded_month % 20
+    year = CENTURY_BY_MONTH_BLOCK[coded_month // 20] + digits[:, 0] * 10 + digits[:, 1]
+    day = digits[:, 4] * 10 + digits[:, 5]
+    month_ok = (month >= 1) & (month <= 12)
+
+    # Pierwszy dzień miesiąca jako datetime64[M]; błędne miesiące tymczasowo jako styczeń
+    month_start = ((year - 1970) * 12 + np.where(month_ok, month, 1) - 1).astype('datetime64[M]')
+    days_in_month = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(np.int64)
+    date_ok = month_ok & (day >= 1) & (day <= days_in_month)
+
+    errors[rows[~checksum_ok]] = 'checksum'
+    errors[rows[checksum_ok & ~date_ok]] = 'date'
+    ok = checksum_ok & date_ok
+    birth_dates[rows[ok]] = month_start[ok].astype('datetime64[D]') + (day[ok] - 1)
+    # Przedostatnia cyfra: nieparzysta - mężczyzna, parzysta - kobieta
+    genders[rows[ok]] = np.where(digits[ok, 9] % 2 == 1, 'M', 'K')
+    return PeselBatch(errors, birth_dates, genders)
+
+
+def validate_pesel(pesel: str) -> Optional[str]:
+    """Sprawdza jeden numer PESEL; zwraca opis błędu albo None"""
+    error = validate_pesels([pesel]).errors[0]
+    return PESEL_ERRORS[error] if error else None
@@ -0,0 +1,184 @@
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, MutableMapping, Optional
+from .metrics import active_sessions, session_bytes
+
+# Wyniki wyszukiwania starsze niż TTL są usuwane z sesji
+SEARCH_RESULTS_TTL_SECONDS = 15 * 60
+MAX_SEARCH_RESULTS = 200
+# Jak często (najwyżej) mierzyć rozmiar sesji i po jakim czasie uznać ją za martwą
+MEASURE_INTERVAL_SECONDS = 30
+SESSION_STALE_SECONDS = 60 * 60
+# Kroki, w których trwa ocena - poza nimi current_findings modułów można wyczyścić
+ASSESSMENT_STEPS = ('assessment', 'diagnosis')
+# Klucze z danymi sesji mierzone przy okresowym pomiarze; pozostałe (baza, silnik diagnoz,
+# stan widgetów) tylko na żądanie w panelu debugowania - ich przejście jest kosztowne
+TRACKED_KEYS = (
+    'session_id', 'workflow_step', 'current_patient_id', 'selected_region',
+    'assessment_data', 'search_results', 'patients_page',
+)
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Szacuje rozmiar obiektu w bajtach razem z obiektami, do których się odwołuje"""
+    if seen is None:
+        seen = set()
+    obj_id = id(obj)
+    if obj_id in seen:
+        return 0
+    seen.add(obj_id)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    if hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+
+class SessionRegistry:
+    """Rejestr rozmiarów wszystkich sesji w procesie serwera"""
+
+    def __init__(self):
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, session_id: str, total_bytes: int, key_sizes: Dict[str, int]):
+        """Zapisuje pomiar sesji i usuwa sesje nieaktywne dłużej niż SESSION_STALE_SECONDS"""
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = {
+                'session_id': session_id,
+                'bytes': total_bytes,
+                'keys': key_sizes,
+                'updated_at': now
+            }
+            self._prune(now)
+
+    def _prune(self, now: float):
+        """Usuwa sesje bez pomiaru od SESSION_STALE_SECONDS (wywoływane pod blokadą)"""
+        stale = [sid for sid, info in self._sessions.items() if now - info['updated_at'] > SESSION_STALE_SECONDS]
+        for sid in stale:
+            del self._sessions[sid]
+
+    def largest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Zwraca największe sesje (malejąco po rozmiarze)"""
+        with self._lock:
+            self._prune(time.time())
+            sessions = list(self._sessions.values())
+        return sorted(sessions, key=lambda info: info['bytes'], reverse=True)[:limit]
+
+    def active_count(self) -> int:
+        """Zwraca liczbę sesji zmierzonych w ostatnim czasie"""
+        with self._lock:
+            self._prune(time.time())
+            return len(self._sessions)
+
+    def total_bytes(self) -> int:
+        """Zwraca łączny szacowany rozmiar wszystkich sesji"""
+        with self._lock:
+            self._prune(time.time())
+            return sum(info['bytes'] for info in self._sessions.values())
+
+
+session_registry = SessionRegistry()
+active_sessions.set_function(session_registry.active_count)
+session_bytes.set_function(session_registry.total_bytes)
+
+
+class SessionStateManager:
+    """Zarządza zawartością stanu sesji Streamlit.
+
+    Trzyma identyfikatory zamiast całych obiektów (pacjent, wyniki wyszukiwania),
+    usuwa przeterminowane dane i raportuje rozmiar sesji do rejestru serwera.
+    """
+
+    def __init__(self, state: MutableMapping):
+        self.state = state
+        if 'session_id' not in state:
+            state['session_id'] = uuid.uuid4().hex
+        self.session_id = state['session_id']
+
+    # === PACJENT ===
+
+    def set_current_patient(self, patient):
+        """Zapamiętuje wybranego pacjenta (tylko jego ID)"""
+        self.state['current_patient_id'] = patient.id if patient else None
+
+    def get_current_patient(self, db):
+        """Zwraca wybranego pacjenta pobranego z bazy"""
+        patient_id = self.state.get('current_patient_id')
+        if patient_id is None:
+            return None
+        patient = db.get_patient(patient_id)
+        if patient is None:
+            # Pacjent usunięty w międzyczasie - nie trzymaj martwej referencji
+            self.state['current_patient_id'] = None
+        return patient
+
+    # === WYNIKI WYSZUKIWANIA ===
+
+    def set_search_results(self, patients: List[Any], search_term: str):
+        """Zapamiętuje wyniki wyszukiwania jako listę ID"""
+        self.state['search_results'] = {
+            'term': search_term,
+            'ids': [p.id for p in patients[:MAX_SEARCH_RESULTS]],
+            'total': len(patients),
+            'created_at': time.time()
+        }
+
+    def has_search_results(self) -> bool:
+        """Sprawdza czy sesja ma aktualne wyniki wyszukiwania"""
+        self._evict_stale_search_results()
+        return self.state.get('search_results') is not None
+
+    def get_search_results(self, db) -> List[Any]:
+        """Zwraca pacjentów z ostatniego wyszukiwania pobranych z bazy"""
+        self._evict_stale_search_results()
+        results = self.state.get('search_results')
+        if not results:
+            return []
+        # Jedno zapytanie na całą listę zamiast osobnego get_patient dla każdego ID
+        return db.get_patients_by_ids(results['ids'])
+
+    def _evict_stale_search_results(self):
+        results = self.state.get('search_results')
+        if results and time.time() - results['created_at'] > SEARCH_RESULTS_TTL_SECONDS:
+            self.state['search_results'] = None
+
+    # === KOMPAKTOWANIE I POMIAR ===
+
+    def compact(self):
+        """Usuwa przeterminowane dane i wyniki modułów z zakończonych ocen"""
+        self._evict_stale_search_results()
+
+        if self.state.get('workflow_step') not in ASSESSMENT_STEPS:
+            for value in list(self.state.values()):
+                findings = getattr(value, 'current_findings', None)
+                if findings:
+                    value.current_findings = {}
+
+    def measure(self, force: bool = False, all_keys: bool = False) -> Optional[Dict[str, int]]:
+        """Mierzy rozmiar sesji (nie częściej niż co MEASURE_INTERVAL_SECONDS) i zapisuje go w rejestrze.
+
+        Domyślnie mierzone są tylko klucze TRACKED_KEYS; all_keys (panel
+        debugowania) przechodzi cały stan sesji, razem z bazą i silnikiem.
+        """
+        now = time.time()
+        last_measured = self.state.get('_footprint_measured_at', 0)
+        if not force and now - last_measured < MEASURE_INTERVAL_SECONDS:
+            return None
+
+        keys = list(self.state.keys()) if all_keys else [key for key in TRACKED_KEYS if key in self.state]
+        key_sizes = {str(key): deep_sizeof(self.state[key]) for key in keys}
+        session_registry.update(self.session_id, sum(key_sizes.values()), key_sizes)
+        self.state['_footprint_measured_at'] = now
+        return key_sizes
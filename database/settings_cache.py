@@ -0,0 +1,121 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+# Co ile sekund najwyżej sprawdzać, czy inny proces zmienił bazę
+SETTINGS_CHECK_INTERVAL_SECONDS = 0.5
+
+
+class SettingsCache:
+    """Ustawienia user_settings trzymane w pamięci procesu.
+
+    Tabela jest wczytywana raz, a set() zapisuje do bazy i od razu do
+    pamięci (write-through). Zmiany z innych procesów wykrywane są tanio:
+    PRAGMA data_version na stałym połączeniu zmienia się tylko po zapisie
+    z innego połączenia, a dopiero wtedy odczytujemy jeden wiersz
+    settings_version (zwiększany triggerami na user_settings). Tabela jest
+    wczytywana ponownie tylko, gdy zmieniły się ustawienia, a nie
+    dowolne dane w bazie.
+    """
+
+    def __init__(self, db_path: Path, check_interval: float = SETTINGS_CHECK_INTERVAL_SECONDS):
+        self.db_path = Path(db_path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._values: Optional[Dict[str, str]] = None
+        self._version = None
+        self._data_version = None
+        self._checked_at = 0.0
+        self.stats = {'hits': 0, 'checks': 0, 'reloads': 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._conn
+
+    def _read_version(self, conn: sqlite3.Connection) -> Optional[int]:
+        """Licznik zmian ustawień; None, gdy baza nie ma jeszcze migracji 8 (auto_migrate=False)"""
+        try:
+            row = conn.execute("SELECT version FROM settings_version WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else 0
+
+    def _reload(self, conn: sqlite3.Connection):
+        # Wersja i zawartość z jednej transakcji odczytu - spójne ze sobą
+        with conn:
+            conn.execute("BEGIN")
+            self._version = self._read_version(conn)
+            self._values = dict(conn.execute("SELECT setting_key, setting_value FROM user_settings"))
+        self.stats['reloads'] += 1
+
+    def _refresh(self):
+        """Wczytuje ustawienia ponownie, jeśli zmienił je inny proces (wywoływane pod blokadą)"""
+        now = time.monotonic()
+        if self._values is not None and now - self._checked_at < self.check_interval:
+            self.stats['hits'] += 1
+            return
+        self._checked_at = now
+
+        conn = self._connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._values is None:
+            self._data_version = data_version
+            self._reload(conn)
+            return
+
+        self.stats['checks'] += 1
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        version = self._read_version(conn)
+        # Bez licznika wersji każda zmiana bazy z innego połączenia wymaga ponownego odczytu
+        if version is None or version != self._version:
+            self._reload(conn)
+
+    def get(self, key: str, default_value: str = None) -> Optional[str]:
+        with self._lock:
+            self._refresh()
+            return self._values.get(key, default_value)
+
+    def get_all(self) -> Dict[str, str]:
+        with self._lock:
+            self._refresh()
+            return dict(self._values)
+
+    def set(self, key: str, value: str):
+        """Zapisuje ustawienie w bazie i w pamięci"""
+        self.set_many({key: value})
+
+    def set_many(self, values: Dict[str, str]):
+        """Zapisuje kilka ustawień w jednej transakcji, w bazie i w pamięci"""
+        with self._lock:
+            self._refresh()
+            conn = self._connection()
+            with conn:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO user_settings (setting_key, setting_value, updated_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                """, values.items())
+                version = self._read_version(conn)
+            # Zapis z tego połączenia nie zmienia jego data_version, więc wystarczy nowa wersja
+            if version is not None and self._version is not None and version == self._version + len(values):
+                self._values.update(values)
+                self._version = version
+            else:
+                # W międzyczasie ustawienia zmienił też inny proces
+                self._reload(conn)
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._values = None
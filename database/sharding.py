@@ -0,0 +1,475 @@
+import copy
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .backup import BACKUP_PAGES_PER_STEP, BackupScheduler
+from .db_manager import DatabaseManager, PATIENT_SORT_COLUMNS
+from .duplicates import DUPLICATE_MIN_SCORE, DuplicateCandidate
+from .export import EXPORT_CHUNK_SIZE, ExportFilter
+from .findings import FindingFilter
+from .log_archive import LogMaintenance
+from .models import Patient, DiagnosisSession, LazyDiagnosisSession, TestResult
+from .patient_import import IMPORT_BATCH_SIZE, REJECTED_SAMPLE_SIZE
+
+# Router wybiera shard (indeks) dla nowego pacjenta
+Router = Callable[[Patient], int]
+
+
+def pesel_shard(pesel: str, shard_count: int) -> int:
+    """Indeks shardu dla PESEL (jak pesel_hash_router)"""
+    return zlib.crc32(pesel.encode('utf-8')) % shard_count
+
+
+def pesel_hash_router(shard_count: int) -> Router:
+    """Rozkłada pacjentów równomiernie po skrócie PESEL (stabilnym między procesami)"""
+    def route(patient: Patient) -> int:
+        return pesel_shard(patient.pesel, shard_count)
+    return route
+
+
+def shard_path(path: str, name: str) -> Path:
+    """Plik shardu obok path: eksport/pacjenci.csv.gz -> eksport/pacjenci_<name>.csv.gz"""
+    path = Path(path)
+    stem, dot, suffixes = path.name.partition('.')
+    return path.with_name(f"{stem}_{name}{dot}{suffixes}")
+
+
+class ShardedDatabaseManager:
+    """Router implementujący API DatabaseManager na kilku plikach bazy.
+
+    Każdy shard (np. gabinet) to osobny plik SQLite z pełnym schematem.
+    ID zwracane na zewnątrz są globalne: local_id * liczba_shardów + indeks
+    shardu, więc operacje na jednym pacjencie lub sesji trafiają do
+    jednego shardu bez tabeli katalogowej. Listy, wyszukiwanie i analityka
+    odpytują wszystkie shardy równolegle i scalają wyniki. Ustawienia
+    i log_action wdrożenia trzyma pierwszy shard; operacje na pacjentach
+    logują w shardzie pacjenta, a get_logs scala logi wszystkich shardów.
+
+    Przy domyślnym routerze (po PESEL) shard pacjenta wynika z PESEL, więc
+    patient_exists odpytuje tylko ten shard, a add_patient nie przyjmuje
+    innego gabinetu. Przypisanie pacjentów do gabinetów wymaga własnego
+    routera.
+
+    Kolejność shardów jest częścią ID - nowe shardy dopisuje się na końcu,
+    a liczby shardów nie można zmienić bez przenumerowania danych.
+    """
+
+    def __init__(self, shards: Dict[str, str], router: Optional[Router] = None,
+                 manager_factory: Callable[[str], DatabaseManager] = DatabaseManager):
+        if not shards:
+            raise ValueError("Podaj co najmniej jeden shard")
+        self.shard_names = list(shards)
+        self.shards = [manager_factory(path) for path in shards.values()]
+        # Bez własnego routera pacjent o danym PESEL jest zawsze w jednym, znanym shardzie
+        self.routes_by_pesel = router is None
+        self.router = router or pesel_hash_router(len(self.shards))
+        self._pool = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix='db-shard')
+
+    @property
+    def primary(self) -> DatabaseManager:
+        return self.shards[0]
+
+    def shard(self, name: str) -> DatabaseManager:
+        return self.shards[self.shard_names.index(name)]
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        for shard in self.shards:
+            shard.close()
+
+    def __enter__(self) -> 'ShardedDatabaseManager':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # === ID GLOBALNE ===
+
+    def to_global(self, local_id: Optional[int], shard_index: int) -> Optional[int]:
+        if local_id is None:
+            return None
+        return local_id * len(self.shards) + shard_index
+
+    def to_local(self, global_id: int) -> Tuple[int, int]:
+        """Zwraca (indeks shardu, ID lokalne)"""
+        return global_id % len(self.shards), global_id // len(self.shards)
+
+    def _route(self, global_id: int) -> Tuple[DatabaseManager, int]:
+        index, local_id = self.to_local(global_id)
+        return self.shards[index], local_id
+
+    def _patient(self, patient: Optional[Patient], index: int) -> Optional[Patient]:
+        if patient is not None:
+            patient.id = self.to_global(patient.id, index)
+        return patient
+
+    def _session(self, session: Optional[DiagnosisSession], index: int) -> Optional[DiagnosisSession]:
+        if session is not None:
+            session.id = self.to_global(session.id, index)
+            session.patient_id = self.to_global(session.patient_id, index)
+            if isinstance(session, LazyDiagnosisSession):
+                session._loader = self.get_session_details
+        return session
+
+    def _test_result(self, test_result: TestResult, index: int) -> TestResult:
+        test_result.id = self.to_global(test_result.id, index)
+        test_result.session_id = self.to_global(test_result.session_id, index)
+        return test_result
+
+    def _localized(self, obj, **ids):
+        """Kopia obiektu z ID lokalnymi (obiekt wywołującego zostaje bez zmian)"""
+        local = copy.copy(obj)
+        local.__dict__.update(ids)
+        return local
+
+    # === ROZSYŁANIE ===
+
+    def map_shards(self, func: Callable[[DatabaseManager], Any]) -> List[Any]:
+        """Wywołuje func(shard) dla wszystkich shardów równolegle; wyniki w kolejności shardów"""
+        futures = [self._pool.submit(func, shard) for shard in self.shards]
+        return [future.result() for future in futures]
+
+    def fan_out(self, method: str, *args, **kwargs) -> List[Any]:
+        """Wywołuje metodę DatabaseManager na wszystkich shardach równolegle"""
+        return self.map_shards(lambda shard: getattr(shard, method)(*args, **kwargs))
+
+    def _merge_patients(self, results: Sequence[List[Patient]]) -> List[Patient]:
+        patients = [self._patient(patient, index) for index, part in enumerate(results) for patient in part]
+        patients.sort(key=lambda patient: (patient.last_name, patient.first_name, patient.id))
+        return patients
+
+    def _merge_counts(self, results: Iterable[Dict[Any, int]]) -> Dict[Any, int]:
+        counts = Counter()
+        for part in results:
+            counts.update(part)
+        return dict(counts.most_common())
+
+    def _merge_confidence(self, results: Sequence[Dict[str, Tuple[float, int]]]) -> Dict[str, Tuple[float, int]]:
+        therapists = defaultdict(lambda: (0.0, 0))
+        for part in results:
+            for name, (total, count) in part.items():
+                therapists[name] = (therapists[name][0] + total, therapists[name][1] + count)
+        return dict(therapists)
+
+    def _merge_sessions(self, results: Sequence[List[DiagnosisSession]], limit: int = None) -> List[DiagnosisSession]:
+        sessions = [self._session(session, index) for index, part in enumerate(results) for session in part]
+        sessions.sort(key=lambda session: session.session_date, reverse=True)
+        return sessions[:limit] if limit else sessions
+
+    # === OPERACJE NA PACJENTACH ===
+
+    def add_patient(self, patient: Patient, clinic: str = None) -> int:
+        """Dodaje pacjenta do shardu gabinetu clinic (domyślnie wybranego przez router)"""
+        index = self.router(patient)
+        if clinic is not None:
+            clinic_index = self.shard_names.index(clinic)
+            if self.routes_by_pesel and clinic_index != index:
+                raise ValueError(f"Przy routingu po PESEL pacjent należy do shardu {self.shard_names[index]} "
+                                 f"- przypisanie do gabinetów wymaga własnego routera")
+            index = clinic_index
+        return self.to_global(self.shards[index].add_patient(patient), index)
+
+    def get_patient(self, patient_id: int) -> Optional[Patient]:
+        shard, local_id = self._route(patient_id)
+        return self._patient(shard.get_patient(local_id), patient_id % len(self.shards))
+
+    def get_patients_by_ids(self, patient_ids: Sequence[int]) -> List[Patient]:
+        ids = list(patient_ids)
+        by_shard = defaultdict(list)
+        for patient_id in ids:
+            index, local_id = self.to_local(patient_id)
+            by_shard[index].append(local_id)
+        # Tylko shardy, na których są szukani pacjenci
+        futures = {index: self._pool.submit(self.shards[index].get_patients_by_ids, local_ids)
+                   for index, local_ids in by_shard.items()}
+        found = {}
+        for index, future in futures.items():
+            found.update((patient.id, patient) for patient in
+                         (self._patient(patient, index) for patient in future.result()))
+        return [found[patient_id] for patient_id in ids if patient_id in found]
+
+    def update_patient(self, patient: Patient):
+        shard, local_id = self._route(patient.id)
+        shard.update_patient(self._localized(patient, id=local_id))
+
+    def patient_exists(self, pesel: str) -> bool:
+        if self.routes_by_pesel:
+            return self.shards[pesel_shard(pesel, len(self.shards))].patient_exists(pesel)
+        return any(self.fan_out('patient_exists', pesel))
+
+    def find_duplicate_candidates(self, patient: Patient,
+                                  min_score: float = DUPLICATE_MIN_SCORE) -> List[DuplicateCandidate]:
+        """Kandydaci ze wszystkich shardów - duplikat z literówką w PESEL trafia zwykle do innego shardu"""
+        own_index, local_id = self.to_local(patient.id) if patient.id is not None else (None, None)
+
+        def find(shard: DatabaseManager) -> List[DuplicateCandidate]:
+            exclude_id = local_id if self.shards.index(shard) == own_index else None
+            return shard.find_duplicate_candidates(self._localized(patient, id=exclude_id), min_score)
+
+        candidates = []
+        for index, part in enumerate(self.map_shards(find)):
+            for candidate in part:
+                candidate.patient_id = self.to_global(candidate.patient_id, index)
+                candidates.append(candidate)
+        return sorted(candidates, key=lambda candidate: (-candidate.score, candidate.patient_id))
+
+    def scan_duplicates(self, workers: Optional[int] = None,
+                        min_score: float = DUPLICATE_MIN_SCORE) -> List[Dict[str, Any]]:
+        """Skan każdego shardu osobno; pary z różnych shardów wskazuje find_duplicate_candidates"""
+        pairs = []
+        for index, part in enumerate(self.fan_out('scan_duplicates', workers, min_score)):
+            for pair in part:
+                pair.update(patient_id=self.to_global(pair['patient_id'], index),
+                            duplicate_id=self.to_global(pair['duplicate_id'], index))
+                pairs.append(pair)
+        return sorted(pairs, key=lambda pair: (-pair['score'], pair['patient_id'], pair['duplicate_id']))
+
+    def search_patients(self, search_term: str) -> List[Patient]:
+        return self._merge_patients(self.fan_out('search_patients', search_term))
+
+    def get_all_patients(self, active_only: bool = True) -> List[Patient]:
+        return self._merge_patients(self.fan_out('get_all_patients', active_only))
+
+    def count_patients(self, search_term: Optional[str] = None, active_only: bool = True) -> int:
+        return sum(self.fan_out('count_patients', search_term, active_only))
+
+    def get_patients_page(self, page: int = 0, page_size: int = 50, sort_by: str = 'last_name',
+                          descending: bool = False, search_term: Optional[str] = None,
+                          active_only: bool = True) -> List[Patient]:
+        """Strona listy pacjentów - każdy shard zwraca początek listy do końca strony, wynik jest scalany"""
+        if sort_by not in PATIENT_SORT_COLUMNS:
+            raise ValueError(f"Nieobsługiwana kolumna sortowania: {sort_by}")
+        end = (max(page, 0) + 1) * page_size
+        results = self.fan_out('get_patients_page', 0, end, sort_by, descending, search_term, active_only)
+        patients = [self._patient(patient, index) for index, part in enumerate(results) for patient in part]
+
+        columns = [column for column in PATIENT_SORT_COLUMNS[sort_by] if column != 'id']
+        patients.sort(key=lambda patient: tuple((getattr(patient, column) is None, getattr(patient, column))
+                                                for column in columns) + (patient.id,),
+                      reverse=descending)
+        return patients[end - page_size:end]
+
+    # === OPERACJE NA SESJACH DIAGNOSTYCZNYCH ===
+
+    def add_diagnosis_session(self, session: DiagnosisSession) -> int:
+        shard, local_patient_id = self._route(session.patient_id)
+        local_id = shard.add_diagnosis_session(self._localized(session, patient_id=local_patient_id))
+        return self.to_global(local_id, session.patient_id % len(self.shards))
+
+    def update_diagnosis_session(self, session: DiagnosisSession):
+        shard, local_id = self._route(session.id)
+        _, local_patient_id = self.to_local(session.patient_id)
+        shard.update_diagnosis_session(self._localized(session, id=local_id, patient_id=local_patient_id))
+
+    def get_patient_history(self, patient_id: int) -> List[DiagnosisSession]:
+        shard, local_id = self._route(patient_id)
+        index = patient_id % len(self.shards)
+        return [self._session(session, index) for session in shard.get_patient_history(local_id)]
+
+    def get_patient_history_summary(self, patient_id: int, limit: int = None,
+                                    offset: int = 0) -> List[LazyDiagnosisSession]:
+        shard, local_id = self._route(patient_id)
+        index = patient_id % len(self.shards)
+        return [self._session(session, index)
+                for session in shard.get_patient_history_summary(local_id, limit, offset)]
+
+    def get_session_details(self, session_id: int) -> Optional[Dict[str, Any]]:
+        shard, local_id = self._route(session_id)
+        return shard.get_session_details(local_id)
+
+    def get_last_session(self, patient_id: int) -> Optional[DiagnosisSession]:
+        shard, local_id = self._route(patient_id)
+        return self._session(shard.get_last_session(local_id), patient_id % len(self.shards))
+
+    def add_test_result(self, test_result: TestResult) -> int:
+        shard, local_session_id = self._route(test_result.session_id)
+        local_id = shard.add_test_result(self._localized(test_result, session_id=local_session_id))
+        return self.to_global(local_id, test_result.session_id % len(self.shards))
+
+    def get_session_test_results(self, session_id: int) -> List[TestResult]:
+        shard, local_id = self._route(session_id)
+        index = session_id % len(self.shards)
+        return [self._test_result(result, index) for result in shard.get_session_test_results(local_id)]
+
+    def get_patient_stats(self, patient_id: int) -> Dict[str, Any]:
+        shard, local_id = self._route(patient_id)
+        return shard.get_patient_stats(local_id)
+
+    # === ZAPYTANIA PRZEKROJOWE ===
+
+    def find_sessions_by_findings(self, filters: List[FindingFilter], module_type: str = None,
+                                  limit: int = None) -> List[DiagnosisSession]:
+        return self._merge_sessions(self.fan_out('find_sessions_by_findings', filters, module_type, limit), limit)
+
+    def find_patients_by_findings(self, filters: List[FindingFilter], module_type: str = None) -> List[Patient]:
+        return self._merge_patients(self.fan_out('find_patients_by_findings', filters, module_type))
+
+    def find_sessions_by_notes(self, conditions: List[Tuple[str, str, Any]], module_type: str = None,
+                               limit: int = None) -> List[DiagnosisSession]:
+        return self._merge_sessions(self.fan_out('find_sessions_by_notes', conditions, module_type, limit), limit)
+
+    def get_notes_value_counts(self, name: str, since: str = None) -> Dict[Any, int]:
+        return self._merge_counts(self.fan_out('get_notes_value_counts', name, since))
+
+    def get_diagnosis_counts(self, use_snapshot: bool = False) -> Dict[str, int]:
+        return self._merge_counts(self.fan_out('get_diagnosis_counts', use_snapshot))
+
+    def get_therapist_confidence(self, use_snapshot: bool = False) -> Dict[str, Tuple[float, int]]:
+        return self._merge_confidence(self.fan_out('get_therapist_confidence', use_snapshot))
+
+    def get_analytics_data(self, use_snapshot: bool = False) -> Dict[str, Any]:
+        """Analityka wszystkich shardów - zapytania równoległe, wyniki scalone"""
+        # Top 10 rozpoznań i średnie terapeutów nie dają się scalić - shardy zwracają pełne liczniki
+        results = self.map_shards(lambda shard: (shard.get_analytics_data(use_snapshot),
+                                                 shard.get_diagnosis_counts(use_snapshot),
+                                                 shard.get_therapist_confidence(use_snapshot)))
+        parts, diagnosis_parts, therapist_parts = zip(*results)
+
+        confidence = [row for part in parts for row in part['confidence_distribution']]
+        over_time = Counter()
+        module_usage = Counter()
+        for part in parts:
+            over_time.update({row['data']: row['liczba_diagnoz'] for row in part['diagnoses_over_time']})
+            module_usage.update({row['modul']: row['liczba'] for row in part['module_usage']})
+
+        diagnoses = Counter(self._merge_counts(diagnosis_parts))
+        therapists = self._merge_confidence(therapist_parts)
+
+        return {
+            'total_patients': sum(part['total_patients'] for part in parts),
+            'diagnoses_this_month': sum(part['diagnoses_this_month'] for part in parts),
+            'avg_confidence': (sum(row['confidence_level'] for row in confidence) / len(confidence)
+                               if confidence else 0),
+            'most_used_module': module_usage.most_common(1)[0][0] if module_usage else "Brak",
+            'diagnoses_over_time': [{'data': day, 'liczba_diagnoz': count} for day, count in sorted(over_time.items())],
+            'module_usage': [{'modul': module, 'liczba': count} for module, count in module_usage.items()],
+            'top_diagnoses': [{'diagnoza': diagnosis, 'liczba': count} for diagnosis, count in diagnoses.most_common(10)],
+            'confidence_distribution': confidence,
+            'therapist_effectiveness': [{'terapeuta': name, 'srednia_pewnosc': total / count}
+                                        for name, (total, count) in therapists.items() if count >= 5]
+        }
+
+    # === EKSPORT I IMPORT ===
+
+    def export_data(self, table: str, path: str, filters: Optional[ExportFilter] = None,
+                    chunk_size: int = EXPORT_CHUNK_SIZE,
+                    progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Dict[str, Any]]:
+        """Eksport każdego shardu do osobnego pliku (shard_path); ID w plikach są lokalne dla shardu"""
+        def export(shard: DatabaseManager) -> Dict[str, Any]:
+            name = self.shard_names[self.shards.index(shard)]
+            return shard.export_data(table, str(shard_path(path, name)), filters, chunk_size, progress)
+
+        return dict(zip(self.shard_names, self.map_shards(export)))
+
+    def import_patients(self, path: str, rejected_path: Optional[str] = None,
+                        batch_size: int = IMPORT_BATCH_SIZE, dry_run: bool = False,
+                        progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """Import jednego pliku - każdy shard równolegle zapisuje wiersze, które wskazuje mu router.
+
+        Odrzucone wiersze trafiają do raportów shard_path(rejected_path)
+        z numerami linii pliku wejściowego.
+        """
+        def select(index: int) -> Callable[[Dict[str, str]], bool]:
+            def selected(row: Dict[str, str]) -> bool:
+                pesel = (row.get('pesel') or '').strip()
+                if self.routes_by_pesel:
+                    return pesel_shard(pesel, len(self.shards)) == index
+                # Router dostaje surowe wartości z pliku (wiersze błędne odrzuci import shardu)
+                return self.router(Patient(first_name=row.get('first_name', ''), last_name=row.get('last_name', ''),
+                                           pesel=pesel, birth_date=row.get('birth_date'),
+                                           gender=row.get('gender', ''))) == index
+            return selected
+
+        def run(shard: DatabaseManager) -> Dict[str, Any]:
+            index = self.shards.index(shard)
+            rejected = str(shard_path(rejected_path, self.shard_names[index])) if rejected_path else None
+            return shard.import_patients(path, rejected, batch_size, dry_run, progress, select=select(index))
+
+        parts = self.map_shards(run)
+        result = {name: sum(part[name] for part in parts) for name in ('rows', 'imported', 'rejected')}
+        seconds = max(part['seconds'] for part in parts)
+        sample = sorted((row for part in parts for row in part['rejected_sample']), key=lambda row: row['line'])
+        return {
+            'path': str(path), **result,
+            'rejected_by_reason': self._merge_counts(part['rejected_by_reason'] for part in parts),
+            'rejected_sample': sample[:REJECTED_SAMPLE_SIZE],
+            'rejected_paths': {name: part['rejected_path'] for name, part in zip(self.shard_names, parts)
+                               if part['rejected_path']},
+            'dry_run': dry_run, 'seconds': seconds,
+            'rows_per_s': round(result['rows'] / seconds) if seconds else None,
+        }
+
+    # === LOGI I USTAWIENIA ===
+
+    def log_action(self, level: str, message: str, module_name: str = None, user_id: str = None):
+        self.primary.log_action(level, message, module_name, user_id)
+
+    def get_logs(self, limit: int = 100, level: str = None, since: str = None, until: str = None,
+                 include_archive: bool = False) -> List[Dict]:
+        """Logi wszystkich shardów od najnowszych; pole shard - nazwa shardu wpisu"""
+        results = self.fan_out('get_logs', limit, level, since, until, include_archive)
+        logs = [dict(log, shard=name) for name, part in zip(self.shard_names, results) for log in part]
+        logs.sort(key=lambda log: log['created_at'], reverse=True)
+        return logs[:limit]
+
+    def archive_logs(self, progress: Optional[Callable[[str], None]] = None) -> Dict[str, Dict[str, Any]]:
+        return dict(zip(self.shard_names, self.fan_out('archive_logs', progress)))
+
+    def get_log_archives(self) -> List[Dict[str, Any]]:
+        return [dict(segment, shard=name) for name, part in zip(self.shard_names, self.fan_out('get_log_archives'))
+                for segment in part]
+
+    def start_log_maintenance(self, interval: float = 3600.0) -> Dict[str, LogMaintenance]:
+        return {name: shard.start_log_maintenance(interval) for name, shard in zip(self.shard_names, self.shards)}
+
+    def get_setting(self, key: str, default_value: str = None) -> str:
+        return self.primary.get_setting(key, default_value)
+
+    def set_setting(self, key: str, value: str):
+        self.primary.set_setting(key, value)
+
+    def get_settings(self) -> Dict[str, str]:
+        return self.primary.get_settings()
+
+    def get_system_configuration(self):
+        return self.primary.get_system_configuration()
+
+    def set_system_configuration(self, config):
+        self.primary.set_system_configuration(config)
+
+    # === UTRZYMANIE (każdy shard osobno) ===
+
+    def migrate(self, *args, **kwargs) -> Dict[str, Dict[str, Any]]:
+        return dict(zip(self.shard_names, self.fan_out('migrate', *args, **kwargs)))
+
+    def get_schema_status(self) -> Dict[str, Dict[str, Any]]:
+        return dict(zip(self.shard_names, self.fan_out('get_schema_status')))
+
+    def rebuild_session_findings(self, batch_size: int = 1000) -> int:
+        return sum(self.fan_out('rebuild_session_findings', batch_size))
+
+    def encrypt_patient_data(self, batch_size: int = 500) -> int:
+        return sum(self.fan_out('encrypt_patient_data', batch_size))
+
+    def compact_session_notes(self, batch_size: int = 1000, threshold: Optional[int] = None) -> Dict[str, int]:
+        stats = Counter()
+        for part in self.fan_out('compact_session_notes', batch_size, threshold):
+            stats.update(part)
+        return dict(stats)
+
+    def refresh_analytics_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return dict(zip(self.shard_names, self.fan_out('refresh_analytics_snapshot')))
+
+    def backup_to(self, directory: str, **kwargs) -> Dict[str, Dict[str, Any]]:
+        """Kopia każdego shardu do directory/<nazwa shardu>.db"""
+        return {name: shard.backup_to(f"{directory}/{name}.db", **kwargs)
+                for name, shard in zip(self.shard_names, self.shards)}
+
+    def start_backup_schedule(self, directory: str, interval: float = 3600.0, keep: int = 24,
+                              pages_per_step: int = BACKUP_PAGES_PER_STEP) -> Dict[str, BackupScheduler]:
+        """Harmonogram kopii każdego shardu w directory/<nazwa shardu>"""
+        return {name: shard.start_backup_schedule(f"{directory}/{name}", interval, keep, pages_per_step)
+                for name, shard in zip(self.shard_names, self.shards)}
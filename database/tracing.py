@@ -0,0 +1,154 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+# Ścieżka pliku JSONL ze spanami - ustawienie zmiennej włącza śledzenie
+TRACE_FILE_ENV = 'FIZJO_TRACE_FILE'
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('fizjo_current_span', default=None)
+
+
+class _NoopSpan:
+    """Span używany, gdy śledzenie jest wyłączone"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Odcinek czasu z nazwą, atrybutami i rodzicem (bieżący span w kontekście)"""
+
+    def __init__(self, tracer: 'Tracer', name: str, trace_id: Optional[str], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        if self.trace_id is None:
+            self.trace_id = self.parent.trace_id if self.parent else uuid.uuid4().hex
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration_ms = (time.perf_counter() - self._started) * 1000
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            # Także wyjątki sterujące (np. st.rerun), nie tylko błędy
+            self.attributes['exception'] = exc_type.__name__
+        self.tracer.export({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': round(duration_ms, 3),
+            'thread': threading.current_thread().name,
+            'attributes': self.attributes
+        }, root=self.parent is None)
+        return False
+
+
+class Tracer:
+    """Zapisuje zakończone spany do pliku JSONL (jeden span na linię)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = None
+        self._file = None
+        self._lock = threading.Lock()
+        if path:
+            self.enable(path)
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def enable(self, path: str):
+        """Włącza śledzenie z zapisem do podanego pliku (dopisywanie)"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self.path = path
+            self._file = open(path, 'a', encoding='utf-8')
+
+    def disable(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = None
+            self.path = None
+
+    def span(self, name: str, trace_id: Optional[str] = None, **attributes):
+        """Zwraca span do użycia w `with`; przy wyłączonym śledzeniu - pusty span bez kosztu"""
+        if self._file is None:
+            return _NOOP_SPAN
+        return Span(self, name, trace_id, attributes)
+
+    def export(self, record: Dict[str, Any], root: bool = False):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + '\n')
+            # Zapis na dysk po zakończeniu całego drzewa spanów
+            if root:
+                self._file.flush()
+
+
+tracer = Tracer(os.environ.get(TRACE_FILE_ENV))
+
+
+def span(name: str, trace_id: Optional[str] = None, **attributes):
+    """Otwiera span w globalnym tracerze (zagnieżdżony w bieżącym spanie)"""
+    return tracer.span(name, trace_id, **attributes)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Dekorator otwierający span na czas wywołania funkcji"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_database(db, prefix: str = 'db'):
+    """Opakowuje publiczne metody obiektu bazy w spany `db.<metoda>` (gdy śledzenie jest włączone)"""
+    if not tracer.enabled:
+        return db
+    for attr in dir(type(db)):
+        if attr.startswith('_'):
+            continue
+        method = getattr(db, attr)
+        if callable(method):
+            setattr(db, attr, traced(f"{prefix}.{attr}")(method))
+    return db
@@ -0,0 +1,78 @@
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from database.crypto import BLIND_INDEX_KEY_ENV, FIELD_KEY_ENV, field_cipher, generate_key  # noqa: E402
+from database.db_manager import DatabaseManager  # noqa: E402
+from database.models import DiagnosisSession, Patient  # noqa: E402
+from database.pesel import PESEL_WEIGHTS  # noqa: E402
+
+# Przesunięcie miesiąca w PESEL dla stulecia urodzenia
+CENTURY_MONTH_OFFSET = {1800: 80, 1900: 0, 2000: 20, 2100: 40, 2200: 60}
+
+
+def with_checksum(digits: str) -> str:
+    """Dziesięć cyfr PESEL uzupełnione cyfrą kontrolną"""
+    return digits + str((10 - sum(int(digit) * weight for digit, weight in zip(digits, PESEL_WEIGHTS)) % 10) % 10)
+
+
+def make_pesel(birth_date: date, serial: int = 123, male: bool = True) -> str:
+    """Poprawny PESEL dla daty urodzenia i płci (serial - trzy cyfry porządkowe)"""
+    month = birth_date.month + CENTURY_MONTH_OFFSET[birth_date.year // 100 * 100]
+    gender_digit = 1 if male else 2
+    return with_checksum(f"{birth_date.year % 100:02d}{month:02d}{birth_date.day:02d}{serial:03d}{gender_digit}")
+
+
+@pytest.fixture(autouse=True)
+def plain_storage(monkeypatch):
+    """Domyślnie bez szyfrowania - niezależnie od kluczy w środowisku uruchomienia testów"""
+    monkeypatch.delenv(FIELD_KEY_ENV, raising=False)
+    monkeypatch.delenv(BLIND_INDEX_KEY_ENV, raising=False)
+    field_cipher.cache_clear()
+    yield
+    field_cipher.cache_clear()
+
+
+@pytest.fixture
+def encryption(monkeypatch):
+    """Włącza szyfrowanie danych pacjentów (nowe klucze) i zwraca FieldCipher procesu"""
+    pytest.importorskip('cryptography')
+    monkeypatch.setenv(FIELD_KEY_ENV, generate_key())
+    monkeypatch.setenv(BLIND_INDEX_KEY_ENV, generate_key())
+    field_cipher.cache_clear()
+    return field_cipher()
+
+
+@pytest.fixture
+def db(tmp_path):
+    with DatabaseManager(str(tmp_path / 'fizjo_test.db')) as manager:
+        yield manager
+
+
+@pytest.fixture
+def patient_factory():
+    def create(first_name: str = 'Jan', last_name: str = 'Kowalski', birth_date: date = date(1980, 3, 15),
+               serial: int = 123, male: bool = True, **fields) -> Patient:
+        fields.setdefault('pesel', make_pesel(birth_date, serial, male))
+        return Patient(first_name=first_name, last_name=last_name, birth_date=birth_date,
+                       gender='M' if male else 'K', consent_treatment=True, consent_data=True, **fields)
+    return create
+
+
+@pytest.fixture
+def session_factory(db):
+    def create(patient_id: int, notes: dict = None, module_type: str = 'knee',
+               session_date: datetime = datetime(2024, 1, 15, 10, 0), **fields) -> int:
+        """Zapisuje sesję tak jak aplikacja (add_diagnosis_session + update z notatkami); zwraca ID"""
+        session = DiagnosisSession(patient_id=patient_id, module_type=module_type, session_date=session_date,
+                                   therapist_name='mgr Anna Fizjo', **fields)
+        session.id = db.add_diagnosis_session(session)
+        session.set_session_notes_dict(notes or {})
+        db.update_diagnosis_session(session)
+        return session.id
+    return create
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+
+from database.async_db import AsyncDatabaseManager, PooledDatabaseManager
+from database.models import DiagnosisSession
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def add_session(db, patient_id):
+    """Zapisuje sesję z planem leczenia tak jak aplikacja (add + update)"""
+    session = DiagnosisSession(patient_id=patient_id, module_type='knee', session_date=datetime(2024, 1, 15, 10, 0),
+                               therapist_name='mgr Anna Fizjo', treatment_plan='Ćwiczenia')
+    session.id = await db.add_diagnosis_session(session)
+    await db.update_diagnosis_session(session)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'fizjo_async.db')
+
+
+def test_reads_run_in_pool_and_writes_in_writer(db_path, patient_factory):
+    async def scenario():
+        async with AsyncDatabaseManager(db_path, readers=2) as db:
+            patient_id = await db.add_patient(patient_factory())
+            card = await db.get_patient_card(patient_id)
+            return patient_id, card, db.is_write('add_patient'), db.is_write('get_patient')
+
+    patient_id, card, add_is_write, get_is_write = run(scenario())
+    assert card['patient'].id == patient_id
+    assert (add_is_write, get_is_write) == (True, False)
+
+
+def test_backpressure_limits_pending_calls(db_path, patient_factory):
+    async def scenario():
+        async with AsyncDatabaseManager(db_path, readers=2, max_pending=2) as db:
+            await db.add_patient(patient_factory())
+            peak = 0
+
+            async def read():
+                nonlocal peak
+                peak = max(peak, db.pending)
+                await db.get_patients_page(0, 10)
+                peak = max(peak, db.pending)
+
+            await asyncio.gather(*(read() for _ in range(10)))
+            return peak, db.pending
+
+    peak, pending = run(scenario())
+    assert peak <= 2 and pending == 0
+
+
+def test_excluded_and_private_methods_are_not_exposed(db_path):
+    async def scenario():
+        async with AsyncDatabaseManager(db_path) as db:
+            for name in ('start_backup_schedule', '_connect'):
+                with pytest.raises(AttributeError):
+                    getattr(db, name)
+
+    run(scenario())
+
+
+def test_closed_manager_rejects_calls(db_path):
+    async def scenario():
+        db = AsyncDatabaseManager(db_path)
+        await db.close()
+        with pytest.raises(RuntimeError):
+            await db.count_patients()
+
+    run(scenario())
+
+
+def test_history_details_load_in_reader_pool(db_path, patient_factory):
+    async def scenario():
+        async with AsyncDatabaseManager(db_path) as db:
+            patient_id = await db.add_patient(patient_factory())
+            await add_session(db, patient_id)
+            loop_thread = threading.get_ident()
+            details_threads = []
+            get_session_details = db.db.get_session_details
+
+            def recording(session_id):
+                details_threads.append(threading.get_ident())
+                return get_session_details(session_id)
+
+            db.db.get_session_details = recording
+            history = await db.get_patient_history_summary(patient_id)
+            await db.load_session_details(history)
+            assert history[0].details_loaded and history[0].treatment_plan == 'Ćwiczenia'
+            return loop_thread, details_threads
+
+    loop_thread, details_threads = run(scenario())
+    assert len(details_threads) == 1 and loop_thread not in details_threads
+
+
+def test_lazy_field_access_on_event_loop_warns(db_path, patient_factory):
+    async def scenario():
+        async with AsyncDatabaseManager(db_path) as db:
+            patient_id = await db.add_patient(patient_factory())
+            await add_session(db, patient_id)
+            history = await db.get_patient_history_summary(patient_id)
+            with pytest.warns(RuntimeWarning, match='load_session_details'):
+                assert history[0].treatment_plan == 'Ćwiczenia'
+
+    run(scenario())
+
+
+def test_analytics_keep_pooled_connection_open(db_path):
+    db = PooledDatabaseManager(db_path)
+    try:
+        for _ in range(3):
+            db.get_analytics_data()
+        conn = db.current_connection()
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+        assert db._connections == [conn]
+    finally:
+        db.close_connections()
+
+
+def test_closed_connection_is_removed_from_pool(db_path):
+    db = PooledDatabaseManager(db_path)
+    try:
+        closed = db._connect()
+        closed.close()
+        conn = db._connect()
+        assert conn is not closed and db._connections == [conn]
+    finally:
+        db.close_connections()
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from database.backup import online_backup
+
+
+def count(path, table='patients'):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def filled(db, patient_factory):
+    for serial in range(20):
+        db.add_patient(patient_factory(last_name=f"Nazwisko{serial}", serial=serial, notes='x' * 2000))
+    return db
+
+
+def test_backup_in_steps_is_complete(tmp_path, filled):
+    progress = []
+    stats = filled.backup_to(str(tmp_path / 'kopie' / 'kopia.db'), pages_per_step=2, pause=0,
+                             progress=lambda done, total: progress.append((done, total)))
+
+    assert stats['steps'] > 1 and not stats['single_step']
+    assert progress[-1][0] == progress[-1][1] == stats['pages']
+    assert count(stats['path']) == 20
+    assert not (tmp_path / 'kopie' / 'kopia.db.tmp').exists()
+
+
+def test_writes_during_backup_fall_back_to_single_step(tmp_path, filled):
+    writer = sqlite3.connect(filled.db_path)
+
+    def write(done, total):
+        with writer:
+            writer.execute("INSERT INTO system_logs (log_level, message) VALUES ('INFO', 'zapis w trakcie kopii')")
+
+    try:
+        stats = online_backup(filled._connect, tmp_path / 'kopia.db', pages_per_step=1, pause=0,
+                              progress=write, max_restarts=1)
+    finally:
+        writer.close()
+
+    assert stats['single_step'] and stats['restarts'] == 2
+    assert count(tmp_path / 'kopia.db', 'system_logs') == count(filled.db_path, 'system_logs')
+
+
+def test_scheduler_keeps_newest_backups(tmp_path, filled):
+    directory = tmp_path / 'kopie'
+    directory.mkdir()
+    for stamp in ('20240101_000000', '20240102_000000'):
+        (directory / f"{filled.db_path.stem}_{stamp}.db").write_bytes(b'')
+
+    scheduler = filled.start_backup_schedule(str(directory), interval=3600, keep=2)
+    scheduler.stop(timeout=10)
+
+    backups = scheduler.backups()
+    assert scheduler.last_error is None
+    assert [path.name for path in backups][0] == f"{filled.db_path.stem}_20240102_000000.db"
+    assert len(backups) == 2 and count(backups[-1]) == 20
+
+
+def test_analytics_snapshot_is_refreshed_explicitly(filled, patient_factory):
+    assert filled.get_analytics_data(use_snapshot=True)['total_patients'] == 20
+    filled.add_patient(patient_factory(serial=500))
+
+    assert filled.get_analytics_data(use_snapshot=True)['total_patients'] == 20
+    assert filled.get_analytics_data()['total_patients'] == 21
+    filled.refresh_analytics_snapshot()
+    assert filled.get_analytics_data(use_snapshot=True)['total_patients'] == 21
+
+
+def test_stale_snapshot_is_served_and_refreshed_in_background(filled, patient_factory):
+    snapshot = filled.analytics_snapshot
+    filled.get_diagnosis_counts(use_snapshot=True)
+    filled.add_patient(patient_factory(serial=500))
+    old = time.time() - snapshot.max_age - 1
+    os.utime(snapshot.path, (old, old))
+
+    assert filled.get_analytics_data(use_snapshot=True)['total_patients'] == 20
+    snapshot._thread.join(timeout=10)
+    assert snapshot.last_error is None
+    assert filled.get_analytics_data(use_snapshot=True)['total_patients'] == 21
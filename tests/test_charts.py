@@ -0,0 +1,66 @@
+import pytest
+
+from database.cache import LRUCache, stable_hash
+from database.charts import analytics_charts, cached_figure, differential_diagnosis_chart, figure_cache, figure_from_json
+
+pytest.importorskip('plotly')
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    figure_cache.clear()
+    yield
+    figure_cache.clear()
+
+
+def test_stable_hash_ignores_key_order():
+    assert stable_hash({'a': 1, 'b': [1, 2]}) == stable_hash({'b': [1, 2], 'a': 1})
+    assert stable_hash({'a': 1}) != stable_hash({'a': 2})
+
+
+def test_same_data_is_built_once():
+    builds = []
+
+    def builder(data):
+        import plotly.graph_objects as go
+        builds.append(data)
+        return go.Figure(data=[go.Bar(x=data['x'], y=data['y'])])
+
+    first = cached_figure('test', {'x': ['a'], 'y': [1]}, builder)
+    second = cached_figure('test', {'y': [1], 'x': ['a']}, builder)
+    cached_figure('test', {'x': ['a'], 'y': [2]}, builder)
+    cached_figure('other', {'x': ['a'], 'y': [1]}, builder)
+
+    assert first is second
+    assert len(builds) == 3
+    assert len(figure_cache) == 3
+
+
+def test_cache_holds_json_sized_by_length():
+    chart_json = differential_diagnosis_chart(['Zespół rzepkowo-udowy', 'Uszkodzenie ACL'], [70.0, 30.0])
+
+    assert isinstance(chart_json, str)
+    assert figure_cache.current_bytes == len(chart_json)
+    figure = figure_from_json(chart_json)
+    assert list(figure.data[0].y) == [70.0, 30.0]
+    assert figure.layout.title.text == "Prawdopodobieństwo diagnoz"
+
+
+def test_analytics_charts_skip_empty_series():
+    charts = analytics_charts({
+        'module_usage': [{'modul': 'knee', 'liczba': 3}, {'modul': 'ankle', 'liczba': 1}],
+        'top_diagnoses': [],
+    })
+
+    assert list(charts) == ['module_usage']
+    assert list(figure_from_json(charts['module_usage']).data[0].values) == [3, 1]
+
+
+def test_lru_cache_evicts_by_bytes():
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.put('a', 'x' * 6)
+    cache.put('b', 'y' * 6)
+    cache.put('c', 'z' * 20)
+
+    assert 'a' not in cache and 'b' in cache and 'c' not in cache
+    assert cache.stats()['evictions'] == 1
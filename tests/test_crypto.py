@@ -0,0 +1,122 @@
+import os
+import pickle
+import sqlite3
+
+import pytest
+
+from database.crypto import BLIND_INDEX_KEY_ENV, ENCRYPTED_PREFIX, FIELD_KEY_ENV, FieldCipher, generate_key
+from database.db_manager import DatabaseManager
+
+pytest.importorskip('cryptography')
+
+
+@pytest.fixture
+def cipher():
+    return FieldCipher(os.urandom(32), os.urandom(32))
+
+
+def raw_patient(db: DatabaseManager, patient_id: int) -> sqlite3.Row:
+    conn = sqlite3.connect(db.db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute("SELECT * FROM patients WHERE id = ?", (patient_id,)).fetchone()
+    finally:
+        conn.close()
+
+
+def test_round_trip(cipher):
+    encrypted = cipher.encrypt('44051401359', 'pesel')
+
+    assert encrypted.startswith(ENCRYPTED_PREFIX)
+    assert '44051401359' not in encrypted
+    assert cipher.decrypt(encrypted, 'pesel') == '44051401359'
+    # Losowy nonce - ta sama wartość daje inny szyfrogram
+    assert cipher.encrypt('44051401359', 'pesel') != encrypted
+
+
+def test_many_values_keep_none_and_plaintext(cipher):
+    encrypted = cipher.encrypt_many(['+48 600 100 200', None, 'enc1:juz-zaszyfrowane'], 'phone')
+
+    assert encrypted[1] is None
+    assert encrypted[2] == 'enc1:juz-zaszyfrowane'
+    assert cipher.decrypt_many([encrypted[0], None, 'jawny'], 'phone') == ['+48 600 100 200', None, 'jawny']
+
+
+def test_ciphertext_is_bound_to_field(cipher):
+    from cryptography.exceptions import InvalidTag
+
+    with pytest.raises(InvalidTag):
+        cipher.decrypt(cipher.encrypt('jan@example.com', 'email'), 'phone')
+
+
+def test_blind_index_is_deterministic_and_keyed(cipher):
+    other = FieldCipher(os.urandom(32), os.urandom(32))
+
+    assert cipher.blind_index('44051401359') == cipher.blind_index(' 44051401359 ')
+    assert cipher.blind_index('44051401359') != other.blind_index('44051401359')
+    assert cipher.blind_index('44051401359', 'pesel') != cipher.blind_index('44051401359', 'patient_blocks')
+    assert cipher.blind_index(None) is None
+
+
+def test_cipher_survives_pickle(cipher):
+    copy = pickle.loads(pickle.dumps(cipher))
+
+    assert copy.decrypt(cipher.encrypt('Kraków', 'emergency_contact'), 'emergency_contact') == 'Kraków'
+    assert copy.blind_index('44051401359') == cipher.blind_index('44051401359')
+
+
+def test_keys_from_environment(monkeypatch):
+    assert FieldCipher.from_env() is None
+
+    monkeypatch.setenv(FIELD_KEY_ENV, generate_key())
+    with pytest.raises(ValueError, match=BLIND_INDEX_KEY_ENV):
+        FieldCipher.from_env()
+
+    monkeypatch.setenv(BLIND_INDEX_KEY_ENV, 'za-krótki')
+    with pytest.raises(ValueError, match='base64'):
+        FieldCipher.from_env()
+
+    monkeypatch.setenv(BLIND_INDEX_KEY_ENV, generate_key())
+    assert isinstance(FieldCipher.from_env(), FieldCipher)
+
+
+def test_patient_fields_are_stored_encrypted(encryption, db, patient_factory):
+    patient = patient_factory(phone='+48 600 100 200', email='jan@example.com')
+    patient_id = db.add_patient(patient)
+
+    row = raw_patient(db, patient_id)
+    assert row['pesel'].startswith(ENCRYPTED_PREFIX)
+    assert row['phone'].startswith(ENCRYPTED_PREFIX)
+    assert row['pesel_hash'] == encryption.blind_index(patient.pesel)
+
+    stored = db.get_patient(patient_id)
+    assert (stored.pesel, stored.phone, stored.email) == (patient.pesel, '+48 600 100 200', 'jan@example.com')
+
+
+def test_lookup_by_blind_index(encryption, db, patient_factory):
+    patient = patient_factory()
+    db.add_patient(patient)
+
+    assert db.patient_exists(patient.pesel)
+    assert not db.patient_exists(patient_factory(serial=999).pesel)
+    assert [p.pesel for p in db.search_patients(patient.pesel)] == [patient.pesel]
+    assert db.count_patients(patient.pesel) == 1
+
+
+def test_search_does_not_match_ciphertext(encryption, db, patient_factory):
+    patient_id = db.add_patient(patient_factory())
+    ciphertext = raw_patient(db, patient_id)['pesel']
+    fragment = ciphertext[len(ENCRYPTED_PREFIX) + 4:len(ENCRYPTED_PREFIX) + 10]
+
+    assert db.search_patients(fragment) == []
+    assert db.count_patients(fragment) == 0
+    assert db.get_patients_page(search_term=fragment) == []
+    assert db.count_patients('Kowal') == 1
+
+
+def test_partial_pesel_search_without_encryption(db, patient_factory):
+    patient = patient_factory()
+    db.add_patient(patient)
+
+    assert [p.pesel for p in db.search_patients(patient.pesel[:6])] == [patient.pesel]
+    assert db.count_patients(patient.pesel[:6]) == 1
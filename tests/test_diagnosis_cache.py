@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+from database.diagnosis_cache import (
+    DiagnosisCache, canonicalize_findings, diagnosis_cache, findings_digest, memoized_diagnosis,
+)
+from database.models import Diagnosis
+
+
+class FakeModule:
+    SCORING_RULES_VERSION = '1.0'
+
+    def __init__(self):
+        self.calls = 0
+
+    @memoized_diagnosis
+    def generate_diagnosis(self, findings):
+        self.calls += 1
+        return Diagnosis(name='Zespół rzepkowo-udowy', confidence=findings['score'], red_flags=['obrzęk'])
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    diagnosis_cache.clear()
+    yield
+    diagnosis_cache.clear()
+
+
+def test_canonical_findings_ignore_key_order_and_set_order():
+    assert canonicalize_findings({'b': {2.0, 1.0}, 'a': 3.0}) == {'a': 3, 'b': [1, 2]}
+    assert findings_digest({'a': 1, 'b': [1, 2]}, 'Knee', '1.0') == findings_digest({'b': [1, 2], 'a': 1.0}, 'Knee', '1.0')
+    assert findings_digest({'b': [1, 2]}, 'Knee', '1.0') != findings_digest({'b': [2, 1]}, 'Knee', '1.0')
+
+
+def test_digest_depends_on_module_and_rules_version():
+    findings = {'pain': 5}
+    digests = {findings_digest(findings, module, version)
+               for module, version in [('Knee', '1.0'), ('Knee', '1.1'), ('Ankle', '1.0')]}
+    assert len(digests) == 3
+
+
+def test_memoized_diagnosis_computes_once_and_returns_copies():
+    module = FakeModule()
+    first = module.generate_diagnosis({'score': 70.0, 'extra': {'b': 1, 'a': 2}})
+    first.red_flags.append('zmieniona')
+    second = module.generate_diagnosis({'extra': {'a': 2, 'b': 1}, 'score': 70})
+
+    assert module.calls == 1
+    assert second.red_flags == ['obrzęk']
+    assert second is not first
+
+
+def test_new_rules_version_misses_cache(monkeypatch):
+    module = FakeModule()
+    module.generate_diagnosis({'score': 50})
+    monkeypatch.setattr(FakeModule, 'SCORING_RULES_VERSION', '1.1')
+    module.generate_diagnosis({'score': 50})
+    monkeypatch.setattr(FakeModule, 'SCORING_RULES_VERSION', None)
+    module.generate_diagnosis({'score': 50})
+    module.generate_diagnosis({'score': 50})
+
+    assert module.calls == 4
+
+
+def test_persistence_requires_migrated_table(tmp_path):
+    with pytest.raises(RuntimeError, match='migracje'):
+        DiagnosisCache(db_path=str(tmp_path / 'pusta.db'))
+
+
+def test_persisted_entries_survive_new_cache(db):
+    diagnosis = Diagnosis(name='Skręcenie stawu skokowego', confidence=80.0, treatment_options=['RICE'])
+    DiagnosisCache(db_path=str(db.db_path)).put('klucz', diagnosis, 'AnkleModule', '1.0')
+
+    restored = DiagnosisCache(db_path=str(db.db_path))
+    assert restored.get('klucz') == diagnosis
+    assert restored.purge_stale('AnkleModule', '1.1') == 1
+    conn = sqlite3.connect(db.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM diagnosis_cache").fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,111 @@
+import os
+from datetime import date
+
+import pytest
+
+from database.duplicates import (
+    DUPLICATE_MIN_SCORE, SCORE_WEIGHTS, block_keys, osa_distance, phonetic_key, score_pair,
+)
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Wiśniewski', 'Wisniewsky'),
+    ('Kowalczyk', 'Kovalczyk'),
+    ('Rzepka', 'Żepka'),
+    ('Szczęsny', 'szczesny'),
+])
+def test_phonetic_key_matches_spelling_variants(a, b):
+    assert phonetic_key(a) == phonetic_key(b)
+
+
+def test_phonetic_key_separates_different_names():
+    assert phonetic_key('Nowak') != phonetic_key('Kowalski')
+    assert phonetic_key('') == phonetic_key(None) == ''
+
+
+def test_osa_distance():
+    assert osa_distance('44051401359', '44051401359') == 0
+    assert osa_distance('44051401359', '44051401395') == 1   # zamiana sąsiednich cyfr
+    assert osa_distance('44051401359', '44051401358') == 1
+    assert osa_distance('', 'abc') == 3
+
+
+def test_block_keys_share_pesel_key_for_one_digit_typo():
+    keys = block_keys('Jan', 'Nowak', '44051401359', '1944-05-14')
+
+    assert f"n:{phonetic_key('Nowak')}:1944-05-14" in keys
+    assert set(keys) & set(block_keys('Jan', 'Nowak', '44051401358', '1944-05-14'))
+    assert {key for key in keys if key.startswith('p:')} & set(block_keys('Piotr', 'Zieliński', '44051401395', '1950-01-01'))
+    assert not set(keys) & set(block_keys('Piotr', 'Zieliński', '80031501234', '1980-03-15'))
+
+
+def test_block_keys_hash_pesel_fragments_with_cipher():
+    pytest.importorskip('cryptography')
+    from database.crypto import FieldCipher
+    cipher = FieldCipher(os.urandom(32), os.urandom(32))
+
+    keys = block_keys('Jan', 'Nowak', '44051401359', '1944-05-14', cipher)
+    pesel_keys = {key for key in keys if key.startswith('p:')}
+    plain_keys = {key for key in block_keys('Jan', 'Nowak', '44051401359', '1944-05-14') if key.startswith('p:')}
+
+    assert not pesel_keys & plain_keys
+    assert len(pesel_keys) == len(plain_keys)
+    assert pesel_keys & set(block_keys('Jan', 'Nowak', '44051401358', '1944-05-14', cipher))
+
+
+def test_score_weights_sum_to_one():
+    assert sum(SCORE_WEIGHTS.values()) == pytest.approx(1.0)
+
+
+def test_score_pair():
+    patient = (1, 'Jan', 'Wiśniewski', '44051401359', '1944-05-14')
+
+    assert score_pair(patient, (2, 'Jan', 'Wiśniewski', '44051401359', '1944-05-14')) == \
+        (1.0, ['pesel', 'last_name', 'first_name', 'birth_date'])
+
+    # Literówki w PESEL i nazwisku - nadal kandydat
+    score, reasons = score_pair(patient, (2, 'Jan', 'Wisniewsky', '44051401395', '1944-05-14'))
+    assert score >= DUPLICATE_MIN_SCORE
+    assert reasons == ['pesel', 'last_name', 'first_name', 'birth_date']
+
+    # Ten sam PESEL z literówką w imieniu - sam PESEL nie wystarcza
+    score, _ = score_pair(patient, (2, 'Ian', 'Zieliński', '44051401359', '1950-01-01'))
+    assert score < DUPLICATE_MIN_SCORE
+
+    # Inna osoba o tym samym nazwisku i dacie urodzenia
+    score, reasons = score_pair(patient, (2, 'Anna', 'Wiśniewska', '44051402345', '1944-05-14'))
+    assert score < DUPLICATE_MIN_SCORE
+    assert 'pesel' not in reasons
+
+
+def test_find_candidates_in_database(db, patient_factory):
+    original = patient_factory('Jan', 'Wiśniewski', date(1944, 5, 14))
+    original_id = db.add_patient(original)
+    db.add_patient(patient_factory('Anna', 'Nowak', date(1990, 1, 2), male=False))
+
+    typo = patient_factory('Jan', 'Wisniewsky', date(1944, 5, 14), pesel=original.pesel[:-2] + original.pesel[:-3:-1])
+    candidates = db.find_duplicate_candidates(typo)
+
+    assert [candidate.patient_id for candidate in candidates] == [original_id]
+
+
+def test_scan_duplicates(db, patient_factory):
+    first_id = db.add_patient(patient_factory('Jan', 'Kowalski', serial=123))
+    second_id = db.add_patient(patient_factory('Jan', 'Kovalski', serial=124))
+    db.add_patient(patient_factory('Ewa', 'Zielińska', date(1975, 8, 9), male=False))
+
+    pairs = db.scan_duplicates(workers=1)
+
+    assert [(pair['patient_id'], pair['duplicate_id']) for pair in pairs] == [(first_id, second_id)]
+
+
+def test_scan_duplicates_with_encryption(encryption, db, patient_factory):
+    original = patient_factory('Jan', 'Kowalski')
+    first_id = db.add_patient(original)
+    # Zamienione ostatnie cyfry PESEL - zgodność wymaga odszyfrowania numerów w skanie
+    second_id = db.add_patient(patient_factory('Jan', 'Kowalski', pesel=original.pesel[:-2] + original.pesel[:-3:-1]))
+
+    pairs = db.scan_duplicates(workers=1)
+
+    assert [(pair['patient_id'], pair['duplicate_id']) for pair in pairs] == [(first_id, second_id)]
+    assert pairs[0]['reasons'] == ['pesel', 'last_name', 'first_name', 'birth_date']
@@ -0,0 +1,91 @@
+import csv
+import gzip
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from database.export import ExportFilter
+from database import models
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8') as file:
+        return list(csv.DictReader(file))
+
+
+@pytest.fixture
+def patients(db, patient_factory):
+    return [db.add_patient(patient_factory(last_name=f"Nazwisko{serial}", serial=serial)) for serial in range(10)]
+
+
+def test_chunks_cover_all_rows_in_order(tmp_path, db, patients):
+    progress = []
+    stats = db.export_data('patients', str(tmp_path / 'pacjenci.csv'), chunk_size=3,
+                           progress=lambda rows, seconds: progress.append(rows))
+
+    assert [int(row['id']) for row in read_csv(tmp_path / 'pacjenci.csv')] == patients
+    assert stats['rows'] == 10 and progress == [3, 6, 9, 10]
+
+
+def test_writes_are_not_blocked_during_export(tmp_path, db, patients, patient_factory):
+    writer = sqlite3.connect(db.db_path, timeout=0)
+    added = []
+
+    def write(rows, seconds):
+        with writer:
+            writer.execute("INSERT INTO system_logs (log_level, message) VALUES ('INFO', 'zapis w trakcie eksportu')")
+        if not added:
+            added.append(db.add_patient(patient_factory(serial=500)))
+
+    try:
+        stats = db.export_data('patients', str(tmp_path / 'pacjenci.csv'), chunk_size=4, progress=write)
+    finally:
+        writer.close()
+
+    # Pacjent dodany w trakcie ma największe id - trafia do ostatniej partii
+    assert stats['rows'] == 11
+    assert int(read_csv(tmp_path / 'pacjenci.csv')[-1]['id']) == added[0]
+
+
+def test_session_filters_apply_to_related_tables(tmp_path, db, patients, session_factory):
+    knee = session_factory(patients[0], {'objawy': ['obrzęk']}, session_date=datetime(2024, 2, 1))
+    session_factory(patients[1], module_type='ankle', session_date=datetime(2024, 2, 1))
+    session_factory(patients[2], session_date=datetime(2023, 1, 1))
+    db.add_test_result(models.TestResult(session_id=knee, test_name='Lachman', test_result='pozytywny'))
+    filters = ExportFilter(date_from='2024-01-01', module_type='knee')
+
+    for table in ('patients', 'sessions', 'test_results'):
+        db.export_data(table, str(tmp_path / f"{table}.csv"), filters, chunk_size=1)
+
+    assert [int(row['id']) for row in read_csv(tmp_path / 'patients.csv')] == [patients[0]]
+    sessions = read_csv(tmp_path / 'sessions.csv')
+    assert [int(row['id']) for row in sessions] == [knee]
+    assert json.loads(sessions[0]['session_notes']) == {'objawy': ['obrzęk']}
+    assert [row['test_name'] for row in read_csv(tmp_path / 'test_results.csv')] == ['Lachman']
+
+
+def test_ndjson_gzip_output(tmp_path, db, patients, session_factory):
+    session_factory(patients[0], {'bol': 7})
+    db.export_data('sessions', str(tmp_path / 'sesje.ndjson.gz'))
+
+    with gzip.open(tmp_path / 'sesje.ndjson.gz', 'rt', encoding='utf-8') as file:
+        records = [json.loads(line) for line in file]
+    assert records[0]['session_notes'] == {'bol': 7} and records[0]['is_completed'] is False
+
+
+def test_encrypted_fields_are_exported_in_plain_text(tmp_path, encryption, db, patient_factory):
+    patient = patient_factory(phone='600100200')
+    db.add_patient(patient)
+    db.export_data('patients', str(tmp_path / 'pacjenci.csv'), chunk_size=1)
+
+    row = read_csv(tmp_path / 'pacjenci.csv')[0]
+    assert (row['pesel'], row['phone']) == (patient.pesel, '600100200')
+
+
+def test_unknown_format_and_table(tmp_path, db):
+    with pytest.raises(ValueError):
+        db.export_data('patients', str(tmp_path / 'pacjenci.xlsx'))
+    with pytest.raises(ValueError):
+        db.export_data('system_logs', str(tmp_path / 'logi.csv'))
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+
+from database.findings import ROOT_SECTION, FindingFilter, flatten_findings, findings_subquery
+
+KNEE_NOTES = {
+    'interview': {'mechanism': 'skręcenie', 'pain_level': 7, 'swelling': True, 'locations': ['przyśrodkowo', 'z tyłu']},
+    'physical_exam': {'test_results': {'Test Lachmana': 'Pozytywny', 'Test McMurraya': 'Negatywny'}},
+    'risk_scores': {'acl_tear': 72.5},
+    'notes_version': 2,
+}
+
+
+def test_flatten_findings_sections_and_types():
+    rows = set(flatten_findings(KNEE_NOTES))
+
+    assert ('interview', 'pain_level', 'int', None, 7.0) in rows
+    assert ('interview', 'swelling', 'bool', None, 1.0) in rows
+    assert ('physical_exam', 'test_results.Test Lachmana', 'text', 'Pozytywny', None) in rows
+    assert {row for row in rows if row[1] == 'locations'} == {
+        ('interview', 'locations', 'text', 'przyśrodkowo', None), ('interview', 'locations', 'text', 'z tyłu', None)}
+    assert (ROOT_SECTION, 'notes_version', 'int', None, 2.0) in rows
+
+
+def test_filter_validation():
+    with pytest.raises(ValueError):
+        FindingFilter('interview', 'pain_level', 'LIKE', 5).to_sql()
+    with pytest.raises(ValueError):
+        FindingFilter('interview', 'mechanism', 'in', []).to_sql()
+    with pytest.raises(ValueError):
+        findings_subquery([])
+
+
+def test_cohort_queries(db, patient_factory, session_factory):
+    first = db.add_patient(patient_factory('Jan', 'Kowalski', serial=1))
+    second = db.add_patient(patient_factory('Adam', 'Nowak', serial=2))
+    acl = session_factory(first, KNEE_NOTES, session_date=datetime(2024, 2, 1))
+    session_factory(second, {**KNEE_NOTES, 'interview': {'pain_level': 3, 'mechanism': 'upadek'}})
+    session_factory(second, {'interview': {'pain_level': 8}}, module_type='ankle')
+
+    severe = FindingFilter('interview', 'pain_level', '>=', 7)
+    lachman = FindingFilter('physical_exam', 'test_results.Test Lachmana', '=', 'Pozytywny')
+    assert [session.id for session in db.find_sessions_by_findings([severe, lachman])] == [acl]
+    assert [session.module_type for session in db.find_sessions_by_findings([severe])] == ['knee', 'ankle']
+    assert [patient.id for patient in db.find_patients_by_findings([lachman])] == [first, second]
+    assert [patient.id for patient in db.find_patients_by_findings([severe], module_type='ankle')] == [second]
+    mechanisms = FindingFilter('interview', 'mechanism', 'in', ['upadek', 'uderzenie'])
+    assert [patient.id for patient in db.find_patients_by_findings([mechanisms])] == [second]
+
+
+def test_updated_notes_replace_findings(db, patient_factory, session_factory):
+    patient_id = db.add_patient(patient_factory())
+    session_id = session_factory(patient_id, {'interview': {'pain_level': 9}})
+    session = db.get_patient_history(patient_id)[0]
+    session.set_session_notes_dict({'interview': {'pain_level': 2}})
+    db.update_diagnosis_session(session)
+
+    assert db.find_sessions_by_findings([FindingFilter('interview', 'pain_level', '>', 5)]) == []
+    assert [s.id for s in db.find_sessions_by_findings([FindingFilter('interview', 'pain_level', '=', 2)])] == [session_id]
+
+
+def test_rebuild_session_findings(db, patient_factory, session_factory):
+    patient_id = db.add_patient(patient_factory())
+    session_factory(patient_id, KNEE_NOTES)
+    with db._connect() as conn:
+        expected = conn.execute("SELECT COUNT(*) FROM session_findings").fetchone()[0]
+        conn.execute("DELETE FROM session_findings")
+        conn.commit()
+
+    assert db.rebuild_session_findings(batch_size=1) == 1
+    with db._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM session_findings").fetchone()[0] == expected == len(flatten_findings(KNEE_NOTES))
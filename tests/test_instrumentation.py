@@ -0,0 +1,62 @@
+import json
+
+from database.instrumentation import LatencyHistogram, instrument, query_name, uninstrument
+
+
+def test_query_name_normalizes_whitespace():
+    assert query_name("SELECT *\n    FROM patients\n  WHERE id = ?") == "SELECT * FROM patients WHERE id = ?"
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    histogram = LatencyHistogram(buckets=(1, 10, 100, float('inf')))
+    for elapsed_ms in (0.5, 0.7, 5, 50):
+        histogram.observe(elapsed_ms, rows=2)
+
+    summary = histogram.summary()
+    assert (summary['count'], summary['rows'], summary['max_ms']) == (4, 8, 50)
+    assert (summary['p50_ms'], summary['p95_ms']) == (1, 50)
+
+
+def test_methods_and_queries_are_measured(db, patient_factory):
+    instrumentation = instrument(db)
+    patient_id = db.add_patient(patient_factory())
+    db.get_patient(patient_id)
+    db.get_patients_page(0, 10)
+
+    report = instrumentation.report()
+    assert {'add_patient', 'get_patient', 'get_patients_page', 'log_action'} <= set(report['methods'])
+    assert report['queries']["SELECT * FROM patients WHERE id = ?"]['rows'] == 1
+    assert instrument(db) is instrumentation
+
+
+def test_streamed_executemany_counts_rows(db):
+    instrumentation = instrument(db)
+    with db._connect() as conn:
+        conn.executemany("INSERT INTO system_logs (log_level, message) VALUES (?, ?)",
+                         (('INFO', f"wpis {i}") for i in range(5)))
+
+    stats = instrumentation.report()['queries']["INSERT INTO system_logs (log_level, message) VALUES (?, ?)"]
+    assert (stats['count'], stats['rows']) == (1, 5)
+
+
+def test_slow_queries_are_logged_without_parameters(tmp_path, db, patient_factory):
+    log_path = tmp_path / 'wolne.jsonl'
+    instrumentation = instrument(db, slow_threshold_ms=0, slow_log_path=str(log_path))
+    patient = patient_factory()
+    db.add_patient(patient)
+    db.search_patients(patient.last_name)
+
+    entries = [json.loads(line) for line in log_path.read_text(encoding='utf-8').splitlines()]
+    search = next(entry for entry in entries if entry['method'] == 'search_patients')
+    assert search['plan'] and search['param_count'] > 0
+    assert patient.pesel not in log_path.read_text(encoding='utf-8')
+    assert len(instrumentation.slow_queries) == len(entries)
+
+
+def test_uninstrument_restores_methods(db):
+    instrument(db)
+    uninstrument(db)
+
+    assert db.instrumentation is None
+    assert not any(getattr(value, '_instrumented', False) for value in vars(db).values())
+    assert db.count_patients() == 0
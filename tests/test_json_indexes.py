@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from database.db_manager import SESSION_COLUMNS
+from database.json_indexes import JSON_INDEXES_BY_NAME, generated_columns_supported
+
+pytestmark = pytest.mark.skipif(not generated_columns_supported(), reason='SQLite bez kolumn generowanych')
+
+
+@pytest.fixture
+def sessions(db, patient_factory, session_factory):
+    patient_id = db.add_patient(patient_factory())
+    return [
+        session_factory(patient_id, {'interview': {'mechanism': 'skręcenie', 'pain_intensity': 8}},
+                        session_date=datetime(2024, 3, 1)),
+        # Moduły zapisują też wyniki płasko - obie ścieżki trafiają do tej samej kolumny
+        session_factory(patient_id, {'mechanism': 'skręcenie', 'pain_intensity': 4}, module_type='ankle',
+                        session_date=datetime(2024, 2, 1)),
+        session_factory(patient_id, {'interview': {'mechanism': 'upadek', 'pain_intensity': 9}},
+                        session_date=datetime(2023, 12, 1)),
+    ]
+
+
+def test_find_sessions_by_notes(db, sessions):
+    assert [s.id for s in db.find_sessions_by_notes([('pain_intensity', '>=', 8)])] == [sessions[0], sessions[2]]
+    assert [s.id for s in db.find_sessions_by_notes([('mechanism', '=', 'skręcenie')], module_type='ankle')] == [sessions[1]]
+    assert [s.id for s in db.find_sessions_by_notes([('mechanism', 'in', ['upadek'])], limit=1)] == [sessions[2]]
+
+    with pytest.raises(ValueError):
+        db.find_sessions_by_notes([('therapist', '=', 'x')])
+
+
+def test_value_counts(db, sessions):
+    assert db.get_notes_value_counts('mechanism') == {'skręcenie': 2, 'upadek': 1}
+    assert db.get_notes_value_counts('mechanism', since='2024-01-01') == {'skręcenie': 2}
+
+
+def test_invalid_notes_give_null_instead_of_error(db, sessions):
+    with db._connect() as conn:
+        conn.execute("UPDATE diagnosis_sessions SET session_notes = ? WHERE id = ?", ('{uszkodzone', sessions[0]))
+        conn.commit()
+
+    assert [s.id for s in db.find_sessions_by_notes([('pain_intensity', '>=', 8)])] == [sessions[2]]
+
+
+def test_query_uses_partial_index(db, sessions):
+    json_index = JSON_INDEXES_BY_NAME['pain_intensity']
+    with db._connect() as conn:
+        plan = [row[-1] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT {SESSION_COLUMNS} FROM diagnosis_sessions "
+            f"WHERE {json_index.column} >= ? ORDER BY +session_date DESC", (8,))]
+
+    assert any(json_index.index_name in step for step in plan)
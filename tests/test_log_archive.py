@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+from database.log_archive import LogRetention
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+ENTRIES = [
+    ('2024-01-10 08:00:00', 'INFO'), ('2024-01-20 09:00:00', 'ERROR'),
+    ('2024-02-05 10:00:00', 'INFO'), ('2024-06-01 11:00:00', 'WARNING'), ('2024-06-14 12:00:00', 'INFO'),
+]
+
+
+@pytest.fixture
+def logs(db):
+    db.log_archive.retention = LogRetention(keep_days=30, batch_size=1, pause_seconds=0)
+    with db._connect() as conn:
+        conn.executemany("INSERT INTO system_logs (log_level, message, created_at) VALUES (?, ?, ?)",
+                         [(level, f"wpis {created_at}", created_at) for created_at, level in ENTRIES])
+        conn.commit()
+    return db
+
+
+def test_old_entries_move_to_monthly_files(logs):
+    stats = logs.log_archive.archive(now=NOW)
+
+    assert (stats['archived'], stats['segments']) == (3, ['2024-01', '2024-02'])
+    assert stats['batches'] >= 3
+    assert [row['created_at'] for row in logs.get_logs()] == ['2024-06-14 12:00:00', '2024-06-01 11:00:00']
+    assert [(archive['month'], archive['rows']) for archive in logs.get_log_archives()] == [('2024-01', 2), ('2024-02', 1)]
+    assert logs.log_archive.archive(now=NOW)['archived'] == 0
+
+
+def test_get_logs_continues_into_archive(logs):
+    logs.log_archive.archive(now=NOW)
+
+    combined = logs.get_logs(limit=4, include_archive=True)
+    assert [row['created_at'] for row in combined] == [created_at for created_at, _ in reversed(ENTRIES)][:4]
+    assert combined[2]['archive'] == '2024-02'
+    errors = logs.get_logs(level='ERROR', include_archive=True)
+    assert [row['message'] for row in errors] == ['wpis 2024-01-20 09:00:00']
+    assert logs.get_logs(since='2024-02-01', until='2024-06-01', include_archive=True)[0]['archive'] == '2024-02'
+
+
+def test_expired_archive_files_are_removed(logs):
+    logs.log_archive.retention.archive_months = 4
+    stats = logs.log_archive.archive(now=NOW)
+
+    assert stats['removed_segments'] == ['2024-01']
+    assert [archive['month'] for archive in logs.get_log_archives()] == ['2024-02']
+
+
+def test_retention_from_env(monkeypatch):
+    monkeypatch.setenv('FIZJO_LOG_RETENTION_DAYS', '7')
+    monkeypatch.setenv('FIZJO_LOG_ARCHIVE_MONTHS', '12')
+
+    retention = LogRetention.from_env()
+    assert (retention.keep_days, retention.archive_months) == (7, 12)
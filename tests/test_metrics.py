@@ -0,0 +1,83 @@
+import socket
+import urllib.request
+
+import pytest
+
+from database import metrics
+from database.cache import LRUCache
+from database.metrics import MetricsRegistry
+
+
+def test_render_escapes_help_and_label_values():
+    registry = MetricsRegistry()
+    registry.counter('test_total', 'Opis "w cudzysłowie"\\ i\nnowa linia', ['screen']).labels('a"b\\c').inc(2)
+
+    assert registry.render().splitlines() == [
+        '# HELP test_total Opis "w cudzysłowie"\\\\ i\\nnowa linia',
+        '# TYPE test_total counter',
+        'test_total{screen="a\\"b\\\\c"} 2',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('czas_seconds', 'Czas', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'czas_seconds_bucket{le="0.1"} 1' in lines
+    assert 'czas_seconds_bucket{le="1"} 2' in lines
+    assert 'czas_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'czas_seconds_count 3' in lines
+
+
+def test_register_conflict():
+    registry = MetricsRegistry()
+    assert registry.gauge('g', 'Opis') is registry.gauge('g', 'Opis')
+    with pytest.raises(ValueError):
+        registry.counter('g', 'Opis')
+
+
+def test_cache_hits_and_misses_are_counters(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, 'cache_hits', registry.counter('hits_total', 'Trafienia', ['cache']))
+    monkeypatch.setattr(metrics, 'cache_misses', registry.counter('misses_total', 'Chybienia', ['cache']))
+    monkeypatch.setattr(metrics, 'cache_entries', registry.gauge('entries', 'Wpisy', ['cache']))
+    cache = LRUCache(max_entries=4)
+    metrics.track_cache('test', cache)
+
+    cache.get_or_create('a', lambda: 1)
+    cache.get_or_create('a', lambda: 1)
+    cache.get('b')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE hits_total counter' in lines
+    assert 'hits_total{cache="test"} 1' in lines
+    assert 'misses_total{cache="test"} 2' in lines
+    assert 'entries{cache="test"} 1' in lines
+
+
+def test_http_endpoint_serves_metrics():
+    registry = MetricsRegistry()
+    registry.gauge('g', 'Opis').set(3)
+    server = registry.start_http_server(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            assert response.headers['Content-Type'] == metrics.CONTENT_TYPE
+            assert 'g 3' in response.read().decode('utf-8').splitlines()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_exporter_warns_when_port_is_taken(monkeypatch):
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        monkeypatch.setenv(metrics.METRICS_PORT_ENV, str(taken.getsockname()[1]))
+        monkeypatch.delenv(metrics.METRICS_FILE_ENV, raising=False)
+        monkeypatch.setattr(metrics, '_exporter_started', False)
+
+        with pytest.warns(RuntimeWarning, match='porcie'):
+            metrics.start_exporter_from_env()
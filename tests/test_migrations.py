@@ -0,0 +1,139 @@
+import sqlite3
+import warnings
+
+import pytest
+
+from database.db_manager import DatabaseManager
+from database.migrations import MIGRATIONS, MigrationRunner
+
+
+def schema(db_path) -> list:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+    finally:
+        conn.close()
+
+
+def test_new_database_is_fully_migrated(db):
+    status = db.get_schema_status()
+
+    assert status['version'] == status['latest'] == MIGRATIONS[-1].version
+    assert status['pending'] == []
+    assert db.migrations.pending_backfills() == []
+
+
+def test_upgrade_is_idempotent(db):
+    before = schema(db.db_path)
+
+    assert db.migrations.upgrade() == []
+    assert db.migrations.run_backfills() == []
+    assert DatabaseManager(str(db.db_path)).get_schema_status()['version'] == MIGRATIONS[-1].version
+    assert schema(db.db_path) == before
+
+
+def test_migration_steps_can_be_repeated(db):
+    """Przerwana migracja jest powtarzana od pierwszego kroku - kroki muszą być idempotentne"""
+    before = schema(db.db_path)
+    conn = sqlite3.connect(db.db_path)
+    try:
+        cursor = conn.cursor()
+        for migration in MIGRATIONS:
+            for step in migration.steps:
+                step(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert schema(db.db_path) == before
+
+
+def old_database(db_path, patient_factory, patients: int = 3) -> MigrationRunner:
+    """Baza w wersji 8 (sprzed indeksu duplikatów) z pacjentami zapisanymi bez kluczy grup"""
+    runner = MigrationRunner(lambda: sqlite3.connect(db_path), pause_seconds=0)
+    runner.upgrade(target=8)
+    runner.run_backfills()
+
+    conn = sqlite3.connect(db_path)
+    with conn:
+        for serial in range(patients):
+            patient = patient_factory(serial=serial)
+            conn.execute("""
+                INSERT INTO patients (first_name, last_name, pesel, birth_date, gender, consent_treatment, consent_data)
+                VALUES (?, ?, ?, ?, ?, 1, 1)
+            """, (patient.first_name, patient.last_name, patient.pesel, str(patient.birth_date), patient.gender))
+    conn.close()
+    return runner
+
+
+def test_backfill_resumes_and_does_not_repeat_rows(tmp_path, patient_factory):
+    db_path = tmp_path / 'stary.db'
+    runner = old_database(db_path, patient_factory)
+
+    runner.upgrade()
+    assert [state['version'] for state in runner.pending_backfills()] == [9, 10]
+    # Limit czasu wyczerpany przed pierwszą partią - uzupełnianie zostaje na później
+    assert [(result['version'], result['completed']) for result in runner.run_backfills(max_seconds=0)] == [(9, False)]
+    resumed = runner.run_backfills()
+    assert [(result['version'], result['rows'], result['completed']) for result in resumed] == [(9, 3, True), (10, 3, True)]
+
+    conn = sqlite3.connect(db_path)
+    keys = conn.execute("SELECT COUNT(*) FROM patient_blocks").fetchone()[0]
+    conn.close()
+    assert keys > 0
+    assert runner.run_backfills() == []
+    assert runner.upgrade() == []
+
+
+def test_existing_database_defers_index_builds(tmp_path):
+    db_path = tmp_path / 'stary.db'
+    MigrationRunner(lambda: sqlite3.connect(db_path)).upgrade(target=1)
+
+    with pytest.warns(RuntimeWarning):
+        db = DatabaseManager(str(db_path))
+    deferred = [migration.version for migration in MIGRATIONS if migration.deferred]
+    assert db.get_schema_status()['pending'] == deferred
+
+    db.migrate()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        DatabaseManager(str(db_path))
+    assert db.get_schema_status()['pending'] == []
+
+
+def test_current_version_waits_for_backfills(tmp_path, patient_factory):
+    runner = old_database(tmp_path / 'stary.db', patient_factory)
+    runner.upgrade()
+
+    assert runner.current_version() == runner.status()['version'] == 8
+    runner.run_backfills()
+    assert runner.current_version() == runner.status()['version'] == MIGRATIONS[-1].version
+
+
+def test_stale_backfill_state_is_not_processed_twice(tmp_path, patient_factory, monkeypatch):
+    runner = old_database(tmp_path / 'stary.db', patient_factory)
+    runner.upgrade()
+    stale = runner.pending_backfills()
+    runner.run_backfills()
+
+    # Drugi proces z listą sprzed zakończenia uzupełniania - postęp czytany jest pod blokadą
+    monkeypatch.setattr(runner, 'pending_backfills', lambda: stale)
+    assert [(result['version'], result['rows']) for result in runner.run_backfills()] == [(9, 0), (10, 0)]
+    monkeypatch.undo()
+    conn = sqlite3.connect(tmp_path / 'stary.db')
+    assert conn.execute("SELECT version, rows_done FROM schema_backfills WHERE version >= 9").fetchall() == [(9, 3), (10, 3)]
+    conn.close()
+
+
+def test_existing_database_backfills_in_background(tmp_path, patient_factory):
+    db_path = tmp_path / 'stary.db'
+    old_database(db_path, patient_factory, patients=5)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        db = DatabaseManager(str(db_path))
+    db.backfill_worker.join(timeout=10)
+
+    assert not db.backfill_worker.is_alive() and db.backfill_worker.last_error is None
+    assert db.get_schema_status()['version'] == MIGRATIONS[-1].version
+    assert db.find_duplicate_candidates(patient_factory(serial=1))
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from database.notes_codec import COMPRESSION_THRESHOLD, decode_notes, encode_notes, is_compressed
+
+NOTES = {'interview': {'mechanism': 'skręcenie', 'pain_intensity': 7}, 'test_results': {'Test Lachmana': 'Pozytywny'}}
+
+
+def test_small_notes_stay_minified_text():
+    encoded = encode_notes(NOTES)
+
+    assert isinstance(encoded, str) and not is_compressed(encoded)
+    assert encoded == json.dumps(NOTES, ensure_ascii=False, separators=(',', ':'))
+    assert decode_notes(encoded) == NOTES
+
+
+def test_large_notes_round_trip_compressed():
+    notes = {**NOTES, 'opis': 'ból przy schodzeniu ze schodów ' * 200}
+    encoded = encode_notes(notes)
+
+    assert is_compressed(encoded)
+    assert len(encoded) < COMPRESSION_THRESHOLD < len(json.dumps(notes, ensure_ascii=False).encode('utf-8'))
+    assert decode_notes(encoded) == notes
+    assert decode_notes(memoryview(encoded)) == notes
+
+
+def test_threshold_override():
+    assert is_compressed(encode_notes(NOTES, threshold=0))
+    assert isinstance(encode_notes({**NOTES, 'x': 'y' * 5000}, threshold=10 ** 6), str)
+
+
+def test_legacy_indented_json_is_read():
+    assert decode_notes(json.dumps(NOTES, ensure_ascii=False, indent=2)) == NOTES
+    assert decode_notes(None) == decode_notes('') == {}
+
+
+def test_corrupt_notes():
+    assert decode_notes('{uszkodzone') == {}
+    assert decode_notes(b'Z1nie-zlib') == {}
+    with pytest.raises(ValueError):
+        decode_notes('{uszkodzone', strict=True)
+
+
+def test_compact_session_notes_rewrites_and_keeps_content(db, patient_factory, session_factory):
+    patient_id = db.add_patient(patient_factory())
+    session_id = session_factory(patient_id)
+    large = {**NOTES, 'opis': 'obrzęk ' * 1000}
+    with db._connect() as conn:
+        conn.executemany("UPDATE diagnosis_sessions SET session_notes = ? WHERE id = ?", [
+            (json.dumps(large, ensure_ascii=False, indent=2), session_id),
+        ])
+        broken_id = conn.execute(
+            "INSERT INTO diagnosis_sessions (patient_id, module_type, session_date, therapist_name, session_notes) "
+            "VALUES (?, 'knee', '2024-01-01', 'mgr', '{uszkodzone')", (patient_id,)).lastrowid
+        conn.commit()
+
+    stats = db.compact_session_notes(batch_size=1)
+
+    assert (stats['sessions'], stats['rewritten'], stats['skipped']) == (2, 1, 1)
+    assert stats['bytes_after'] < stats['bytes_before']
+    details = db.get_session_details(session_id)
+    assert is_compressed(details['session_notes']) and decode_notes(details['session_notes']) == large
+    assert db.get_session_details(broken_id)['session_notes'] == '{uszkodzone'
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from database.models import HEAVY_SESSION_FIELDS
+
+
+def test_summary_is_newest_first_with_paging(db, patient_factory, session_factory):
+    patient_id = db.add_patient(patient_factory())
+    ids = [session_factory(patient_id, session_date=datetime(2024, month, 1)) for month in (1, 2, 3)]
+
+    assert [s.id for s in db.get_patient_history_summary(patient_id)] == ids[::-1]
+    assert [s.id for s in db.get_patient_history_summary(patient_id, limit=1, offset=1)] == [ids[1]]
+
+
+def test_details_load_once_on_first_access(db, patient_factory, session_factory):
+    patient_id = db.add_patient(patient_factory())
+    session_factory(patient_id, {'interview': {'pain_intensity': 6}}, treatment_plan='Ćwiczenia izometryczne')
+    session = db.get_patient_history_summary(patient_id)[0]
+    calls = []
+    loader = session._loader
+    session._loader = lambda session_id: calls.append(session_id) or loader(session_id)
+
+    assert not session.details_loaded
+    assert not set(HEAVY_SESSION_FIELDS) & set(vars(session))
+    assert session.get_session_notes_dict() == {'interview': {'pain_intensity': 6}}
+    assert session.treatment_plan == 'Ćwiczenia izometryczne'
+    assert session.referral_notes is None
+    assert calls == [session.id] and session.details_loaded
+
+
+def test_lazy_session_matches_full_history(db, patient_factory, session_factory):
+    patient_id = db.add_patient(patient_factory())
+    session_factory(patient_id, {'risk_scores': {'acl_injury_risk': 40.0}}, primary_diagnosis='Uszkodzenie ACL')
+
+    full = db.get_patient_history(patient_id)[0]
+    lazy = db.get_patient_history_summary(patient_id)[0]
+    assert lazy.to_dict() == full.to_dict()
@@ -0,0 +1,97 @@
+import csv
+from datetime import date
+
+import pytest
+
+from conftest import make_pesel, with_checksum
+
+HEADER = ['imię', 'nazwisko', 'pesel', 'data_urodzenia', 'płeć', 'zgoda_leczenie', 'zgoda_dane']
+
+
+def write_csv(path, rows, header=HEADER, delimiter=';'):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file, delimiter=delimiter)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+def test_rejection_reasons(tmp_path, db, patient_factory):
+    existing = patient_factory('Stefan', 'Istniejący', serial=900)
+    db.add_patient(existing)
+    valid = make_pesel(date(1985, 6, 1), serial=101)
+    path = write_csv(tmp_path / 'pacjenci.csv', [
+        ['Jan', 'Nowak', valid, '1985-06-01', 'M', 'tak', 'tak'],
+        ['Jan', '', make_pesel(date(1985, 6, 1), serial=102), '', '', 'tak', 'tak'],
+        ['Ewa', 'Bez Zgody', make_pesel(date(1985, 6, 1), serial=103, male=False), '', 'K', 'tak', 'nie'],
+        ['Adam', 'Krótki', '123', '', '', 'tak', 'tak'],
+        ['Adam', 'Suma', valid[:-1] + str((int(valid[-1]) + 1) % 10), '', '', 'tak', 'tak'],
+        ['Adam', 'Data', with_checksum('8502301011'), '', '', 'tak', 'tak'],
+        ['Adam', 'Rok', make_pesel(date(1985, 6, 1), serial=104), '1986-06-01', '', 'tak', 'tak'],
+        ['Anna', 'Płeć', make_pesel(date(1985, 6, 1), serial=105), '', 'K', 'tak', 'tak'],
+        ['Adam', 'Format', make_pesel(date(1985, 6, 1), serial=106), '1 czerwca 1985', '', 'tak', 'tak'],
+        ['Jan', 'Powtórka', valid, '', '', 'tak', 'tak'],
+        ['Stefan', 'Istniejący', existing.pesel, '', '', 'tak', 'tak'],
+    ])
+
+    result = db.import_patients(str(path), rejected_path=str(tmp_path / 'odrzucone.csv'))
+
+    assert result['imported'] == 1
+    assert result['rejected_by_reason'] == {
+        'missing': 1, 'consent': 1, 'format': 1, 'checksum': 1, 'date': 1,
+        'mismatch': 2, 'invalid': 1, 'duplicate_file': 1, 'exists': 1,
+    }
+    with open(result['rejected_path'], encoding='utf-8') as file:
+        report = list(csv.DictReader(file))
+    assert [(int(row['line']), row['reason']) for row in report][:2] == [(3, 'missing'), (4, 'consent')]
+    assert db.count_patients() == 2
+
+
+def test_dates_and_gender_from_file(tmp_path, db):
+    path = write_csv(tmp_path / 'pacjenci.csv', [
+        ['Jan', 'Kropka', make_pesel(date(1944, 5, 14), serial=1), '14.05.1944', 'M', '1', '1'],
+        ['Ewa', 'Ukośnik', make_pesel(date(2002, 7, 8), serial=2, male=False), '08/07/2002', 'Kobieta', '1', '1'],
+        ['Alex', 'Inna', make_pesel(date(1990, 1, 31), serial=3), '1990-01-31 00:00:00', 'Inna', '1', '1'],
+        ['Ola', 'Bez Daty', make_pesel(date(1999, 12, 1), serial=4, male=False), '', '', '1', '1'],
+    ])
+
+    result = db.import_patients(str(path))
+
+    assert result['imported'] == 4
+    patients = {patient.last_name: patient for patient in db.get_all_patients()}
+    assert patients['Kropka'].birth_date == date(1944, 5, 14)
+    assert patients['Ukośnik'].gender == 'K'
+    assert patients['Inna'].gender == 'Inna'
+    assert (patients['Bez Daty'].birth_date, patients['Bez Daty'].gender) == (date(1999, 12, 1), 'K')
+
+
+def test_consent_columns_are_required(tmp_path, db):
+    path = write_csv(tmp_path / 'pacjenci.csv', [['Jan', 'Nowak', '44051401359']], header=['imie', 'nazwisko', 'pesel'])
+
+    with pytest.raises(ValueError, match='consent_treatment'):
+        db.import_patients(str(path))
+
+
+def test_dry_run_writes_nothing(tmp_path, db):
+    path = write_csv(tmp_path / 'pacjenci.csv', [
+        ['Jan', 'Nowak', make_pesel(date(1985, 6, 1)), '', '', 'tak', 'tak'],
+    ], delimiter=',')
+
+    result = db.import_patients(str(path), dry_run=True)
+
+    assert (result['imported'], result['dry_run']) == (1, True)
+    assert db.count_patients() == 0
+
+
+def test_existing_patient_detected_with_encryption(tmp_path, encryption, db, patient_factory):
+    existing = patient_factory()
+    db.add_patient(existing)
+    path = write_csv(tmp_path / 'pacjenci.csv', [
+        ['Jan', 'Kowalski', existing.pesel, '', '', 'tak', 'tak'],
+        ['Ewa', 'Nowa', make_pesel(date(1991, 2, 3), male=False), '', '', 'tak', 'tak'],
+    ])
+
+    result = db.import_patients(str(path))
+
+    assert result['rejected_by_reason'] == {'exists': 1}
+    assert db.patient_exists(make_pesel(date(1991, 2, 3), male=False))
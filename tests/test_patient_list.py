@@ -0,0 +1,46 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+NAMES = ['Zając', 'Nowak', 'Adamczyk', 'Kowalski', 'Wójcik', 'Lewandowski', 'Dąbrowski']
+
+
+@pytest.fixture
+def patient_ids(db, patient_factory):
+    return [db.add_patient(patient_factory(last_name=name, birth_date=date(1960 + serial, 1, 1), serial=serial))
+            for serial, name in enumerate(NAMES)]
+
+
+def test_pages_cover_sorted_list_once(db, patient_ids):
+    pages = [db.get_patients_page(page, 3) for page in range(3)]
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [patient.last_name for page in pages for patient in page] == sorted(NAMES)
+    assert db.get_patients_page(3, 3) == []
+    assert db.count_patients() == len(NAMES)
+
+
+def test_sort_columns_and_direction(db, patient_ids):
+    newest_first = db.get_patients_page(0, 2, sort_by='birth_date', descending=True)
+    assert [patient.id for patient in newest_first] == patient_ids[:-3:-1]
+
+    with pytest.raises(ValueError):
+        db.get_patients_page(sort_by='pesel')
+
+
+def test_count_matches_filtered_pages(db, patient_ids):
+    assert db.count_patients('ski') == 3
+    assert {patient.last_name for patient in db.get_patients_page(0, 10, search_term='ski')} == \
+        {'Kowalski', 'Lewandowski', 'Dąbrowski'}
+
+
+def test_inactive_patients_are_counted_only_on_request(db, patient_ids):
+    conn = sqlite3.connect(db.db_path)
+    with conn:
+        conn.execute("UPDATE patients SET is_active = 0 WHERE id = ?", (patient_ids[0],))
+    conn.close()
+
+    assert db.count_patients() == len(NAMES) - 1
+    assert db.count_patients(active_only=False) == len(NAMES)
+    assert len(db.get_patients_page(0, 50, active_only=False)) == len(NAMES)
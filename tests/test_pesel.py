@@ -0,0 +1,56 @@
+from datetime import date
+
+import numpy as np
+
+from conftest import make_pesel, with_checksum
+from database.pesel import PESEL_ERRORS, validate_pesel, validate_pesels
+
+
+def test_valid_pesel_gives_birth_date_and_gender():
+    checked = validate_pesels(['44051401359', make_pesel(date(2003, 12, 31), male=False)])
+
+    assert list(checked.errors) == [None, None]
+    assert list(checked.birth_date_strings()) == ['1944-05-14', '2003-12-31']
+    assert list(checked.genders) == ['M', 'K']
+    assert checked.valid.all()
+
+
+def test_century_is_encoded_in_month():
+    pesels = [make_pesel(date(year, 7, 1)) for year in (1899, 1999, 2024, 2150)]
+    checked = validate_pesels(pesels)
+
+    assert list(checked.birth_date_strings()) == ['1899-07-01', '1999-07-01', '2024-07-01', '2150-07-01']
+
+
+def test_errors_are_reported_per_number():
+    pesels = [
+        '123',            # za krótki
+        '4405140135X',    # litera
+        '٤٤051401359',    # cyfry spoza ASCII
+        '44051401358',    # zła cyfra kontrolna
+        '44051401359',
+    ]
+    checked = validate_pesels(pesels)
+
+    assert list(checked.errors) == ['format', 'format', 'format', 'checksum', None]
+    assert list(checked.genders) == ['', '', '', '', 'M']
+    assert np.isnat(checked.birth_dates[:4]).all()
+
+
+def test_nonexistent_date_is_rejected():
+    # Suma kontrolna poprawna, ale 30 lutego i 13. miesiąc nie istnieją
+    pesels = [with_checksum('8002301234'), with_checksum('8013011234')]
+
+    assert list(validate_pesels(pesels).errors) == ['date', 'date']
+
+
+def test_empty_batch():
+    checked = validate_pesels([])
+
+    assert len(checked.errors) == 0
+    assert len(checked.birth_date_strings()) == 0
+
+
+def test_validate_single_pesel_returns_message():
+    assert validate_pesel('44051401359') is None
+    assert validate_pesel('44051401358') == PESEL_ERRORS['checksum']
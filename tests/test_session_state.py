@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from database import session_state
+from database.session_state import SessionRegistry, SessionStateManager
+
+
+def test_search_results_keep_ids_in_order(db, patient_factory):
+    patients = [db.get_patient(db.add_patient(patient_factory(last_name=name, serial=serial)))
+                for serial, name in enumerate(['Nowak', 'Adamczyk', 'Zając'])]
+    manager = SessionStateManager({})
+    manager.set_search_results(list(reversed(patients)), 'a')
+
+    assert manager.state['search_results']['ids'] == [patient.id for patient in reversed(patients)]
+    assert [patient.last_name for patient in manager.get_search_results(db)] == ['Zając', 'Adamczyk', 'Nowak']
+
+
+def test_search_results_are_fetched_in_one_query(db, patient_factory, monkeypatch):
+    ids = [db.add_patient(patient_factory(serial=serial)) for serial in range(3)]
+    manager = SessionStateManager({})
+    manager.set_search_results([db.get_patient(patient_id) for patient_id in ids], 'Kowalski')
+    monkeypatch.setattr(db, 'get_patient', pytest.fail)
+
+    assert [patient.id for patient in manager.get_search_results(db)] == ids
+
+
+def test_patients_by_ids_in_chunks(db, patient_factory):
+    first = db.add_patient(patient_factory(serial=1))
+    second = db.add_patient(patient_factory(serial=2))
+    ids = [second, 10_000, first] + list(range(20_000, 21_000))
+
+    assert [patient.id for patient in db.get_patients_by_ids(ids)] == [second, first]
+    assert db.get_patients_by_ids([]) == []
+
+
+def test_stale_search_results_are_evicted(db, patient_factory):
+    patient = db.get_patient(db.add_patient(patient_factory()))
+    manager = SessionStateManager({})
+    manager.set_search_results([patient], 'Kowalski')
+    manager.state['search_results']['created_at'] -= session_state.SEARCH_RESULTS_TTL_SECONDS + 1
+
+    assert not manager.has_search_results()
+    assert manager.get_search_results(db) == []
+
+
+def test_compact_clears_findings_outside_assessment():
+    class Module:
+        current_findings = {'pain': 5}
+
+    module = Module()
+    manager = SessionStateManager({'workflow_step': 'diagnosis', 'knee_module': module})
+    manager.compact()
+    assert module.current_findings == {'pain': 5}
+
+    manager.state['workflow_step'] = 'patient_selection'
+    manager.compact()
+    assert module.current_findings == {}
+
+
+def test_registry_prunes_stale_sessions():
+    registry = SessionRegistry()
+    registry.update('stara', 100, {'search_results': 100})
+    registry.update('nowa', 50, {'search_results': 50})
+    assert (registry.active_count(), registry.total_bytes()) == (2, 150)
+
+    registry._sessions['stara']['updated_at'] = time.time() - session_state.SESSION_STALE_SECONDS - 1
+    assert registry.active_count() == 1
+    assert [info['session_id'] for info in registry.largest()] == ['nowa']
+
+
+def test_measure_only_tracked_keys_and_throttles(monkeypatch):
+    monkeypatch.setattr(session_state, 'session_registry', SessionRegistry())
+    manager = SessionStateManager({'workflow_step': 'assessment', 'db': object()})
+
+    sizes = manager.measure()
+    assert set(sizes) == {'session_id', 'workflow_step'}
+    assert manager.measure() is None
+    assert 'db' in manager.measure(force=True, all_keys=True)
+    assert session_state.session_registry.active_count() == 1
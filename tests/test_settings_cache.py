@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+from database.db_manager import DatabaseManager
+from database.models import SystemConfiguration
+from database.settings_cache import SettingsCache
+
+
+@pytest.fixture
+def other(db):
+    """Drugi proces aplikacji na tej samej bazie"""
+    with DatabaseManager(str(db.db_path)) as manager:
+        manager.settings.check_interval = 0
+        yield manager
+
+
+def test_reads_are_served_from_memory(db):
+    db.set_setting('motyw', 'ciemny')
+    for _ in range(3):
+        assert db.get_setting('motyw') == 'ciemny'
+
+    assert db.settings.stats['reloads'] == 1
+    assert db.get_setting('brak', 'domyślne') == 'domyślne'
+
+
+def test_change_from_other_connection_is_picked_up(db, other):
+    db.settings.check_interval = 0
+    assert other.get_setting('motyw') is None
+    db.set_setting('motyw', 'ciemny')
+
+    assert other.get_setting('motyw') == 'ciemny'
+    reloads = other.settings.stats['reloads']
+    assert other.get_settings() == {'motyw': 'ciemny'}
+    assert other.settings.stats['reloads'] == reloads
+
+
+def test_unrelated_writes_do_not_reload_settings(db, other, patient_factory):
+    other.get_settings()
+    reloads = other.settings.stats['reloads']
+    db.add_patient(patient_factory())
+
+    assert other.get_settings() == {}
+    assert other.settings.stats['reloads'] == reloads and other.settings.stats['checks'] > 0
+
+
+def test_check_interval_limits_version_checks(db, other):
+    other.settings.check_interval = 3600
+    other.get_settings()
+    db.set_setting('motyw', 'ciemny')
+
+    assert other.get_setting('motyw') is None
+    other.settings.invalidate()
+    assert other.get_setting('motyw') == 'ciemny'
+
+
+def test_concurrent_writes_are_merged(db, other):
+    db.settings.check_interval = 3600
+    db.get_settings()
+    other.set_setting('jezyk', 'pl')
+    db.set_setting('motyw', 'ciemny')
+
+    assert db.get_settings() == {'jezyk': 'pl', 'motyw': 'ciemny'}
+
+
+def test_system_configuration_round_trip(db, other):
+    config = SystemConfiguration(confidence_threshold=0.8, max_differential_diagnoses=3, enable_3d_model=False)
+    db.set_system_configuration(config)
+
+    assert other.get_system_configuration() == config
+
+
+def test_close_releases_connection(tmp_path):
+    with DatabaseManager(str(tmp_path / 'fizjo.db')) as db:
+        db.set_setting('motyw', 'ciemny')
+        conn = db.settings._conn
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    assert db.settings._conn is None
+    assert db.get_setting('motyw') == 'ciemny'
+
+
+def test_database_without_version_counter_reloads_on_any_change(tmp_path):
+    path = tmp_path / 'stary.db'
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE user_settings (setting_key TEXT PRIMARY KEY, setting_value TEXT, updated_at TEXT)")
+    cache = SettingsCache(path, check_interval=0)
+    try:
+        assert cache.get_all() == {}
+        with sqlite3.connect(path) as conn:
+            conn.execute("INSERT INTO user_settings (setting_key, setting_value) VALUES ('motyw', 'jasny')")
+        assert cache.get('motyw') == 'jasny'
+    finally:
+        cache.close()
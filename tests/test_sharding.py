@@ -0,0 +1,180 @@
+import csv
+from collections import Counter
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+from database.models import DiagnosisSession
+from database.sharding import ShardedDatabaseManager
+
+CLINICS = ('centrum', 'polnoc', 'poludnie')
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    manager = ShardedDatabaseManager({name: str(tmp_path / f"{name}.db") for name in CLINICS})
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def clinics(tmp_path):
+    """Pacjenci przypisani do gabinetów (bez clinic - pierwszy gabinet)"""
+    manager = ShardedDatabaseManager({name: str(tmp_path / f"{name}.db") for name in CLINICS},
+                                     router=lambda patient: 0)
+    yield manager
+    manager.close()
+
+
+def test_global_id_mapping(sharded):
+    for shard_index in range(len(CLINICS)):
+        for local_id in (1, 2, 17):
+            global_id = sharded.to_global(local_id, shard_index)
+            assert sharded.to_local(global_id) == (shard_index, local_id)
+    assert sharded.to_global(None, 1) is None
+
+
+def test_patients_keep_global_ids(clinics, patient_factory):
+    ids = {}
+    for serial, clinic in enumerate(CLINICS * 2):
+        patient = patient_factory(last_name=f"Nazwisko{serial}", serial=serial)
+        ids[clinics.add_patient(patient, clinic=clinic)] = (clinic, patient.pesel)
+
+    assert len(ids) == 6
+    for global_id, (clinic, pesel) in ids.items():
+        assert global_id % len(CLINICS) == CLINICS.index(clinic)
+        patient = clinics.get_patient(global_id)
+        assert (patient.id, patient.pesel) == (global_id, pesel)
+
+
+def test_routed_patient_is_found_on_its_shard(sharded, patient_factory):
+    patient = patient_factory()
+    patient_id = sharded.add_patient(patient)
+
+    assert sharded.patient_exists(patient.pesel)
+    assert sharded.get_patient(patient_id).pesel == patient.pesel
+    assert sharded.count_patients() == 1
+
+
+@pytest.mark.parametrize('descending', [False, True])
+def test_page_merge_matches_global_order(clinics, patient_factory, descending):
+    names = ['Zając', 'Nowak', 'Adamczyk', 'Kowalski', 'Wójcik', 'Lewandowski', 'Dąbrowski', 'Mazur']
+    for serial, name in enumerate(names):
+        clinics.add_patient(patient_factory(last_name=name, birth_date=date(1970 + serial, 1, 1), serial=serial),
+                            clinic=CLINICS[serial % len(CLINICS)])
+
+    expected = [patient.id for patient in sorted(
+        clinics.get_all_patients(), key=lambda patient: (patient.last_name, patient.first_name, patient.id),
+        reverse=descending)]
+    pages = [clinics.get_patients_page(page, 3, descending=descending) for page in range(3)]
+
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert [patient.id for page in pages for patient in page] == expected
+    assert clinics.count_patients() == len(names)
+    assert clinics.get_patients_page(3, 3) == []
+
+
+def test_patients_by_ids_across_shards(clinics, patient_factory):
+    ids = [clinics.add_patient(patient_factory(serial=serial), clinic=CLINICS[serial % len(CLINICS)])
+           for serial in range(5)]
+    wanted = [ids[3], ids[0], clinics.to_global(99, 1), ids[4]]
+
+    assert [patient.id for patient in clinics.get_patients_by_ids(wanted)] == [ids[3], ids[0], ids[4]]
+
+
+def test_close_releases_shard_settings(tmp_path):
+    with ShardedDatabaseManager({name: str(tmp_path / f"{name}.db") for name in CLINICS}) as manager:
+        for shard in manager.shards:
+            shard.get_settings()
+    assert all(shard.settings._conn is None for shard in manager.shards)
+
+
+def test_clinic_outside_pesel_routing_is_rejected(sharded, patient_factory):
+    patient = patient_factory()
+    other = next(name for index, name in enumerate(CLINICS) if index != sharded.router(patient))
+
+    with pytest.raises(ValueError):
+        sharded.add_patient(patient, clinic=other)
+    assert sharded.count_patients() == 0
+
+
+def test_patient_exists_queries_only_owning_shard(sharded, patient_factory, monkeypatch):
+    patient = patient_factory()
+    sharded.add_patient(patient)
+    owner = sharded.shards[sharded.router(patient)]
+    for shard in sharded.shards:
+        if shard is not owner:
+            monkeypatch.setattr(shard, 'patient_exists', lambda pesel: pytest.fail("zapytanie do obcego shardu"))
+
+    assert sharded.patient_exists(patient.pesel)
+
+
+def test_logs_from_all_shards_are_merged(sharded, patient_factory):
+    patients = [patient_factory(serial=serial) for serial in range(8)]
+    for patient in patients:
+        sharded.add_patient(patient)
+    for index, shard in enumerate(sharded.shards):
+        with shard._connect() as conn:
+            conn.execute("INSERT INTO system_logs (log_level, message, created_at) VALUES ('INFO', ?, ?)",
+                         (f"wpis {index}", f"2020-01-0{index + 1} 12:00:00"))
+
+    logs = sharded.get_logs()
+    added = [log for log in logs if log['message'].startswith('Dodano nowego pacjenta')]
+    assert len(added) == len(patients)
+    assert {log['shard'] for log in added} == {CLINICS[sharded.router(patient)] for patient in patients}
+    assert [log['created_at'] for log in logs] == sorted((log['created_at'] for log in logs), reverse=True)
+
+    old = sharded.get_logs(limit=2, until='2021-01-01')
+    assert [(log['message'], log['shard']) for log in old] == [('wpis 2', 'poludnie'), ('wpis 1', 'polnoc')]
+
+
+def test_import_routes_rows_to_owning_shards(tmp_path, sharded, patient_factory):
+    patients = [patient_factory(f"Imię{serial}", f"Nazwisko{serial}", serial=serial) for serial in range(8)]
+    path = tmp_path / 'pacjenci.csv'
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['first_name', 'last_name', 'pesel', 'consent_treatment', 'consent_data'])
+        writer.writerows([patient.first_name, patient.last_name, patient.pesel, 'tak', 'tak'] for patient in patients)
+        writer.writerow(['Jan', 'Powtórka', patients[0].pesel, 'tak', 'tak'])
+        writer.writerow(['Jan', 'Krótki', '123', 'tak', 'tak'])
+
+    result = sharded.import_patients(str(path), rejected_path=str(tmp_path / 'odrzucone.csv'))
+
+    assert (result['rows'], result['imported'], result['rejected']) == (10, 8, 2)
+    assert [(row['line'], row['reason']) for row in result['rejected_sample']] == [(10, 'duplicate_file'), (11, 'format')]
+    assert all(sharded.patient_exists(patient.pesel) for patient in patients)
+    routed = Counter(sharded.router(patient) for patient in patients)
+    assert [shard.count_patients() for shard in sharded.shards] == [routed[index] for index in range(len(CLINICS))]
+    assert all(Path(report).exists() for report in result['rejected_paths'].values())
+
+
+def test_export_writes_file_per_shard(tmp_path, sharded, patient_factory):
+    for serial in range(6):
+        sharded.add_patient(patient_factory(serial=serial))
+
+    results = sharded.export_data('patients', str(tmp_path / 'eksport' / 'pacjenci.csv'))
+
+    assert list(results) == list(CLINICS)
+    assert sum(stats['rows'] for stats in results.values()) == 6
+    for name, shard in zip(CLINICS, sharded.shards):
+        with open(tmp_path / 'eksport' / f"pacjenci_{name}.csv", encoding='utf-8') as file:
+            assert len(list(csv.reader(file))) == shard.count_patients() + 1
+
+
+def test_maintenance_and_analytics_cover_all_shards(sharded, patient_factory):
+    for serial in range(6):
+        patient_id = sharded.add_patient(patient_factory(serial=serial))
+        session = DiagnosisSession(patient_id=patient_id, module_type='knee', session_date=datetime(2024, 1, 15),
+                                   therapist_name='mgr Anna Fizjo', primary_diagnosis='ACL', confidence_level=0.5)
+        session.id = sharded.add_diagnosis_session(session)
+        session.set_session_notes_dict({'objawy': ['obrzęk']})
+        sharded.update_diagnosis_session(session)
+
+    assert sharded.get_diagnosis_counts() == {'ACL': 6}
+    assert sharded.get_therapist_confidence() == {'mgr Anna Fizjo': (3.0, 6)}
+    assert set(sharded.get_schema_status()) == set(CLINICS)
+    assert sharded.rebuild_session_findings() == 6
+    assert sharded.compact_session_notes()['sessions'] == 6
+    assert set(sharded.refresh_analytics_snapshot()) == set(CLINICS)
+    assert sharded.get_analytics_data(use_snapshot=True)['top_diagnoses'] == [{'diagnoza': 'ACL', 'liczba': 6}]
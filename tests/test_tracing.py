@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from database import tracing
+from database.tracing import Tracer, trace_database, traced
+
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / 'spans.jsonl'
+    monkeypatch.setattr(tracing, 'tracer', Tracer(str(path)))
+    yield path
+    tracing.tracer.disable()
+
+
+def test_disabled_tracer_returns_noop_span(monkeypatch):
+    monkeypatch.setattr(tracing, 'tracer', Tracer())
+
+    with tracing.span('ekran', patient_id=1) as span:
+        span.set_attribute('krok', 'ocena')
+    assert span is tracing._NOOP_SPAN
+
+
+def test_nested_spans_share_trace_and_parent(trace_file):
+    with tracing.span('rerun', screen='assessment') as root:
+        with tracing.span('module.phase') as child:
+            child.set_attribute('phase', 'interview')
+
+    spans = {span['name']: span for span in read_spans(trace_file)}
+    assert spans['module.phase']['parent_id'] == root.span_id
+    assert spans['module.phase']['trace_id'] == spans['rerun']['trace_id']
+    assert spans['module.phase']['attributes'] == {'phase': 'interview'}
+    assert spans['rerun']['parent_id'] is None
+
+
+def test_exception_is_recorded_and_propagated(trace_file):
+    @traced('oblicz')
+    def compute():
+        raise ValueError("błąd")
+
+    with pytest.raises(ValueError):
+        compute()
+    assert read_spans(trace_file)[0]['attributes'] == {'exception': 'ValueError'}
+
+
+def test_trace_database_wraps_public_methods(trace_file, db, patient_factory):
+    trace_database(db)
+    with tracing.span('zapis'):
+        db.add_patient(patient_factory())
+
+    names = [span['name'] for span in read_spans(trace_file)]
+    assert names[-1] == 'zapis'
+    assert {'db.add_patient', 'db.log_action'} <= set(names)
@@ -0,0 +1,63 @@
+"""Eksport danych kliniki do CSV, NDJSON lub Parquet (database.export).
+
+Czyta bazę partiami (fetchmany) i zapisuje plik strumieniowo, więc
+zużycie pamięci nie zależy od wielkości bazy. Format wynika
+z rozszerzenia (--format csv daje patients.csv, sessions.csv,
+test_results.csv); .gz kompresuje CSV i NDJSON. Parquet wymaga pyarrow.
+
+Przykład:
+    python tools/export_data.py fizjo_expert.db eksport --format ndjson.gz
+    python tools/export_data.py fizjo_expert.db eksport --tables sessions \\
+        --from 2023-01-01 --to 2024-01-01 --module knee --therapist "Dr Nowak"
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from database.db_manager import DatabaseManager  # noqa: E402
+from database.export import EXPORT_TABLES, ExportFilter  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path', help='Plik bazy SQLite')
+    parser.add_argument('output_dir', help='Katalog plików eksportu')
+    parser.add_argument('--format', default='csv', help='csv, ndjson, parquet (z opcjonalnym .gz)')
+    parser.add_argument('--tables', nargs='+', default=list(EXPORT_TABLES), choices=list(EXPORT_TABLES))
+    parser.add_argument('--from', dest='date_from', help='Sesje od daty (włącznie)')
+    parser.add_argument('--to', dest='date_to', help='Sesje do daty (wyłącznie)')
+    parser.add_argument('--module', dest='module_type', help='Tylko sesje modułu (np. knee)')
+    parser.add_argument('--therapist', dest='therapist_name', help='Tylko sesje terapeuty')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--json', dest='json_path', help='Zapisz statystyki do pliku JSON')
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"Brak pliku bazy: {args.db_path}", file=sys.stderr)
+        return 1
+
+    with DatabaseManager(args.db_path, auto_migrate=False) as db:
+        filters = ExportFilter(args.date_from, args.date_to, args.module_type, args.therapist_name)
+        results = []
+        for table in args.tables:
+            path = Path(args.output_dir) / f"{table}.{args.format}"
+            try:
+                stats = db.export_data(table, str(path), filters, args.chunk_size)
+            except ImportError as error:
+                print(error, file=sys.stderr)
+                return 1
+            print(f"{table:14s} {stats['rows']:>10d} wierszy {stats['seconds']:8.2f} s "
+                  f"{stats['rows_per_s'] or 0:>10d} wierszy/s {stats['bytes'] / 2**20:8.1f} MB  {path}")
+            results.append(stats)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Wyszukiwanie prawdopodobnych duplikatów pacjentów (database.duplicates).
+
+Przegląda całą tabelę patients równolegle i zapisuje pary kandydatów do
+scalenia - od najpewniejszych - do pliku CSV do przejrzenia przez
+rejestrację. Pary pochodzą z indeksu patient_blocks (brzmienie nazwiska,
+data urodzenia, PESEL różniący się jedną cyfrą lub zamianą dwóch cyfr).
+
+Przykład:
+    python tools/find_duplicates.py fizjo_expert.db duplikaty.csv --workers 4
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from database.db_manager import DatabaseManager  # noqa: E402
+from database.duplicates import DUPLICATE_MIN_SCORE  # noqa: E402
+
+PATIENT_FIELDS = ('first_name', 'last_name', 'pesel', 'birth_date')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path', help='Plik bazy SQLite')
+    parser.add_argument('output', help='Plik CSV z parami kandydatów')
+    parser.add_argument('--workers', type=int, help='Liczba procesów (domyślnie liczba rdzeni)')
+    parser.add_argument('--min-score', type=float, default=DUPLICATE_MIN_SCORE)
+    args = parser.parse_args()
+
+    if not Path(args.db_path).exists():
+        print(f"Brak pliku bazy: {args.db_path}", file=sys.stderr)
+        return 1
+
+    with DatabaseManager(args.db_path, auto_migrate=False) as db:
+        if db.migrations.pending() or db.migrations.pending_backfills():
+            print("Indeks duplikatów nie jest kompletny - uruchom najpierw tools/migrate_db.py", file=sys.stderr)
+            return 1
+
+        started = time.perf_counter()
+        pairs = db.scan_duplicates(args.workers, args.min_score)
+        seconds = time.perf_counter() - started
+
+        with open(args.output, 'w', encoding='utf-8', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['score', 'reasons', 'patient_id'] + [f"{name}_1" for name in PATIENT_FIELDS]
+                            + ['duplicate_id'] + [f"{name}_2" for name in PATIENT_FIELDS])
+            for pair in pairs:
+                first, second = db.get_patient(pair['patient_id']), db.get_patient(pair['duplicate_id'])
+                writer.writerow([pair['score'], ' '.join(pair['reasons']), first.id]
+                                + [getattr(first, name) for name in PATIENT_FIELDS]
+                                + [second.id] + [getattr(second, name) for name in PATIENT_FIELDS])
+
+        print(f"Kandydatów do scalenia: {len(pairs)} ({seconds:.2f} s) -> {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Import pacjentów z pliku CSV (database.patient_import).
+
+Plik jest czytany partiami, PESEL-e sprawdzane wektorowo (suma kontrolna,
+data urodzenia, płeć), istniejący pacjenci wykrywani jednym zapytaniem
+na partię, a zapis odbywa się w dużych transakcjach. Odrzucone wiersze
+(z numerem linii i powodem) trafiają do raportu CSV.
+
+Przykład:
+    python tools/import_patients.py fizjo_expert.db pacjenci.csv --rejected odrzucone.csv
+    python tools/import_patients.py fizjo_expert.db pacjenci.csv --dry-run
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from database.db_manager import DatabaseManager  # noqa: E402
+from database.patient_import import IMPORT_BATCH_SIZE, REJECT_REASONS  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path', help='Plik bazy SQLite')
+    parser.add_argument('csv_path', help='Plik CSV z pacjentami')
+    parser.add_argument('--rejected', help='Raport odrzuconych wierszy (CSV)')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='Tylko sprawdź plik, nie zapisuj')
+    parser.add_argument('--json', dest='json_path', help='Zapisz wynik do pliku JSON')
+    args = parser.parse_args()
+
+    if not Path(args.csv_path).exists():
+        print(f"Brak pliku: {args.csv_path}", file=sys.stderr)
+        return 1
+
+    with DatabaseManager(args.db_path) as db:
+        try:
+            result = db.import_patients(args.csv_path, args.rejected, args.batch_size, args.dry_run)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+
+    action = "Sprawdzono" if args.dry_run else "Zaimportowano"
+    print(f"{action}: {result['imported']} z {result['rows']} wierszy w {result['seconds']:.2f} s "
+          f"({result['rows_per_s'] or 0} wierszy/s)")
+    for reason, count in sorted(result['rejected_by_reason'].items(), key=lambda item: -item[1]):
+        print(f"  odrzucono {count:>7d}  {REJECT_REASONS[reason]}")
+    if result['rejected_path']:
+        print(f"Raport odrzuconych: {result['rejected_path']}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Aktualizacja schematu bazy fizjo_expert.db (database.migrations).
+
+Wykonuje oczekujące migracje schematu, a potem uzupełnia dane partiami.
+Z --max-seconds uzupełnianie kończy się po zadanym czasie i przy
+kolejnym uruchomieniu jest kontynuowane od miejsca przerwania - dużą bazę
+można więc aktualizować w kilku oknach, także w godzinach pracy
+gabinetu. Start aplikacji na istniejącej bazie też uzupełnia dane (w wątku
+w tle), ale indeksy (migracje deferred) buduje tylko to narzędzie.
+--status tylko wypisuje wersję schematu (wykonaną w całości, razem
+z uzupełnianiem danych) i postęp.
+
+Szyfrowanie PESEL i danych kontaktowych włączają klucze FIZJO_FIELD_KEY
+i FIZJO_BLIND_INDEX_KEY (--generate-key tworzy nowy klucz). Migracja 10
+szyfruje istniejące dane, jeśli klucze są ustawione; bazę, w której
+migracja przebiegła bez kluczy, szyfruje --encrypt.
+
+Przykład:
+    python tools/migrate_db.py fizjo_expert.db --status
+    python tools/migrate_db.py fizjo_expert.db --max-seconds 60 --pause 0.2
+    python tools/migrate_db.py fizjo_expert.db --encrypt
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from database.crypto import generate_key  # noqa: E402
+from database.db_manager import DatabaseManager  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('db_path', nargs='?', help='Plik bazy SQLite')
+    parser.add_argument('--status', action='store_true', help='Tylko wypisz stan migracji')
+    parser.add_argument('--max-seconds', type=float, help='Limit czasu uzupełniania danych')
+    parser.add_argument('--pause', type=float, help='Przerwa między partiami (s) - więcej czasu dla zapisów aplikacji')
+    parser.add_argument('--encrypt', action='store_true', help='Zaszyfruj dane pacjentów zapisane jawnie')
+    parser.add_argument('--generate-key', action='store_true', help='Wypisz nowy klucz szyfrowania i zakończ')
+    parser.add_argument('--json', dest='json_path', help='Zapisz wynik do pliku JSON')
+    args = parser.parse_args()
+
+    if args.generate_key:
+        print(generate_key())
+        return 0
+    if not args.db_path or not Path(args.db_path).exists():
+        print(f"Brak pliku bazy: {args.db_path}", file=sys.stderr)
+        return 1
+
+    with DatabaseManager(args.db_path, auto_migrate=False) as db:
+        if args.pause is not None:
+            db.migrations.pause_seconds = args.pause
+
+        if args.status:
+            status = db.get_schema_status()
+            print(f"Wersja schematu: {status['version']} / {status['latest']}")
+            for row in status['applied']:
+                print(f"  {row['version']:3d} {row['name']:40s} {row['duration_ms']:10.1f} ms  {row['applied_at']}")
+            if status['pending']:
+                print(f"Oczekujące migracje: {', '.join(map(str, status['pending']))}")
+            for row in status['backfills']:
+                state = 'gotowe' if row['completed_at'] else f"klucz {row['last_key']}"
+                print(f"  uzupełnianie {row['version']}: {row['rows_done']} wierszy, {row['batches']} partii, "
+                      f"{row['duration_ms'] / 1000:.1f} s, {state}")
+            result = status
+        else:
+            result = db.migrate(max_seconds=args.max_seconds, progress=print)
+            for migration in result['migrations']:
+                print(f"migracja {migration['version']} {migration['name']}: {migration['duration_ms']:.0f} ms")
+            for backfill in result['backfills']:
+                state = 'gotowe' if backfill['completed'] else 'przerwane (limit czasu)'
+                print(f"uzupełnianie {backfill['version']}: {backfill['rows']} wierszy w "
+                      f"{backfill['duration_ms'] / 1000:.1f} s, {state}")
+            print(f"Pozostałe uzupełnianie: {result['pending_backfills']}, łącznie {result['duration_s']} s")
+            if args.encrypt:
+                try:
+                    result['encrypted'] = db.encrypt_patient_data()
+                except ValueError as error:
+                    print(error, file=sys.stderr)
+                    return 1
+                print(f"Zaszyfrowano dane pacjentów: {result['encrypted']} wierszy")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Podsumowanie spanów zapisanych przez database.tracing (FIZJO_TRACE_FILE).
+
+Czyta plik JSONL ze spanami i wypisuje tabelę: liczba wywołań, czas
+łączny, czas własny (bez spanów potomnych), mediana i p95 per nazwa
+spanu. Opcjonalnie zapisuje stosy w formacie "folded"
+(rerun;step.assessment;db.get_patient 1234), który przyjmują
+flamegraph.pl i speedscope - wartości to mikrosekundy czasu własnego.
+
+Przykład:
+    FIZJO_TRACE_FILE=trace.jsonl streamlit run app.py
+    python tools/trace_summary.py trace.jsonl --top 20 --folded trace.folded
+    python tools/trace_summary.py trace.jsonl --trace-id <session_id>
+"""
+import argparse
+import json
+import statistics
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+
+def load_spans(path: Path, trace_id: str = None) -> Dict[str, Dict]:
+    spans = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Ostatnia linia może być niedopisana, jeśli proces wciąż działa
+                continue
+            if trace_id and record['trace_id'] != trace_id:
+                continue
+            spans[record['span_id']] = record
+    return spans
+
+
+def self_times(spans: Dict[str, Dict]) -> Dict[str, float]:
+    """Czas własny spanu = czas trwania minus czas bezpośrednich potomków"""
+    children_ms = defaultdict(float)
+    for record in spans.values():
+        if record['parent_id'] in spans:
+            children_ms[record['parent_id']] += record['duration_ms']
+    return {span_id: max(0.0, record['duration_ms'] - children_ms[span_id]) for span_id, record in spans.items()}
+
+
+def stack_of(record: Dict, spans: Dict[str, Dict]) -> List[str]:
+    stack = [record['name']]
+    parent = spans.get(record['parent_id'])
+    while parent is not None:
+        stack.append(parent['name'])
+        parent = spans.get(parent['parent_id'])
+    return list(reversed(stack))
+
+
+def folded_stacks(spans: Dict[str, Dict], own: Dict[str, float]) -> Dict[str, int]:
+    folded = defaultdict(int)
+    for span_id, record in spans.items():
+        folded[';'.join(stack_of(record, spans))] += round(own[span_id] * 1000)
+    return folded
+
+
+def summary_table(spans: Dict[str, Dict], own: Dict[str, float]) -> List[Dict]:
+    durations = defaultdict(list)
+    own_by_name = defaultdict(float)
+    for span_id, record in spans.items():
+        durations[record['name']].append(record['duration_ms'])
+        own_by_name[record['name']] += own[span_id]
+
+    rows = []
+    for name, samples in durations.items():
+        ordered = sorted(samples)
+        p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+        rows.append({
+            'name': name,
+            'count': len(ordered),
+            'total_ms': sum(ordered),
+            'self_ms': own_by_name[name],
+            'median_ms': statistics.median(ordered),
+            'p95_ms': ordered[p95_index]
+        })
+    return sorted(rows, key=lambda row: row['self_ms'], reverse=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('trace_file', help='Plik JSONL ze spanami')
+    parser.add_argument('--trace-id', help='Tylko spany jednej sesji (trace_id = session_id)')
+    parser.add_argument('--top', type=int, default=30, help='Liczba wierszy tabeli')
+    parser.add_argument('--folded', help='Zapisz stosy w formacie folded do pliku')
+    args = parser.parse_args()
+
+    spans = load_spans(Path(args.trace_file), args.trace_id)
+    if not spans:
+        print("Brak spanów w pliku")
+        return 1
+
+    own = self_times(spans)
+    traces = {record['trace_id'] for record in spans.values()}
+    print(f"{len(spans)} spanów w {len(traces)} sesjach")
+    print(f"{'span':40s} {'liczba':>7s} {'łącznie ms':>12s} {'własny ms':>12s} {'mediana ms':>11s} {'p95 ms':>10s}")
+    for row in summary_table(spans, own)[:args.top]:
+        print(f"{row['name'][:40]:40s} {row['count']:7d} {row['total_ms']:12.1f} {row['self_ms']:12.1f} "
+              f"{row['median_ms']:11.2f} {row['p95_ms']:10.2f}")
+
+    if args.folded:
+        folded = folded_stacks(spans, own)
+        Path(args.folded).write_text(
+            ''.join(f"{stack} {value}\n" for stack, value in sorted(folded.items()) if value > 0), encoding='utf-8')
+        print(f"Stosy zapisane do {args.folded}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())